@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Microbenchmark for ``EXCLUDE`` matching in ``KeysmithAuthenticationMiddleware``.
+
+Run from the repository root::
+
+    python benchmarks/exclusions.py
+
+Reports the per-call cost of the compiled path matcher and of a full
+middleware pass for an excluded request, against a pass with no token.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from keysmith.django.exclusions import ExclusionRules  # noqa: E402
+from keysmith.django.middleware import KeysmithAuthenticationMiddleware  # noqa: E402
+
+NUMBER = 200_000
+PATHS = [f"/static/app{i}/" for i in range(40)] + ["/healthz", "/metrics"]
+REGEXES = [r"/media/[0-9a-f]{2}/", r"/status/?$"]
+
+
+def per_call(stmt, number=NUMBER) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def report(label, stmt, number=NUMBER) -> None:
+    print(f"  {label:<26}{per_call(stmt, number):7.0f} ns")
+
+
+def main() -> None:
+    rules = ExclusionRules(paths=PATHS, regexes=REGEXES)
+    print(f"{len(PATHS)} prefixes + {len(REGEXES)} regexes, one compiled matcher")
+    report("matcher hit (first rule)", lambda: rules.excludes_path("/static/app0/x.css"))
+    report("matcher hit (last rule)", lambda: rules.excludes_path("/status"))
+    report("matcher miss", lambda: rules.excludes_path("/api/v1/orders/"))
+
+    response = HttpResponse()
+    factory = RequestFactory()
+    exclude = {"paths": PATHS, "regexes": REGEXES}
+    with override_settings(KEYSMITH={"EXCLUDE": exclude}):
+        middleware = KeysmithAuthenticationMiddleware(lambda request: response)
+        excluded = factory.get("/healthz", HTTP_X_KEYSMITH_TOKEN="ks_abc:secret")
+        anonymous = factory.get("/api/v1/orders/")
+        print("middleware pass")
+        report("excluded path with token", lambda: middleware(excluded), 50_000)
+        report("included path, no token", lambda: middleware(anonymous), 50_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -103,6 +103,7 @@ class TokenAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         if change:
+            # keysmith.signals drops cached auth state for the edited token.
             super().save_model(request, obj, form, change)
             return
 
@@ -7,3 +7,12 @@ class KeysmithConfig(AppConfig):
 
     def ready(self):
         import keysmith.checks  # noqa: F401
+        import keysmith.signals  # noqa: F401
+        from keysmith.auth.scopes import scope_registry
+        from keysmith.runtime import prepare_runtime
+        from keysmith.settings import keysmith_settings
+        from keysmith.signals import connect_token_receivers
+
+        connect_token_receivers()
+        scope_registry.seed(keysmith_settings.AVAILABLE_SCOPES or [])
+        prepare_runtime()
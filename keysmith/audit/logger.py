@@ -3,8 +3,7 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-from keysmith.models.utils import get_audit_log_model
-from keysmith.settings import keysmith_settings
+from keysmith.runtime import get_runtime
 
 logger = logging.getLogger("keysmith.audit")
 
@@ -35,12 +34,17 @@ def log_audit_event(
     status_code: int = 0,
     extra: dict[str, Any] | None = None,
 ) -> None:
-    """Write an audit row if enabled, swallowing failures to avoid auth disruption."""
-    if not keysmith_settings.ENABLE_AUDIT_LOGGING:
+    """Write an audit row if enabled, swallowing failures to avoid auth disruption.
+
+    ``token`` may be a token instance or a ``TokenPrincipal``; only its primary
+    key is written, so neither is reloaded.
+    """
+    runtime = get_runtime()
+    if not runtime.enable_audit_logging:
         return
 
     try:
-        AuditLog = get_audit_log_model()
+        AuditLog = runtime.audit_log_model
         payload = (
             _request_context(request, status_code)
             if request
@@ -53,7 +57,7 @@ def log_audit_event(
             }
         )
         AuditLog.objects.create(
-            token=token,
+            token_id=token.pk if token is not None else None,
             action=action,
             path=payload["path"],
             method=payload["method"],
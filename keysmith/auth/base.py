@@ -1,59 +1,562 @@
-from django.db import transaction
+from __future__ import annotations
 
+import copy
+import logging
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, InterfaceError, connection, connections, transaction
+
+from keysmith.auth.cache import (
+    get_negative_cache,
+    get_shared_cache,
+    get_verified_cache,
+    token_digest,
+)
 from keysmith.auth.exceptions import (
     ExpiredToken,
     InvalidToken,
     RevokedToken,
+    TokenAuthError,
+    VerificationUnavailable,
 )
+from keysmith.auth.prefix_filter import get_prefix_filter
+from keysmith.auth.resilience import get_breaker, get_known_tokens, stats
+from keysmith.auth.singleflight import get_single_flight
+from keysmith.auth.utils import get_token_scopes
 from keysmith.hashers.base import BaseTokenHasher
-from keysmith.hashers.registry import get_hasher
-from keysmith.models.utils import get_token_model
-from keysmith.services.tokens import mark_token_used
+from keysmith.hashers.executor import (
+    HasherUnavailable,
+    averify,
+    get_thread_executor,
+    run_verify,
+)
+from keysmith.models.utils import has_scope_column
+from keysmith.runtime import get_runtime
+from keysmith.services.tokens import (
+    amark_token_used,
+    mark_token_used,
+    mark_tokens_used,
+    upgrade_token_hash,
+)
+from keysmith.settings import keysmith_settings
 from keysmith.utils.tokens import extract_prefix_and_secret
 
+logger = logging.getLogger("keysmith.auth")
+
 
-@transaction.atomic
 def authenticate_token(raw_token: str):
-    """Validate a raw token and return the corresponding locked token row.
+    """Validate a raw token and return the corresponding token row.
 
     The flow checks token format/checksum, existence, revoke/purge state, expiry,
     and secret hash. On success it updates `last_used_at`.
+
+    By default the row is fetched with ``select_for_update()`` inside an atomic
+    block. With ``LOCK_FREE_AUTH`` enabled the row is read without a lock, the
+    hash is verified outside any transaction and usage is recorded with a
+    single conditional ``UPDATE``.
+
+    The user is joined into the row query and the scope codenames are read
+    from the ``scope_codenames`` column (or queried when the token model has
+    no such column) and cached on the returned instance, so ``token.user``
+    and scope checks do not query again.
+
+    When ``SHARED_CACHE_ALIAS`` is set, a verified record published by any
+    worker is used instead of the row read and hash verification. When
+    ``NEGATIVE_CACHE_TTL`` is set, a recently failed token is refused before
+    any transaction is opened. When ``SINGLE_FLIGHT_TIMEOUT`` is set,
+    concurrent calls in this process for the same raw token share one lookup
+    and verification. When ``BREAKER_FAILURE_THRESHOLD`` is set, database
+    errors trip a circuit breaker and are answered per ``OUTAGE_POLICY``.
+    """
+    prefix, secret, digest, negative = _screen(raw_token)
+
+    def authenticate():
+        if keysmith_settings.LOCK_FREE_AUTH:
+            return _authenticate(raw_token, prefix, secret, digest, negative, lock=False)
+        with transaction.atomic():
+            return _authenticate(raw_token, prefix, secret, digest, negative, lock=True)
+
+    def run():
+        return _guarded(digest, authenticate)
+
+    flight = get_single_flight()
+    if flight is None:
+        return run()
+    # waiters get their own copy of the leader's instance, never a shared one.
+    return flight.do(digest, run, share=copy.copy)
+
+
+async def aauthenticate_token(raw_token: str):
+    """Async counterpart of :func:`authenticate_token`.
+
+    Uses the async ORM and always behaves like ``LOCK_FREE_AUTH`` since row
+    locks need a transaction, which the async ORM does not offer. Hash
+    verification runs in the bounded pool from
+    :func:`keysmith.hashers.executor.get_thread_executor`.
+    """
+    prefix, secret, digest, negative = await _ascreen(raw_token)
+
+    breaker = get_breaker()
+    if breaker is None:
+        return await _aauthenticate(raw_token, prefix, secret, digest, negative)
+    if not breaker.allow():
+        return _serve_during_outage(digest)
+    try:
+        token = await _aauthenticate(raw_token, prefix, secret, digest, negative)
+    except (DatabaseError, InterfaceError) as exc:
+        breaker.record_failure()
+        return _serve_during_outage(digest, exc)
+    except TokenAuthError:
+        breaker.record_success()
+        raise
+    except BaseException:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    _remember_known(digest, token)
+    return token
+
+
+async def _aauthenticate(raw_token: str, prefix: str, secret: str, digest, negative):
+    if get_shared_cache() is not None:
+        # cache backends are sync-first; run the shared-record flow off the loop.
+        return await sync_to_async(_authenticate)(
+            raw_token, prefix, secret, digest, negative, lock=False
+        )
+
+    cache = get_verified_cache()
+    Token = get_runtime().token_model
+    try:
+        token = await _auth_queryset(lock=False).aget(prefix=prefix)
+    except Token.DoesNotExist as exc:
+        raise await _arejected(negative, prefix, _token_not_found()) from exc
+
+    error = _token_state_error(token)
+    if error is not None:
+        raise await _arejected(negative, prefix, error)
+
+    if cache is None or not cache.contains(digest, token.key):
+        hasher, verifier = _select_verifier(token)
+        try:
+            verified = await averify(verifier, secret, token.key)
+        except HasherUnavailable as exc:
+            raise VerificationUnavailable(str(exc)) from exc
+        if not verified:
+            raise await _arejected(negative, prefix, _verification_failed(), digest=digest)
+        if _needs_upgrade(token):
+            await sync_to_async(upgrade_token_hash)(token, secret, hasher=hasher)
+        if cache is not None:
+            cache.add(digest, token.prefix, token.key)
+
+    if "scope_codenames" in token.__dict__:
+        token._keysmith_scope_codenames = frozenset(token.scope_codenames)
+    else:
+        token._keysmith_scope_codenames = frozenset(
+            [codename async for codename in token.scopes.values_list("codename", flat=True)]
+        )
+    await amark_token_used(token)
+    return token
+
+
+@dataclass(frozen=True)
+class TokenAuthResult:
+    """Outcome of one item in :func:`authenticate_tokens`."""
+
+    token: object | None = None
+    error: TokenAuthError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def authenticate_tokens(raw_tokens: Iterable[str]) -> list[TokenAuthResult]:
+    """Validate many raw tokens at once, returning one result per input in order.
+
+    Runs the same checks as :func:`authenticate_token` but never raises an
+    auth error: each failure is reported on its :class:`TokenAuthResult`.
+    All rows are fetched in one ``prefix__in`` query with the user joined
+    (scopes come from the ``scope_codenames`` column, or one prefetch query),
+    secrets are verified in parallel on the bounded hashing pool, and usage
+    is recorded with one bulk ``UPDATE``. Remembered failures and definite
+    prefix-filter misses are settled before the query. Rows are never locked,
+    as with ``LOCK_FREE_AUTH``.
     """
+    raw_tokens = list(raw_tokens)
+    cache = get_verified_cache()
+    negative = get_negative_cache()
+    prefix_filter = get_prefix_filter()
+    results: dict[str, TokenAuthResult] = {}
+    parsed: dict[str, tuple[str, str, str | None]] = {}
+    for raw_token in dict.fromkeys(raw_tokens):
+        try:
+            prefix, secret = _parse_raw_token(raw_token)
+            digest = None
+            if cache is not None or negative is not None:
+                digest = token_digest(raw_token)
+            _check_negative(negative, prefix, digest)
+            _check_prefix_filter(prefix_filter, prefix)
+        except TokenAuthError as exc:
+            results[raw_token] = TokenAuthResult(error=exc)
+            continue
+        parsed[raw_token] = (prefix, secret, digest)
+
+    rows = {}
+    if parsed:
+        queryset = _auth_queryset(lock=False).filter(
+            prefix__in={prefix for prefix, _, _ in parsed.values()}
+        )
+        prefetch = not has_scope_column(queryset.model)
+        if prefetch:
+            queryset = queryset.prefetch_related("scopes")
+        for token in queryset:
+            if prefetch:
+                # read from the prefetch; get_token_scopes would issue its own query.
+                token._keysmith_scope_codenames = frozenset(
+                    scope.codename for scope in token.scopes.all()
+                )
+            else:
+                token._keysmith_scope_codenames = frozenset(token.scope_codenames)
+            rows[token.prefix] = token
+
+    pending = {}
+    for raw_token, (prefix, secret, digest) in parsed.items():
+        token = rows.get(prefix)
+        try:
+            if token is None:
+                raise _rejected(negative, prefix, _token_not_found())
+            error = _token_state_error(token)
+            if error is not None:
+                raise _rejected(negative, prefix, error)
+            if cache is not None and cache.contains(digest, token.key):
+                results[raw_token] = TokenAuthResult(token=token)
+                continue
+        except TokenAuthError as exc:
+            results[raw_token] = TokenAuthResult(error=exc)
+            continue
+        hasher, verifier = _select_verifier(token)
+        future = get_thread_executor().submit(run_verify, verifier, secret, token.key)
+        pending[raw_token] = (token, secret, digest, hasher, future)
+
+    for raw_token, (token, secret, digest, hasher, future) in pending.items():
+        try:
+            verified = future.result()
+        except HasherUnavailable as exc:
+            results[raw_token] = TokenAuthResult(error=VerificationUnavailable(str(exc)))
+            continue
+        if not verified:
+            error = _rejected(negative, token.prefix, _verification_failed(), digest=digest)
+            results[raw_token] = TokenAuthResult(error=error)
+            continue
+        # upgrades and cache writes stay on this thread and its DB connection.
+        if _needs_upgrade(token):
+            upgrade_token_hash(token, secret, hasher=hasher)
+        if cache is not None:
+            cache.add(digest, token.prefix, token.key)
+        results[raw_token] = TokenAuthResult(token=token)
+
+    mark_tokens_used(
+        {result.token.pk: result.token for result in results.values() if result.ok}.values()
+    )
+    return [results[raw_token] for raw_token in raw_tokens]
+
+
+def _parse_raw_token(raw_token: str) -> tuple[str, str]:
     if not raw_token:
         raise InvalidToken("No token provided. Please include a valid authentication token.")
 
     try:
-        prefix, secret = extract_prefix_and_secret(raw_token)
+        return extract_prefix_and_secret(raw_token)
     except ValueError as exc:
         raise InvalidToken(
             f"Token format is invalid: {exc}. Expected format: 'prefix_secret'"
         ) from exc
 
+
+def _screen(raw_token: str):
+    """Parse ``raw_token`` and refuse remembered failures before any database work.
+
+    Returns ``(prefix, secret, digest, negative_cache)``; ``digest`` is only
+    computed when one of the caches needs it. With ``PREFIX_FILTER`` enabled,
+    a prefix that was definitely never issued is rejected here as well.
+    """
+    prefix, secret, digest, negative = _parse_and_digest(raw_token)
+    _check_negative(negative, prefix, digest)
+    _check_prefix_filter(get_prefix_filter(), prefix)
+    return prefix, secret, digest, negative
+
+
+async def _ascreen(raw_token: str):
+    """Async counterpart of :func:`_screen`; shared cache reads stay off the event loop."""
+    prefix, secret, digest, negative = _parse_and_digest(raw_token)
+    if negative is not None and not negative.is_local:
+        await sync_to_async(_check_negative)(negative, prefix, digest)
+    else:
+        _check_negative(negative, prefix, digest)
+    prefix_filter = get_prefix_filter()
+    if prefix_filter is not None and not await prefix_filter.amight_exist(prefix):
+        raise _token_not_found()
+    return prefix, secret, digest, negative
+
+
+def _parse_and_digest(raw_token: str):
+    prefix, secret = _parse_raw_token(raw_token)
+    negative = get_negative_cache()
+    keyed = (
+        negative,
+        get_verified_cache(),
+        get_shared_cache(),
+        get_single_flight(),
+        get_breaker(),
+    )
+    digest = token_digest(raw_token) if any(layer is not None for layer in keyed) else None
+    return prefix, secret, digest, negative
+
+
+def _authenticate(raw_token: str, prefix: str, secret: str, digest, negative, *, lock: bool):
+    shared = get_shared_cache()
+    if shared is None:
+        token = _authenticate_from_db(
+            raw_token, prefix, secret, lock=lock, digest=digest, negative=negative
+        )
+        mark_token_used(token)
+        return token
+
+    token, version, stale = shared.lookup(prefix, digest)
+    acquired = False
+    if token is None:
+        acquired = shared.acquire(prefix, digest)
+        if not acquired:
+            token, version = shared.wait(prefix, digest)
+
+    if token is not None:
+        _check_token_state(token)
+        if stale:
+            stats.increment("stale_serves")
+            if shared.acquire(prefix, digest):
+                _revalidate_in_background(raw_token, prefix, secret, digest, version)
+        mark_token_used(token)
+        return token
+
     try:
-        Token = get_token_model()
-        token = Token.objects.select_for_update().get(prefix=prefix)
+        token = _authenticate_from_db(
+            raw_token, prefix, secret, lock=lock, digest=digest, negative=negative
+        )
+        shared.set(token, digest, version, token._keysmith_scope_codenames)
+    finally:
+        if acquired:
+            shared.release(prefix, digest)
+
+    mark_token_used(token)
+    return token
+
+
+def _revalidate_in_background(raw_token: str, prefix: str, secret: str, digest, version):
+    threading.Thread(
+        target=_revalidate_thread,
+        args=(raw_token, prefix, secret, digest, version),
+        name="keysmith-revalidate",
+        daemon=True,
+    ).start()
+
+
+def _revalidate(raw_token: str, prefix: str, secret: str, digest, version):
+    """Refresh a stale shared record; the caller holds its fill lock."""
+    shared = get_shared_cache()
+    try:
+        token = _authenticate_from_db(raw_token, prefix, secret, lock=False, digest=digest)
+    except TokenAuthError:
+        shared.discard(prefix, digest)
+    except Exception:
+        logger.exception("Failed to revalidate Keysmith token record")
+    else:
+        shared.set(token, digest, version, token._keysmith_scope_codenames)
+    finally:
+        shared.release(prefix, digest)
+
+
+def _revalidate_thread(*args):
+    try:
+        _revalidate(*args)
+    finally:
+        connection.close()
+
+
+def _guarded(digest, authenticate):
+    breaker = get_breaker()
+    if breaker is None:
+        return authenticate()
+    if not breaker.allow():
+        return _serve_during_outage(digest)
+    try:
+        token = authenticate()
+    except (DatabaseError, InterfaceError) as exc:
+        breaker.record_failure()
+        return _serve_during_outage(digest, exc)
+    except TokenAuthError:
+        # the database answered; only the token was refused.
+        breaker.record_success()
+        raise
+    except BaseException:
+        # an unexpected error must not leave a half-open trial unresolved.
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    _remember_known(digest, token)
+    return token
+
+
+def _remember_known(digest, token) -> None:
+    known = get_known_tokens()
+    if known is not None:
+        known.add(digest, copy.copy(token))
+
+
+def _serve_during_outage(digest, exc: BaseException | None = None):
+    """Answer while the token store is failing: a known token or a refusal."""
+    known = get_known_tokens()
+    token = known.get(digest) if known is not None else None
+    if token is None:
+        stats.increment("outage_rejections")
+        raise VerificationUnavailable("Token store is unavailable.") from exc
+    _check_token_state(token)
+    stats.increment("outage_serves")
+    return copy.copy(token)
+
+
+def _authenticate_from_db(
+    raw_token: str, prefix: str, secret: str, *, lock: bool, digest=None, negative=None
+):
+    try:
+        Token = get_runtime().token_model
+        token = _auth_queryset(lock=lock).get(prefix=prefix)
     except Token.DoesNotExist as exc:
-        raise InvalidToken(
-            "This token doesn't exist or has been deleted. Please request a new token."
-        ) from exc
+        raise _rejected(negative, prefix, _token_not_found()) from exc
+
+    error = _token_state_error(token)
+    if error is not None:
+        raise _rejected(negative, prefix, error)
+
+    cache = get_verified_cache()
+    if cache is not None and digest is None:
+        digest = token_digest(raw_token)
+    if cache is None or not cache.contains(digest, token.key):
+        try:
+            _verify_secret(token, secret)
+        except VerificationUnavailable:
+            raise
+        except InvalidToken as exc:
+            _rejected(negative, prefix, exc, digest=digest)
+            raise
+        if cache is not None:
+            cache.add(digest, token.prefix, token.key)
+
+    token._keysmith_scope_codenames = get_token_scopes(token)
+    return token
 
+
+def _auth_queryset(*, lock: bool):
+    """Token rows for authentication: user joined in, ``description`` deferred."""
+    Token = get_runtime().token_model
+    queryset = Token.objects.select_related("user").defer("description")
+    if not lock:
+        return queryset
+    features = connections[queryset.db].features
+    if features.has_select_for_update_of:
+        return queryset.select_for_update(of=("self",))
+    if features.has_select_for_update:
+        # without OF the lock would extend to (or be refused on) the joined user row.
+        queryset = queryset.select_related(None)
+    return queryset.select_for_update()
+
+
+def _verify_secret(token, secret: str) -> None:
+    hasher, verifier = _select_verifier(token)
+    try:
+        verified = run_verify(verifier, secret, token.key)
+    except HasherUnavailable as exc:
+        raise VerificationUnavailable(str(exc)) from exc
+    if not verified:
+        raise _verification_failed()
+
+    if _needs_upgrade(token):
+        upgrade_token_hash(token, secret, hasher=hasher)
+
+
+def _select_verifier(token) -> tuple[BaseTokenHasher, BaseTokenHasher]:
+    """Return ``(configured_hasher, hasher_for_token_key)``.
+
+    A key with no known algorithm tag is verified by the configured hasher,
+    so custom backends that write untagged hashes keep working.
+    """
+    hashers = get_runtime().hashers
+    return hashers.default, hashers.verifier_for(token.key)
+
+
+def _needs_upgrade(token) -> bool:
+    return keysmith_settings.UPGRADE_HASHES and get_runtime().hashers.needs_update(token.key)
+
+
+def _verification_failed() -> InvalidToken:
+    return InvalidToken(
+        "Authentication failed. The token provided is not valid. "
+        "Please check your token and try again."
+    )
+
+
+def _token_not_found() -> InvalidToken:
+    return InvalidToken(
+        "This token doesn't exist or has been deleted. Please request a new token."
+    )
+
+
+def _check_negative(negative, prefix: str, digest: str | None) -> None:
+    if negative is not None:
+        error = negative.check(prefix, digest)
+        if error is not None:
+            raise error
+
+
+def _check_prefix_filter(prefix_filter, prefix: str) -> None:
+    if prefix_filter is not None and not prefix_filter.might_exist(prefix):
+        raise _token_not_found()
+
+
+def _rejected(negative, prefix: str, error: TokenAuthError, *, digest=None) -> TokenAuthError:
+    """Remember ``error`` in the negative cache (prefix-wide unless ``digest``) and return it."""
+    if negative is not None:
+        negative.reject(prefix, error, digest=digest)
+    return error
+
+
+async def _arejected(
+    negative, prefix: str, error: TokenAuthError, *, digest=None
+) -> TokenAuthError:
+    """Async counterpart of :func:`_rejected`."""
+    if negative is not None and not negative.is_local:
+        await sync_to_async(negative.reject)(prefix, error, digest=digest)
+        return error
+    return _rejected(negative, prefix, error, digest=digest)
+
+
+def _token_state_error(token) -> TokenAuthError | None:
     if token.revoked or token.purged:
-        raise RevokedToken(
+        return RevokedToken(
             "This token has been revoked and can no longer be used. "
             "Please request a new token to continue."
         )
 
     if token.is_expired:
-        raise ExpiredToken(
+        return ExpiredToken(
             f"This token expired on {token.expires_at}. Please request a new token to continue."
         )
+    return None
 
-    hasher: BaseTokenHasher = get_hasher()
-    if not hasher.verify(secret, token.key):
-        raise InvalidToken(
-            "Authentication failed. The token provided is not valid. "
-            "Please check your token and try again."
-        )
 
-    mark_token_used(token)
-    return token
+def _check_token_state(token) -> None:
+    error = _token_state_error(token)
+    if error is not None:
+        raise error
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from keysmith.auth.exceptions import (
+    ExpiredToken,
+    InvalidToken,
+    RevokedToken,
+    TokenAuthError,
+)
+from keysmith.auth.resilience import forget_known_token
+from keysmith.runtime import get_runtime
+from keysmith.settings import keysmith_settings
+
+_DIGEST_SALT = "keysmith.auth.cache.token_digest"
+
+
+def token_digest(raw_token: str) -> str:
+    """Return a keyed digest of a presented raw token.
+
+    The digest is derived from ``SECRET_KEY`` so cache keys never expose the
+    secret and cannot be precomputed by someone who only sees the cache.
+    """
+    return salted_hmac(_DIGEST_SALT, raw_token, algorithm="sha256").hexdigest()
+
+
+class VerifiedTokenCache:
+    """Bounded, thread-safe LRU of successful secret verifications.
+
+    Entries map a token digest to the stored ``key`` hash it was verified
+    against. A hit only skips the hasher; the token row is still read, so a
+    rotated key or a revoked token is never served from here.
+    """
+
+    def __init__(self, *, ttl: float, max_entries: int, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def contains(self, digest: str, key: str) -> bool:
+        """Return whether ``digest`` was recently verified against ``key``."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return False
+
+            _, cached_key, expires = entry
+            if expires <= self._clock() or cached_key != key:
+                del self._entries[digest]
+                return False
+
+            self._entries.move_to_end(digest)
+            return True
+
+    def add(self, digest: str, prefix: str, key: str) -> None:
+        with self._lock:
+            self._entries[digest] = (prefix, key, self._clock() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        with self._lock:
+            stale = [digest for digest, entry in self._entries.items() if entry[0] == prefix]
+            for digest in stale:
+                del self._entries[digest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_verified_cache: VerifiedTokenCache | None = None
+
+
+def get_verified_cache() -> VerifiedTokenCache | None:
+    """Return the per-process verification cache, or ``None`` when disabled."""
+    global _verified_cache
+
+    ttl = keysmith_settings.VERIFIED_CACHE_TTL
+    if not ttl:
+        return None
+
+    max_entries = keysmith_settings.VERIFIED_CACHE_MAX_ENTRIES
+    cache = _verified_cache
+    if cache is None or cache.ttl != ttl or cache.max_entries != max_entries:
+        cache = _verified_cache = VerifiedTokenCache(ttl=ttl, max_entries=max_entries)
+    return cache
+
+
+class SharedTokenCache:
+    """Fleet-wide cache of verified token records in a Django cache alias.
+
+    A record holds only non-secret token state (id, prefix, user id, type,
+    expiry, revoke/purge flags and scope codenames) keyed by the token digest,
+    so any worker presenting the same raw token can skip both the row read and
+    the hasher. Every record is stamped with a per-prefix version; lifecycle
+    writes replace the version, which orphans all records for that prefix.
+
+    With ``stale_ttl`` set, a record outlives its ``ttl`` by that many seconds
+    and is reported as stale, so callers can serve it while one of them
+    refreshes it.
+    """
+
+    key_prefix = "keysmith"
+    record_fields = ("prefix", "user", "token_type", "expires_at", "revoked", "purged")
+    poll_interval = 0.05
+
+    def __init__(self, cache, *, ttl: float, lock_timeout: float, stale_ttl: float = 0):
+        self.cache = cache
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.stale_ttl = stale_ttl
+
+    def _record_key(self, prefix: str, digest: str) -> str:
+        return f"{self.key_prefix}:token:{prefix}:{digest}"
+
+    def _version_key(self, prefix: str) -> str:
+        return f"{self.key_prefix}:token-version:{prefix}"
+
+    def _lock_key(self, prefix: str, digest: str) -> str:
+        return f"{self.key_prefix}:token-lock:{prefix}:{digest}"
+
+    def get(self, prefix: str, digest: str):
+        """Return ``(token, version)`` for a presented token.
+
+        ``token`` is ``None`` on a miss or when the record is stale. ``version``
+        must be read before the database so that a concurrent lifecycle write
+        invalidates the record this caller is about to store.
+        """
+        token, version, stale = self.lookup(prefix, digest)
+        return (None if stale else token), version
+
+    def lookup(self, prefix: str, digest: str):
+        """Like :meth:`get`, but return stale records as ``(token, version, True)``."""
+        record_key = self._record_key(prefix, digest)
+        version_key = self._version_key(prefix)
+        found = self.cache.get_many([record_key, version_key])
+        version = found.get(version_key)
+        if version is None:
+            self.cache.add(version_key, secrets.token_hex(8), timeout=None)
+            return None, self.cache.get(version_key), False
+
+        record = found.get(record_key)
+        if record is None or record["version"] != version:
+            return None, version, False
+        stale = time.time() >= record.get("fresh_until", float("inf"))
+        return self._build_token(record), version, stale
+
+    def set(self, token, digest: str, version, scopes) -> None:
+        if version is None:
+            return
+
+        timeout = self.ttl
+        hard_timeout = self.ttl + self.stale_ttl
+        if token.expires_at is not None:
+            remaining = (token.expires_at - timezone.now()).total_seconds()
+            timeout = min(timeout, remaining)
+            hard_timeout = min(hard_timeout, remaining)
+        if timeout <= 0:
+            return
+
+        opts = token._meta
+        values = {opts.pk.attname: token.pk}
+        for name in self.record_fields:
+            field = opts.get_field(name)
+            values[field.attname] = field.value_from_object(token)
+
+        record = {
+            "version": version,
+            "values": values,
+            "scopes": tuple(scopes),
+            "fresh_until": time.time() + timeout,
+        }
+        self.cache.set(self._record_key(token.prefix, digest), record, timeout=hard_timeout)
+
+    def discard(self, prefix: str, digest: str) -> None:
+        self.cache.delete(self._record_key(prefix, digest))
+
+    def acquire(self, prefix: str, digest: str) -> bool:
+        """Take the fill lock for a cold token so only one worker verifies it."""
+        return self.cache.add(self._lock_key(prefix, digest), 1, timeout=self.lock_timeout)
+
+    def release(self, prefix: str, digest: str) -> None:
+        self.cache.delete(self._lock_key(prefix, digest))
+
+    def wait(self, prefix: str, digest: str):
+        """Wait for the lock holder to publish a record, returning ``(token, version)``.
+
+        Gives up as soon as the lock disappears without a record (the holder
+        failed) or after ``lock_timeout`` seconds.
+        """
+        record_key = self._record_key(prefix, digest)
+        lock_key = self._lock_key(prefix, digest)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            found = self.cache.get_many([record_key, lock_key])
+            if record_key in found or lock_key not in found:
+                break
+        return self.get(prefix, digest)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        self.cache.set(self._version_key(prefix), secrets.token_hex(8), timeout=None)
+
+    def _build_token(self, record):
+        Token = get_runtime().token_model
+        values = record["values"]
+        field_names = []
+        field_values = []
+        for field in Token._meta.concrete_fields:
+            if field.attname in values:
+                field_names.append(field.attname)
+                field_values.append(values[field.attname])
+
+        token = Token.from_db(router.db_for_read(Token), field_names, field_values)
+        token._keysmith_scope_codenames = frozenset(record["scopes"])
+        return token
+
+
+def get_shared_cache() -> SharedTokenCache | None:
+    """Return the shared record cache, or ``None`` when no alias is configured."""
+    alias = keysmith_settings.SHARED_CACHE_ALIAS
+    if not alias:
+        return None
+    return SharedTokenCache(
+        caches[alias],
+        ttl=keysmith_settings.SHARED_CACHE_TTL,
+        lock_timeout=keysmith_settings.SHARED_CACHE_LOCK_TIMEOUT,
+        stale_ttl=keysmith_settings.SHARED_CACHE_STALE_TTL,
+    )
+
+
+class NegativeTokenCache:
+    """Bounded, TTL-based memory of recent authentication failures.
+
+    Unknown, revoked and expired prefixes are rejected for any secret, while a
+    wrong secret is only remembered for its ``(prefix, digest)`` pair, so
+    guessing at a live prefix can never lock out its owner. Repeats are then
+    refused before the database or the hasher is touched. Entries for a prefix
+    are dropped when it is issued, rotated or otherwise changed.
+
+    Backed by a per-process ``LocMemCache`` or by a shared Django cache alias.
+    """
+
+    key_prefix = "keysmith"
+    max_digests = 16
+    error_classes = {cls.__name__: cls for cls in (InvalidToken, RevokedToken, ExpiredToken)}
+
+    def __init__(self, cache, *, ttl: float):
+        self.cache = cache
+        self.ttl = ttl
+
+    def _key(self, prefix: str) -> str:
+        return f"{self.key_prefix}:negative:{prefix}"
+
+    @property
+    def is_local(self) -> bool:
+        """Whether entries live in this process, so reads never block on I/O."""
+        return isinstance(self.cache, LocMemCache)
+
+    def check(self, prefix: str, digest: str | None) -> TokenAuthError | None:
+        """Return the remembered error for this prefix or secret, if any."""
+        entry = self.cache.get(self._key(prefix))
+        if entry is None:
+            return None
+        remembered = entry["prefix"] or entry["digests"].get(digest)
+        if remembered is None:
+            return None
+        name, message = remembered
+        return self.error_classes[name](message)
+
+    def reject(self, prefix: str, error: TokenAuthError, *, digest: str | None = None) -> None:
+        """Remember ``error`` for the whole prefix, or only for ``digest`` when given."""
+        name = error.__class__.__name__
+        if name not in self.error_classes:
+            return
+
+        key = self._key(prefix)
+        entry = self.cache.get(key) or {"prefix": None, "digests": {}}
+        if digest is None:
+            entry["prefix"] = (name, str(error))
+        else:
+            digests = entry["digests"]
+            digests[digest] = (name, str(error))
+            while len(digests) > self.max_digests:
+                del digests[next(iter(digests))]
+        self.cache.set(key, entry, timeout=self.ttl)
+
+    def forget(self, prefix: str) -> None:
+        self.cache.delete(self._key(prefix))
+
+
+_negative_cache: NegativeTokenCache | None = None
+
+
+def get_negative_cache() -> NegativeTokenCache | None:
+    """Return the failure cache, or ``None`` when ``NEGATIVE_CACHE_TTL`` is 0."""
+    global _negative_cache
+
+    ttl = keysmith_settings.NEGATIVE_CACHE_TTL
+    if not ttl:
+        return None
+
+    alias = keysmith_settings.NEGATIVE_CACHE_ALIAS
+    if alias:
+        return NegativeTokenCache(caches[alias], ttl=ttl)
+
+    max_entries = keysmith_settings.NEGATIVE_CACHE_MAX_ENTRIES
+    cache = _negative_cache
+    if cache is None or cache.ttl != ttl or cache.cache._max_entries != max_entries:
+        local = LocMemCache(
+            "keysmith-negative", {"TIMEOUT": ttl, "OPTIONS": {"MAX_ENTRIES": max_entries}}
+        )
+        # LocMemCache storage is shared by name, so a rebuilt cache starts empty.
+        local.clear()
+        cache = _negative_cache = NegativeTokenCache(local, ttl=ttl)
+    return cache
+
+
+def forget_failures(prefix: str) -> None:
+    """Drop remembered failures for ``prefix`` now and again on commit.
+
+    The second pass covers a request that saw the prefix as missing, revoked
+    or expired just before the issuing or updating transaction committed.
+    """
+    negative = get_negative_cache()
+    if negative is not None:
+        negative.forget(prefix)
+        transaction.on_commit(lambda: negative.forget(prefix))
+
+
+def invalidate_token(token) -> None:
+    """Drop cached verification state for ``token`` after a lifecycle change.
+
+    The shared version is replaced immediately and again on commit, so a
+    request that read the old row before the commit cannot publish a record
+    that outlives the change.
+    """
+    cache = _verified_cache
+    if cache is not None:
+        cache.invalidate_prefix(token.prefix)
+    forget_failures(token.prefix)
+    forget_known_token(token.prefix)
+
+    shared = get_shared_cache()
+    if shared is not None:
+        prefix = token.prefix
+        shared.invalidate_prefix(prefix)
+        transaction.on_commit(lambda: shared.invalidate_prefix(prefix))
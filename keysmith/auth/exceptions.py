@@ -12,3 +12,7 @@ class RevokedToken(TokenAuthError):
 
 class ExpiredToken(TokenAuthError):
     """Token has expired."""
+
+
+class VerificationUnavailable(TokenAuthError):
+    """Token could not be verified (hashing pool busy or timed out, or token store down)."""
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.core.cache import caches
+from django.db import connection
+
+from keysmith.models.utils import get_token_model
+from keysmith.settings import keysmith_settings
+
+logger = logging.getLogger("keysmith.auth")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives, which
+    costs about 1.8 MB per million items at the default 0.1%. Items cannot be
+    removed; a removed item only turns into a false positive.
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class PrefixFilter:
+    """Per-worker filter of issued, non-purged token prefixes.
+
+    A prefix that is definitely absent is rejected without a query. The filter
+    is built from a streaming ``values_list("prefix")`` scan (or adopted from
+    the copy published to ``PREFIX_FILTER_ALIAS``), updated by
+    ``create_token``, and rebuilt in the background every
+    ``PREFIX_FILTER_REBUILD_INTERVAL`` seconds. Until the first build
+    finishes every prefix is let through.
+
+    Tokens issued by other processes since the last build are covered by a
+    short-lived "recently issued" marker in ``PREFIX_FILTER_ALIAS``. Without
+    an alias, the filter is only safe in a single process.
+    """
+
+    key_prefix = "keysmith"
+    headroom = 2
+    min_capacity = 10_000
+
+    def __init__(self, *, error_rate: float, rebuild_interval: float, alias: str | None):
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.alias = alias
+        self.bloom: BloomFilter | None = None
+        self.built_at = 0.0
+        self._issued: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._building = False
+
+    @property
+    def _cache(self):
+        return caches[self.alias] if self.alias else None
+
+    def _filter_key(self) -> str:
+        return f"{self.key_prefix}:prefix-filter"
+
+    def _issued_key(self, prefix: str) -> str:
+        return f"{self.key_prefix}:issued:{prefix}"
+
+    def might_exist(self, prefix: str) -> bool:
+        """Return ``False`` only when ``prefix`` was definitely never issued."""
+        verdict = self._local_verdict(prefix)
+        if verdict is not None:
+            return verdict
+        return self._cache.get(self._issued_key(prefix)) is not None
+
+    async def amight_exist(self, prefix: str) -> bool:
+        """Async counterpart of :meth:`might_exist`; the shared marker is read with ``aget``."""
+        verdict = self._local_verdict(prefix)
+        if verdict is not None:
+            return verdict
+        return await self._cache.aget(self._issued_key(prefix)) is not None
+
+    def _local_verdict(self, prefix: str) -> bool | None:
+        """Answer from this worker's filter, or ``None`` when the shared marker decides."""
+        bloom = self.bloom
+        age = time.time() - self.built_at
+        if bloom is None or age >= self.rebuild_interval:
+            self.refresh_in_background()
+        if bloom is None or prefix in bloom:
+            return True
+        if not self.alias:
+            return False
+        if age >= 2 * self.rebuild_interval:
+            # markers only live two intervals, so an older filter cannot vouch for a miss.
+            return True
+        return None
+
+    def add(self, prefix: str) -> None:
+        """Record a newly issued prefix locally and for other workers."""
+        with self._lock:
+            self._issued[prefix] = time.time()
+            bloom = self.bloom
+            if bloom is not None:
+                bloom.add(prefix)
+        cache = self._cache
+        if cache is not None:
+            cache.set(self._issued_key(prefix), 1, timeout=2 * self.rebuild_interval)
+
+    def rebuild(self, *, publish: bool = True) -> BloomFilter:
+        """Scan issued prefixes into a fresh filter and swap it in."""
+        Token = get_token_model()
+        built_at = time.time()
+        queryset = Token.objects.filter(purged=False)
+        bloom = BloomFilter(
+            capacity=max(queryset.count() * self.headroom, self.min_capacity),
+            error_rate=self.error_rate,
+        )
+        for prefix in queryset.values_list("prefix", flat=True).iterator(chunk_size=10_000):
+            bloom.add(prefix)
+
+        self._install(bloom, built_at)
+        cache = self._cache
+        if publish and cache is not None:
+            cache.set(self._filter_key(), (built_at, bloom), timeout=None)
+        return bloom
+
+    def refresh(self) -> None:
+        """Adopt a newer published filter, or rebuild from the database."""
+        cache = self._cache
+        published = cache.get(self._filter_key()) if cache is not None else None
+        if published is not None and time.time() - published[0] < self.rebuild_interval:
+            self._install(published[1], published[0])
+            return
+        self.rebuild()
+
+    def refresh_in_background(self) -> None:
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(
+            target=self._refresh_thread, name="keysmith-prefix-filter", daemon=True
+        ).start()
+
+    def _refresh_thread(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Failed to rebuild Keysmith prefix filter")
+        finally:
+            self._building = False
+            connection.close()
+
+    def _install(self, bloom: BloomFilter, built_at: float) -> None:
+        # a prefix issued here may commit after the scan started; carry it over.
+        with self._lock:
+            horizon = built_at - self.rebuild_interval
+            self._issued = {p: t for p, t in self._issued.items() if t >= horizon}
+            for prefix in self._issued:
+                if prefix not in bloom:
+                    bloom.add(prefix)
+            self.bloom = bloom
+            self.built_at = built_at
+
+
+_prefix_filter: PrefixFilter | None = None
+_prefix_filter_lock = threading.Lock()
+
+
+def get_prefix_filter() -> PrefixFilter | None:
+    """Return the worker's prefix filter, or ``None`` when ``PREFIX_FILTER`` is off."""
+    global _prefix_filter
+
+    if not keysmith_settings.PREFIX_FILTER:
+        return None
+
+    error_rate = keysmith_settings.PREFIX_FILTER_ERROR_RATE
+    rebuild_interval = keysmith_settings.PREFIX_FILTER_REBUILD_INTERVAL
+    alias = keysmith_settings.PREFIX_FILTER_ALIAS
+    current = _prefix_filter
+    if (
+        current is not None
+        and current.error_rate == error_rate
+        and current.rebuild_interval == rebuild_interval
+        and current.alias == alias
+    ):
+        return current
+
+    with _prefix_filter_lock:
+        _prefix_filter = PrefixFilter(
+            error_rate=error_rate, rebuild_interval=rebuild_interval, alias=alias
+        )
+        return _prefix_filter
+
+
+def record_issued_prefix(prefix: str) -> None:
+    """Add a newly issued prefix to the filter; a no-op when it is disabled."""
+    prefix_filter = get_prefix_filter()
+    if prefix_filter is not None:
+        prefix_filter.add(prefix)
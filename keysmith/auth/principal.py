@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from django.utils import timezone
+
+from keysmith.auth.scopes import scope_registry
+from keysmith.auth.utils import get_token_scopes
+from keysmith.models.utils import get_token_model
+from keysmith.settings import keysmith_settings
+
+_UNSET = object()
+
+
+def _restore(cls, values):
+    return cls(**values)
+
+
+class TokenPrincipal:
+    """Immutable, picklable summary of an authenticated token.
+
+    Carries only what authorization needs: id, prefix, token type, user id,
+    scope codenames and expiry. The full token row and the user are loaded
+    on first access to :attr:`token` and :attr:`user`; a user already
+    joined by the auth pipeline is kept, so ``principal.user`` adds no query.
+
+    Works with ``keysmith_scopes`` and ``HasKeysmithScopes``. The scope mask
+    is process-local, so it is computed lazily and never pickled.
+    """
+
+    fields = ("id", "prefix", "token_type", "user_id", "scopes", "expires_at")
+    __slots__ = fields + ("_scope_mask", "_token", "_user")
+
+    def __init__(self, *, id, prefix, token_type, user_id, scopes, expires_at):
+        init = object.__setattr__
+        init(self, "id", id)
+        init(self, "prefix", prefix)
+        init(self, "token_type", token_type)
+        init(self, "user_id", user_id)
+        init(self, "scopes", frozenset(scopes))
+        init(self, "expires_at", expires_at)
+        init(self, "_scope_mask", None)
+        init(self, "_token", None)
+        init(self, "_user", _UNSET)
+
+    @classmethod
+    def from_token(cls, token) -> TokenPrincipal:
+        """Build a principal from an authenticated token without further queries."""
+        principal = cls(
+            id=token.pk,
+            prefix=token.prefix,
+            token_type=token.token_type,
+            user_id=token.user_id,
+            scopes=get_token_scopes(token),
+            expires_at=token.expires_at,
+        )
+        if type(token).user.is_cached(token):
+            object.__setattr__(principal, "_user", token.user)
+        return principal
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return _restore, (type(self), {name: getattr(self, name) for name in self.fields})
+
+    def __eq__(self, other):
+        if not isinstance(other, TokenPrincipal):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {self.prefix}>"
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_expired(self) -> bool:
+        return bool(self.expires_at and timezone.now() > self.expires_at)
+
+    @property
+    def scope_mask(self) -> int:
+        mask = self._scope_mask
+        if mask is None:
+            mask = scope_registry.mask(self.scopes)
+            object.__setattr__(self, "_scope_mask", mask)
+        return mask
+
+    @property
+    def token(self):
+        """The full token row, fetched on first access."""
+        token = self._token
+        if token is None:
+            token = get_token_model()._default_manager.get(pk=self.id)
+            object.__setattr__(self, "_token", token)
+        return token
+
+    @property
+    def user(self):
+        """The token's user, fetched on first access; ``None`` for userless tokens."""
+        user = self._user
+        if user is _UNSET:
+            user = None
+            if self.user_id is not None:
+                User = get_token_model()._meta.get_field("user").related_model
+                user = User._default_manager.filter(pk=self.user_id).first()
+            object.__setattr__(self, "_user", user)
+        return user
+
+
+def as_request_token(token):
+    """Return what the request should carry for ``token``.
+
+    A :class:`TokenPrincipal` when ``TOKEN_PRINCIPAL`` is enabled, otherwise
+    the token itself.
+    """
+    if keysmith_settings.TOKEN_PRINCIPAL:
+        return TokenPrincipal.from_token(token)
+    return token
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from keysmith.settings import keysmith_settings
+
+FAIL_CLOSED = "fail_closed"
+FAIL_OPEN_KNOWN = "fail_open_known"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker around the token database.
+
+    ``closed`` lets every call through. ``failure_threshold`` consecutive
+    database errors move it to ``open``, where calls are refused without
+    touching the database. After ``reset_timeout`` seconds one trial call is
+    let through (``half_open``); its outcome closes or re-opens the breaker.
+    A trial that never reports back is replaced after another
+    ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, *, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the database now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            now = self._clock()
+            if now - self._opened_at >= self.reset_timeout:
+                # open long enough, or the half-open trial is overdue: start a trial.
+                self._state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    stats.increment("breaker_opened")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class KnownTokens:
+    """Bounded LRU of recently verified tokens, honoured during an outage.
+
+    Keyed by token digest. Each entry holds a detached copy of the token as
+    it was verified and the time of that verification; entries older than
+    ``grace_period`` are never served.
+    """
+
+    def __init__(self, *, grace_period: float, max_entries: int, clock=time.monotonic):
+        self.grace_period = grace_period
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[object, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, digest: str, token) -> None:
+        with self._lock:
+            self._entries[digest] = (token, self._clock())
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, digest: str):
+        """Return the token verified for ``digest`` within the grace period, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            token, verified_at = entry
+            if self._clock() - verified_at > self.grace_period:
+                del self._entries[digest]
+                return None
+            return token
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        with self._lock:
+            stale = [d for d, (token, _) in self._entries.items() if token.prefix == prefix]
+            for digest in stale:
+                del self._entries[digest]
+
+
+class AuthStats:
+    """Thread-safe counters for monitoring the auth pipeline's fallbacks."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+stats = AuthStats()
+
+_breaker: CircuitBreaker | None = None
+_known_tokens: KnownTokens | None = None
+
+
+def get_breaker() -> CircuitBreaker | None:
+    """Return the process-wide breaker, or ``None`` when ``BREAKER_FAILURE_THRESHOLD`` is 0."""
+    global _breaker
+
+    threshold = keysmith_settings.BREAKER_FAILURE_THRESHOLD
+    if not threshold:
+        return None
+
+    reset_timeout = keysmith_settings.BREAKER_RESET_TIMEOUT
+    breaker = _breaker
+    if (
+        breaker is None
+        or breaker.failure_threshold != threshold
+        or breaker.reset_timeout != reset_timeout
+    ):
+        breaker = _breaker = CircuitBreaker(
+            failure_threshold=threshold, reset_timeout=reset_timeout
+        )
+    return breaker
+
+
+def get_known_tokens() -> KnownTokens | None:
+    """Return the outage fallback store when the policy is ``fail_open_known``."""
+    global _known_tokens
+
+    if get_breaker() is None or keysmith_settings.OUTAGE_POLICY != FAIL_OPEN_KNOWN:
+        return None
+
+    grace_period = keysmith_settings.OUTAGE_GRACE_PERIOD
+    max_entries = keysmith_settings.OUTAGE_MAX_KNOWN_TOKENS
+    known = _known_tokens
+    if known is None or known.grace_period != grace_period or known.max_entries != max_entries:
+        known = _known_tokens = KnownTokens(grace_period=grace_period, max_entries=max_entries)
+    return known
+
+
+def forget_known_token(prefix: str) -> None:
+    """Stop honouring ``prefix`` during an outage after a lifecycle change."""
+    known = _known_tokens
+    if known is not None:
+        known.invalidate_prefix(prefix)
+
+
+def get_resilience_stats() -> dict:
+    """Return breaker state and fallback counters for monitoring.
+
+    ``stale_serves`` counts shared records served past their TTL while a
+    refresh ran; ``outage_serves`` and ``outage_rejections`` count requests
+    answered from known tokens or refused while the database was failing;
+    ``breaker_opened`` counts transitions to ``open``.
+    """
+    breaker = _breaker if get_breaker() is not None else None
+    known = _known_tokens if get_known_tokens() is not None else None
+    counts = stats.snapshot()
+    return {
+        "breaker_state": breaker.state if breaker is not None else None,
+        "breaker_failures": breaker.failures if breaker is not None else 0,
+        "known_tokens": len(known) if known is not None else 0,
+        "stale_serves": counts.get("stale_serves", 0),
+        "outage_serves": counts.get("outage_serves", 0),
+        "outage_rejections": counts.get("outage_rejections", 0),
+        "breaker_opened": counts.get("breaker_opened", 0),
+    }
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+
+from keysmith.auth.utils import get_token_scopes
+
+
+class ScopeRegistry:
+    """Append-only mapping of scope codenames to bits for this process.
+
+    Bits are assigned on first sight and never reused or reset, so a mask
+    compiled at import time stays valid for the lifetime of the process.
+    Masks are process-local and must not be persisted or shared.
+    """
+
+    def __init__(self):
+        self._bits: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def bit(self, codename: str) -> int:
+        bit = self._bits.get(codename)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.setdefault(codename, 1 << len(self._bits))
+        return bit
+
+    def mask(self, codenames: Iterable[str]) -> int:
+        mask = 0
+        for codename in codenames:
+            mask |= self.bit(codename)
+        return mask
+
+    def seed(self, codenames: Iterable[str]) -> None:
+        """Reserve low bits for known codenames, in order."""
+        self.mask(codenames)
+
+
+scope_registry = ScopeRegistry()
+
+
+def compile_scopes(scopes: str | Iterable[str] | None) -> int:
+    """Compile required scope codenames into a mask, once per view or decorator."""
+    if isinstance(scopes, str):
+        scopes = (scopes,)
+    return scope_registry.mask(scopes or ())
+
+
+def get_token_scope_mask(token) -> int:
+    """Return the scope mask for ``token``, computed once and cached on the instance."""
+    mask = getattr(token, "scope_mask", None)
+    if mask is not None:
+        # a TokenPrincipal caches its own mask.
+        return mask
+    mask = token.__dict__.get("_keysmith_scope_mask")
+    if mask is None:
+        mask = token._keysmith_scope_mask = scope_registry.mask(get_token_scopes(token))
+    return mask
+
+
+def has_scopes(token, required_mask: int) -> bool:
+    """Return whether ``token`` grants every scope in ``required_mask``."""
+    return get_token_scope_mask(token) & required_mask == required_mask
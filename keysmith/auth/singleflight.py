@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import copy
+import threading
+from typing import Callable
+
+from keysmith.settings import keysmith_settings
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive its result (passed through
+    ``share``) or a copy of its exception, chained to the original. A caller that has waited
+    ``timeout`` seconds gives up and runs the function itself, so a stuck
+    leader cannot stall the rest indefinitely.
+    """
+
+    def __init__(self, *, timeout: float):
+        self.timeout = timeout
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: str, fn: Callable, *, share: Callable = lambda result: result):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                return fn()
+            if call.error is not None:
+                fresh = _fresh(call.error)
+                if fresh is None:
+                    raise call.error
+                raise fresh from call.error
+            return share(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+def _fresh(error: BaseException) -> BaseException | None:
+    # raising one instance from many threads would interleave their tracebacks.
+    try:
+        return copy.copy(error)
+    except Exception:
+        return None
+
+
+_single_flight: SingleFlight | None = None
+
+
+def get_single_flight() -> SingleFlight | None:
+    """Return the per-process single-flight group, or ``None`` when disabled."""
+    global _single_flight
+
+    timeout = keysmith_settings.SINGLE_FLIGHT_TIMEOUT
+    if not timeout:
+        return None
+
+    group = _single_flight
+    if group is None or group.timeout != timeout:
+        group = _single_flight = SingleFlight(timeout=timeout)
+    return group
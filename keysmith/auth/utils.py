@@ -4,3 +4,24 @@ from keysmith.settings import keysmith_settings
 def get_message(key: str, *, default: str | None = None) -> str:
     """Return an error message from settings with an optional fallback."""
     return keysmith_settings.DEFAULT_ERROR_MESSAGES.get(key, default or key)
+
+
+def get_token_scopes(token) -> frozenset[str]:
+    """Return the scope codenames granted to ``token``.
+
+    Prefers codenames already attached by the auth pipeline (for example from a
+    shared cache record), then the denormalized ``scope_codenames`` column, and
+    falls back to querying the ``scopes`` relation.
+    """
+    cached = getattr(token, "_keysmith_scope_codenames", None)
+    if cached is not None:
+        return cached
+
+    stored = getattr(token, "__dict__", {}).get("scope_codenames")
+    if stored is not None:
+        return frozenset(stored)
+
+    token_scopes_field = getattr(token, "scopes", None)
+    if hasattr(token_scopes_field, "values_list"):
+        return frozenset(token_scopes_field.values_list("codename", flat=True))
+    return frozenset(token_scopes_field or [])
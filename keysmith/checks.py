@@ -1,6 +1,9 @@
 from django.core.checks import Error, Warning, register
 
+from keysmith.auth.resilience import FAIL_CLOSED, FAIL_OPEN_KNOWN
+from keysmith.hashers.registry import get_hash_backends
 from keysmith.models.utils import get_audit_log_model, get_token_model
+from keysmith.settings import keysmith_settings
 
 
 @register()
@@ -66,6 +69,61 @@ def keysmith_model_contract_checks(app_configs, **kwargs):
     return errors
 
 
+@register()
+def check_hmac_peppers(app_configs, **kwargs):
+    """Ensure the HMAC hasher has a pepper to hash new tokens with."""
+    if not get_hash_backends()[0].endswith(".HMACSHA256TokenHasher"):
+        return []
+
+    peppers = {str(key): value for key, value in (keysmith_settings.HMAC_PEPPERS or {}).items()}
+    pepper_id = keysmith_settings.HMAC_PEPPER_ID
+    pepper_id = str(pepper_id) if pepper_id is not None else next(iter(peppers), None)
+    if pepper_id is None or not peppers.get(pepper_id):
+        return [
+            Error(
+                "HMACSHA256TokenHasher is configured but HMAC_PEPPERS has no pepper "
+                "for HMAC_PEPPER_ID.",
+                hint="Set KEYSMITH['HMAC_PEPPERS'] = {'v1': '<long random secret>'}.",
+                id="keysmith.E004",
+            )
+        ]
+    if "$" in str(pepper_id):
+        return [
+            Error(
+                "HMAC_PEPPER_ID must not contain '$'.",
+                id="keysmith.E007",
+            )
+        ]
+    return []
+
+
+@register()
+def check_scrypt_parameters(app_configs, **kwargs):
+    """Ensure the scrypt hasher's cost parameters are usable by ``hashlib.scrypt``."""
+    if not get_hash_backends()[0].endswith(".ScryptTokenHasher"):
+        return []
+
+    n = keysmith_settings.SCRYPT_N
+    r = keysmith_settings.SCRYPT_R
+    p = keysmith_settings.SCRYPT_P
+    valid = (
+        all(isinstance(value, int) and value > 0 for value in (n, r, p))
+        and n > 1
+        and n & (n - 1) == 0
+    )
+    if valid:
+        return []
+
+    return [
+        Error(
+            f"Invalid scrypt parameters: SCRYPT_N={n!r}, SCRYPT_R={r!r}, SCRYPT_P={p!r}.",
+            hint="SCRYPT_N must be a power of two greater than 1; SCRYPT_R and SCRYPT_P "
+            "must be positive integers.",
+            id="keysmith.E006",
+        )
+    ]
+
+
 @register()
 def check_sqlite_concurrency(app_configs, **kwargs):
     """Warn when SQLite is the default database.
@@ -80,10 +138,14 @@ def check_sqlite_concurrency(app_configs, **kwargs):
 
     This is harmless for sequential workloads (e.g. a single-worker dev
     server) but will surface as spurious auth failures under multi-threaded
-    or multi-process concurrency.  Use PostgreSQL or MySQL in production.
+    or multi-process concurrency.  Use PostgreSQL or MySQL in production, or
+    enable ``LOCK_FREE_AUTH`` which never issues SELECT FOR UPDATE.
     """
     from django.db import connections
 
+    if keysmith_settings.LOCK_FREE_AUTH:
+        return []
+
     try:
         vendor = connections["default"].vendor
     except Exception:
@@ -99,10 +161,53 @@ def check_sqlite_concurrency(app_configs, **kwargs):
                 "Use PostgreSQL or MySQL for production deployments.",
                 hint=(
                     "Switch DATABASE ENGINE to 'django.db.backends.postgresql' "
-                    "or 'django.db.backends.mysql', or run your dev server with "
-                    "a single worker and no concurrent auth load."
+                    "or 'django.db.backends.mysql', set KEYSMITH['LOCK_FREE_AUTH'] "
+                    "to True, or run your dev server with a single worker and no "
+                    "concurrent auth load."
                 ),
                 id="keysmith.W001",
             )
         ]
     return []
+
+
+@register()
+def check_prefix_filter_alias(app_configs, **kwargs):
+    """Warn when the prefix filter cannot see tokens issued by other processes.
+
+    Each worker's filter only learns about prefixes issued by other processes
+    on its next rebuild. ``PREFIX_FILTER_ALIAS`` carries short-lived
+    "recently issued" markers between them; without it a token created on
+    one worker is rejected by the others for up to a rebuild interval.
+    """
+    if not keysmith_settings.PREFIX_FILTER or keysmith_settings.PREFIX_FILTER_ALIAS:
+        return []
+
+    return [
+        Warning(
+            "KEYSMITH['PREFIX_FILTER'] is enabled without PREFIX_FILTER_ALIAS. "
+            "Tokens issued by another process are rejected by this worker until "
+            "its next filter rebuild.",
+            hint=(
+                "Set KEYSMITH['PREFIX_FILTER_ALIAS'] to a shared cache such as Redis "
+                "or Memcached, or only enable the filter in single-process deployments."
+            ),
+            id="keysmith.W002",
+        )
+    ]
+
+
+@register()
+def check_outage_policy(app_configs, **kwargs):
+    """Ensure ``OUTAGE_POLICY`` names a supported policy."""
+    policy = keysmith_settings.OUTAGE_POLICY
+    if policy in (FAIL_CLOSED, FAIL_OPEN_KNOWN):
+        return []
+
+    return [
+        Error(
+            f"KEYSMITH['OUTAGE_POLICY'] is {policy!r}, which is not a supported policy.",
+            hint=f"Use {FAIL_CLOSED!r} or {FAIL_OPEN_KNOWN!r}.",
+            id="keysmith.E005",
+        )
+    ]
@@ -1 +1 @@
-__all__ = ["decorator", "http", "middleware", "permissions"]
+__all__ = ["decorator", "exclusions", "http", "middleware", "permissions"]
@@ -1,9 +1,11 @@
 from functools import wraps
 from typing import Callable
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpRequest, HttpResponse
 
 from keysmith.auth.utils import get_message
+from keysmith.django.exclusions import mark_exempt
 from keysmith.django.http import HttpResponseUnauthorized
 
 
@@ -37,3 +39,23 @@ def keysmith_required(
         return wrapped
 
     return decorator(view_func) if view_func else decorator
+
+
+def keysmith_exempt(view_func: Callable) -> Callable:
+    """Mark a view so ``KeysmithAuthenticationMiddleware`` leaves it alone.
+
+    The view sees an empty auth context and no audit event is written. With
+    ``LAZY_AUTH`` the token is never looked up either.
+    """
+    if iscoroutinefunction(view_func):
+
+        async def wrapped(*args, **kwargs):
+            return await view_func(*args, **kwargs)
+
+        markcoroutinefunction(wrapped)
+    else:
+
+        def wrapped(*args, **kwargs):
+            return view_func(*args, **kwargs)
+
+    return mark_exempt(wraps(view_func)(wrapped))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+# flipped by keysmith_exempt, so views are only resolved early once one exists.
+_exempt_views_declared = False
+
+
+def mark_exempt(view_func):
+    """Flag ``view_func`` as excluded from ``KeysmithAuthenticationMiddleware``."""
+    global _exempt_views_declared
+
+    view_func.keysmith_exempt = True
+    _exempt_views_declared = True
+    return view_func
+
+
+class ExclusionRules:
+    """Compiled ``EXCLUDE`` rules for ``KeysmithAuthenticationMiddleware``.
+
+    Path prefixes and regexes are folded into one alternation and matched
+    against the start of ``request.path_info``, so a request is checked with
+    a single regex call however many rules there are. URL names are checked
+    against the resolved view, as are views marked with ``keysmith_exempt``.
+    """
+
+    def __init__(
+        self,
+        *,
+        paths: Iterable[str] = (),
+        regexes: Iterable[str] = (),
+        url_names: Iterable[str] = (),
+    ):
+        alternatives = [re.escape(path) for path in paths]
+        alternatives += [f"(?:{regex})" for regex in regexes]
+        self._match = re.compile("|".join(alternatives)).match if alternatives else None
+        self.url_names = frozenset(url_names)
+
+    @classmethod
+    def from_settings(cls, exclude: dict) -> ExclusionRules:
+        return cls(
+            paths=exclude.get("paths") or (),
+            regexes=exclude.get("regexes") or (),
+            url_names=exclude.get("url_names") or (),
+        )
+
+    @property
+    def has_view_rules(self) -> bool:
+        """Whether any request could be excluded by its resolved view."""
+        return bool(self.url_names) or _exempt_views_declared
+
+    def excludes_path(self, path: str) -> bool:
+        match = self._match
+        return match is not None and match(path) is not None
+
+    def excludes_view(self, view_func, resolver_match=None) -> bool:
+        if getattr(view_func, "keysmith_exempt", False):
+            return True
+        if not self.url_names or resolver_match is None:
+            return False
+        return (
+            resolver_match.url_name in self.url_names
+            or resolver_match.view_name in self.url_names
+        )
@@ -1,87 +1,252 @@
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.urls import Resolver404, resolve
+from django.utils.functional import SimpleLazyObject
+
 from keysmith.audit.logger import log_audit_event
-from keysmith.auth.base import authenticate_token
+from keysmith.auth.base import aauthenticate_token, authenticate_token
 from keysmith.auth.exceptions import TokenAuthError
-from keysmith.hooks import load_hook
-from keysmith.settings import keysmith_settings
+from keysmith.auth.principal import as_request_token
+from keysmith.runtime import get_runtime
+
+# strong references to fire-and-forget audit tasks so they are not collected mid-write.
+_background_tasks: set = set()
+
+
+async def _no_token():
+    return None
 
 
 class KeysmithAuthenticationMiddleware:
-    """Attach Keysmith auth context to each request and emit audit events."""
+    """Attach Keysmith auth context to each request and emit audit events.
+
+    Works under both WSGI and ASGI. When the rest of the chain is async, the
+    ORM lookup and usage update use the async ORM, hashing runs in a bounded
+    thread pool, and the audit row is written in the background so it does
+    not delay the response.
+
+    With ``LAZY_AUTH`` enabled, authentication is deferred until the request's
+    auth context is first read. Async views should ``await
+    request.akeysmith_token()`` rather than touch the lazy attributes.
+
+    Requests matching ``EXCLUDE`` path rules skip authentication and audit
+    entirely. Views matching ``EXCLUDE`` URL names or marked with
+    ``keysmith_exempt`` get an empty auth context and no audit event. In
+    eager mode a token-bearing request is resolved up front when such view
+    rules exist, so excluded views are never authenticated.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        runtime = get_runtime()
+        if runtime.exclusions.excludes_path(request.path_info):
+            self._exempt(request)
+            return self.get_response(request)
+        if self.async_mode:
+            return self.__acall__(request, runtime)
+
+        raw_token = self._prepare(request, runtime)
+        if raw_token:
+            if runtime.lazy_auth:
+                self._defer(request, raw_token)
+            elif self._excludes_view(request, runtime):
+                self._exempt(request)
+            else:
+                self._authenticate(request, raw_token)
+
+        response = self.get_response(request)
+
+        audit_event = self._audit_event(request, response)
+        if audit_event is not None:
+            log_audit_event(**audit_event)
+        return response
+
+    async def __acall__(self, request, runtime):
+        raw_token = self._prepare(request, runtime)
+        if raw_token:
+            if runtime.lazy_auth:
+                self._defer(request, raw_token)
+            elif self._excludes_view(request, runtime):
+                self._exempt(request)
+            else:
+                await self._aauthenticate(request, raw_token)
+
+        response = await self.get_response(request)
+
+        audit_event = self._audit_event(request, response)
+        if audit_event is not None:
+            task = asyncio.ensure_future(sync_to_async(log_audit_event)(**audit_event))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        exclusions = get_runtime().exclusions
+        if exclusions.excludes_view(view_func, getattr(request, "resolver_match", None)):
+            # with LAZY_AUTH this drops the pending lookup before it ever runs.
+            self._exempt(request)
+        return None
+
+    def _excludes_view(self, request, runtime) -> bool:
+        """Resolve the view before ``process_view`` so eager mode can skip excluded views."""
+        exclusions = runtime.exclusions
+        if not exclusions.has_view_rules:
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return False
+        return exclusions.excludes_view(match.func, match)
+
+    def _exempt(self, request) -> None:
         request.keysmith_token = None
         request.keysmith_user = None
         request.keysmith_auth_error = None
+        request.akeysmith_token = _no_token
         request._keysmith_audit_state = None
+        request._keysmith_raw_token = None
+        request._keysmith_skip_middleware_audit = True
 
-        raw_token = self._get_raw_token(request)
-        if raw_token:
-            try:
-                rate_limit_hook = load_hook("RATE_LIMIT_HOOK")
-                if rate_limit_hook is not None:
-                    rate_limit_hook(request=request, raw_token=raw_token)
-
-                token = authenticate_token(raw_token)
-            except TokenAuthError as exc:
-                request.keysmith_auth_error = exc
-                request._keysmith_audit_state = {
-                    "success": False,
-                    "error_code": exc.__class__.__name__.lower(),
-                }
-            else:
-                request.keysmith_token = token
-                request.keysmith_user = token.user
-                request._keysmith_audit_state = {
-                    "success": True,
-                    "token": token,
-                }
+    def _authenticate(self, request, raw_token: str) -> None:
+        try:
+            rate_limit_hook = get_runtime().rate_limit_hook
+            if rate_limit_hook is not None:
+                rate_limit_hook(request=request, raw_token=raw_token)
 
-        response = self.get_response(request)
+            token = authenticate_token(raw_token)
+        except TokenAuthError as exc:
+            self._set_failure(request, exc)
+        else:
+            self._set_success(request, token, token.user)
+
+    async def _aauthenticate(self, request, raw_token: str) -> None:
+        try:
+            rate_limit_hook = get_runtime().rate_limit_hook
+            if rate_limit_hook is not None:
+                await sync_to_async(rate_limit_hook)(request=request, raw_token=raw_token)
+
+            token = await aauthenticate_token(raw_token)
+        except TokenAuthError as exc:
+            self._set_failure(request, exc)
+        else:
+            user = await sync_to_async(getattr)(token, "user")
+            self._set_success(request, token, user)
+
+    def _defer(self, request, raw_token: str) -> None:
+        """Install lazy auth context that authenticates on first access.
+
+        Until something reads ``keysmith_token``, ``keysmith_user`` or
+        ``keysmith_auth_error`` (or awaits ``akeysmith_token()``), no lookup,
+        hash or rate-limit hook runs and no audit event is written. The first
+        access replaces all three attributes with their real values.
+        """
+        pending = [True]
+
+        def start() -> bool:
+            if not pending:
+                return False
+            pending.clear()
+            request.keysmith_token = None
+            request.keysmith_user = None
+            request.keysmith_auth_error = None
+            return True
+
+        def lazy(name):
+            def load():
+                if start():
+                    self._authenticate(request, raw_token)
+                return getattr(request, name)
+
+            return SimpleLazyObject(load)
+
+        async def akeysmith_token():
+            if start():
+                await self._aauthenticate(request, raw_token)
+            return request.keysmith_token
+
+        request.keysmith_token = lazy("keysmith_token")
+        request.keysmith_user = lazy("keysmith_user")
+        request.keysmith_auth_error = lazy("keysmith_auth_error")
+        request.akeysmith_token = akeysmith_token
 
+    def _prepare(self, request, runtime) -> str | None:
+        request.keysmith_token = None
+        request.keysmith_user = None
+        request.keysmith_auth_error = None
+        request._keysmith_audit_state = None
+
+        async def akeysmith_token():
+            return request.keysmith_token
+
+        request.akeysmith_token = akeysmith_token
+        # lets KeysmithAuthentication reuse this request's outcome for the same token.
+        request._keysmith_raw_token = raw_token = self._get_raw_token(request, runtime)
+        return raw_token
+
+    def _set_failure(self, request, exc: TokenAuthError) -> None:
+        request.keysmith_auth_error = exc
+        request._keysmith_audit_state = {
+            "success": False,
+            "error_code": exc.__class__.__name__.lower(),
+        }
+
+    def _set_success(self, request, token, user) -> None:
+        token = as_request_token(token)
+        request.keysmith_token = token
+        request.keysmith_user = user
+        request._keysmith_audit_state = {
+            "success": True,
+            "token": token,
+        }
+
+    def _audit_event(self, request, response) -> dict | None:
+        """Return `log_audit_event` kwargs for this request, or None when nothing is logged."""
         if getattr(request, "_keysmith_skip_middleware_audit", False):
-            return response
+            return None
 
         state = getattr(request, "_keysmith_audit_state", None)
         if not state:
             if getattr(request, "_keysmith_auth_required", False) and not getattr(
                 request, "keysmith_token", None
             ):
-                log_audit_event(
-                    action="auth_failed",
-                    request=request,
-                    status_code=response.status_code,
-                    extra={"error_code": "missing_token"},
-                )
-            return response
+                return {
+                    "action": "auth_failed",
+                    "request": request,
+                    "status_code": response.status_code,
+                    "extra": {"error_code": "missing_token"},
+                }
+            return None
 
         if state["success"]:
-            log_audit_event(
-                action="auth_success",
-                request=request,
-                token=state["token"],
-                status_code=response.status_code,
-            )
-        else:
-            log_audit_event(
-                action="auth_failed",
-                request=request,
-                status_code=response.status_code,
-                extra={"error_code": state["error_code"]},
-            )
-
-        return response
+            return {
+                "action": "auth_success",
+                "request": request,
+                "token": state["token"],
+                "status_code": response.status_code,
+            }
+        return {
+            "action": "auth_failed",
+            "request": request,
+            "status_code": response.status_code,
+            "extra": {"error_code": state["error_code"]},
+        }
 
-    def _get_raw_token(self, request) -> str | None:
-        header_name: str = keysmith_settings.HEADER_NAME
-        raw = request.META.get(header_name)
+    def _get_raw_token(self, request, runtime) -> str | None:
+        raw = request.META.get(runtime.header_name)
 
         if raw:
             return raw.strip()
 
-        if keysmith_settings.ALLOW_QUERY_PARAM:
-            return request.GET.get(keysmith_settings.QUERY_PARAM_NAME)
+        if runtime.allow_query_param:
+            return request.GET.get(runtime.query_param_name)
 
         return None
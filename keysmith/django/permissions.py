@@ -4,6 +4,7 @@ from typing import Callable
 from django.core.exceptions import PermissionDenied
 from django.http import HttpRequest, HttpResponse
 
+from keysmith.auth.scopes import compile_scopes, has_scopes
 from keysmith.auth.utils import get_message
 from keysmith.django.http import HttpResponseUnauthorized
 
@@ -18,7 +19,7 @@ def keysmith_scopes(*required_scopes: str) -> Callable:
         def view(request): ...
     """
 
-    required = set(required_scopes)
+    required_mask = compile_scopes(required_scopes)
 
     def decorator(view_func: Callable) -> Callable:
         @wraps(view_func)
@@ -28,14 +29,7 @@ def keysmith_scopes(*required_scopes: str) -> Callable:
             if not token:
                 return HttpResponseUnauthorized(get_message("missing_token"))
 
-            token_scopes_field = getattr(token, "scopes", None)
-            if hasattr(token_scopes_field, "values_list"):
-                token_scopes = set(token_scopes_field.values_list("codename", flat=True))
-            else:
-                token_scopes = set(token_scopes_field or [])
-            missing = required - token_scopes
-
-            if missing:
+            if not has_scopes(token, required_mask):
                 raise PermissionDenied(get_message("insufficient_scope"))
 
             return view_func(request, *args, **kwargs)
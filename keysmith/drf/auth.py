@@ -12,33 +12,45 @@ except Exception as exc:
 from keysmith.audit.logger import log_audit_event
 from keysmith.auth.base import authenticate_token
 from keysmith.auth.exceptions import TokenAuthError
+from keysmith.auth.principal import as_request_token
 from keysmith.auth.utils import get_message
-from keysmith.hooks import load_hook
-from keysmith.settings import keysmith_settings
+from keysmith.runtime import get_runtime
 
 
 class KeysmithAuthentication(BaseAuthentication):
-    """Authenticate DRF requests using Keysmith tokens from configured header."""
+    """Authenticate DRF requests using Keysmith tokens from configured header.
+
+    When ``KeysmithAuthenticationMiddleware`` already handled the same token
+    for this request, its result is reused, so mixed stacks authenticate once.
+    """
 
     def authenticate_header(self, request) -> str:
         """Return auth header name so DRF can emit 401 responses when required."""
-        return keysmith_settings.HEADER_NAME.replace("HTTP_", "").replace("_", "-")
+        return get_runtime().drf_header_name
 
     def authenticate(self, request):
         # prevent duplicate audit records when middleware is also enabled.
         if hasattr(request, "_request"):
             request._request._keysmith_skip_middleware_audit = True
 
-        header_name = keysmith_settings.HEADER_NAME.replace("HTTP_", "").replace("_", "-")
-        raw = request.headers.get(header_name)
-        if not raw and keysmith_settings.ALLOW_QUERY_PARAM:
-            raw = request.query_params.get(keysmith_settings.QUERY_PARAM_NAME)
+        runtime = get_runtime()
+        raw = request.headers.get(runtime.drf_header_name)
+        if not raw and runtime.allow_query_param:
+            raw = request.query_params.get(runtime.query_param_name)
         if not raw:
             return None
+        raw = raw.strip()
 
         try:
-            token = authenticate_token(raw.strip())
-            throttle_hook = load_hook("DRF_THROTTLE_HOOK")
+            reused = self._middleware_result(request, raw)
+            if reused is None:
+                token = as_request_token(authenticate_token(raw))
+                user = token.user
+            else:
+                token, user, error = reused
+                if error is not None:
+                    raise error
+            throttle_hook = runtime.drf_throttle_hook
             if throttle_hook is not None:
                 throttle_hook(request=request, token=token)
         except TokenAuthError as exc:
@@ -64,7 +76,6 @@ class KeysmithAuthentication(BaseAuthentication):
             token=token,
             status_code=200,
         )
-        user = token.user
         if user is None:
             unauthenticated_user = api_settings.UNAUTHENTICATED_USER
             user = (
@@ -73,5 +84,22 @@ class KeysmithAuthentication(BaseAuthentication):
 
         return (user, token)
 
+    def _middleware_result(self, request, raw_token: str):
+        """Return ``(token, user, error)`` from the middleware for this token, if it ran.
+
+        ``KeysmithAuthenticationMiddleware`` records the raw token it handled;
+        when it matches, its outcome is reused instead of authenticating again.
+        """
+        django_request = getattr(request, "_request", None)
+        if getattr(django_request, "_keysmith_raw_token", None) != raw_token:
+            return None
+        # reading the token resolves a lazy middleware context.
+        bool(django_request.keysmith_token)
+        return (
+            django_request.keysmith_token,
+            django_request.keysmith_user,
+            django_request.keysmith_auth_error,
+        )
+
 
 __all__ = ["KeysmithAuthentication"]
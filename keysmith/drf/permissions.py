@@ -9,6 +9,7 @@ except Exception as exc:
     ) from exc
 
 from keysmith.audit.logger import log_audit_event
+from keysmith.auth.scopes import compile_scopes, has_scopes
 from keysmith.auth.utils import get_message
 
 
@@ -38,11 +39,15 @@ class HasKeysmithScopes(BasePermission):
 
     required_scopes: set[str] = set()
 
-    def _required_scopes_for_view(self, view) -> set[str]:
+    def _required_mask_for_view(self, view) -> int:
+        # compiled once per view class; recompiled only if required_scopes is swapped.
         raw_scopes = getattr(view, "required_scopes", self.required_scopes)
-        if isinstance(raw_scopes, str):
-            return {raw_scopes}
-        return set(raw_scopes or [])
+        view_class = type(view)
+        compiled = view_class.__dict__.get("_keysmith_required_mask")
+        if compiled is None or compiled[0] is not raw_scopes:
+            compiled = (raw_scopes, compile_scopes(raw_scopes))
+            view_class._keysmith_required_mask = compiled
+        return compiled[1]
 
     def has_permission(self, request, view) -> bool:
         token = getattr(request, "auth", None)
@@ -50,18 +55,11 @@ class HasKeysmithScopes(BasePermission):
         if not token:
             return False
 
-        required_scopes = self._required_scopes_for_view(view)
-        if not required_scopes:
+        required_mask = self._required_mask_for_view(view)
+        if not required_mask:
             return True
 
-        token_scopes_field = getattr(token, "scopes", None)
-        if hasattr(token_scopes_field, "values_list"):
-            token_scopes = set(token_scopes_field.values_list("codename", flat=True))
-        else:
-            token_scopes = set(token_scopes_field or [])
-        missing = required_scopes - token_scopes
-
-        if missing:
+        if not has_scopes(token, required_mask):
             raise PermissionDenied(get_message("insufficient_scope"))
 
         return True
@@ -1,3 +1,5 @@
+from .hmac_sha256 import HMACSHA256TokenHasher
 from .pbkdf2 import PBKDF2SHA512TokenHasher
+from .scrypt import ScryptTokenHasher
 
-__all__ = ["PBKDF2SHA512TokenHasher"]
+__all__ = ["HMACSHA256TokenHasher", "PBKDF2SHA512TokenHasher", "ScryptTokenHasher"]
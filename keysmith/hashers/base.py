@@ -6,6 +6,15 @@ class BaseTokenHasher(ABC):
     Base interface for token hashers.
     """
 
+    #: Tag written as the first ``$``-separated field of every encoded hash.
+    algorithm: str = ""
+
+    #: ``KEYSMITH`` setting that controls the cost of new hashes, if any.
+    cost_setting: str = ""
+
+    #: Values of ``cost_setting`` tried by ``keysmith_calibrate_hasher``, cheapest first.
+    cost_candidates: tuple = ()
+
     @abstractmethod
     def hash(self, secret: str) -> str:
         """
@@ -19,3 +28,17 @@ class BaseTokenHasher(ABC):
         Verify a raw token secret against a stored hash.
         """
         raise NotImplementedError
+
+    def with_cost(self, cost) -> "BaseTokenHasher":
+        """
+        Return a copy of this hasher that hashes new secrets at ``cost``.
+
+        Backends that set ``cost_setting`` must override this.
+        """
+        raise NotImplementedError
+
+    def must_update(self, hashed: str) -> bool:
+        """
+        Return whether a hash produced by this backend uses outdated parameters.
+        """
+        return False
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import platform
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.utils.module_loading import import_string
+
+from keysmith.settings import keysmith_settings
+from keysmith.utils.tokens import generate_raw_secret
+
+
+def measure(hasher, *, threads: int, samples: int) -> dict:
+    """Time ``samples`` verifies on each of ``threads`` threads against one stored hash.
+
+    Returns p50/p99 latency per verify and throughput per core, where the
+    core count is capped by the number of threads actually running.
+    """
+    secret = generate_raw_secret(keysmith_settings.TOKEN_SECRET_LENGTH)
+    hashed = hasher.hash(secret)
+    hasher.verify(secret, hashed)
+    start_line = threading.Barrier(threads)
+
+    def worker():
+        latencies = []
+        start_line.wait()
+        for _ in range(samples):
+            started = time.perf_counter()
+            hasher.verify(secret, hashed)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        started = time.perf_counter()
+        futures = [executor.submit(worker) for _ in range(threads)]
+        latencies = [latency for future in futures for latency in future.result()]
+        elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    cores = min(threads, os.cpu_count() or 1)
+    return {
+        "threads": threads,
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        "hashes_per_sec_per_core": round(len(latencies) / elapsed / cores, 1),
+    }
+
+
+def calibrate_backend(
+    path: str, *, thread_counts: list[int], samples: int, target_ms: float
+) -> dict:
+    """Benchmark one backend across its cost candidates and recommend a cost.
+
+    Candidates are tried cheapest first and the sweep stops after the first
+    cost whose p99 misses ``target_ms`` at any thread count. The
+    recommendation is the most expensive cost that met the target at every
+    thread count, or ``None`` when none did.
+    """
+    hasher_class = import_string(path)
+    setting = hasher_class.cost_setting
+    report = {
+        "backend": path,
+        "algorithm": hasher_class.algorithm,
+        "cost_setting": setting or None,
+        "results": [],
+        "recommended": None,
+    }
+
+    if setting:
+        current = getattr(keysmith_settings, setting)
+        costs = sorted({*hasher_class.cost_candidates, current})
+    else:
+        costs = [None]
+
+    for cost in costs:
+        try:
+            hasher = hasher_class()
+            if setting:
+                hasher = hasher.with_cost(cost)
+            results = [
+                measure(hasher, threads=threads, samples=samples) for threads in thread_counts
+            ]
+        except Exception as exc:
+            report["error"] = f"{type(exc).__name__}: {exc}"
+            break
+        for result in results:
+            report["results"].append({"cost": cost, **result})
+        if any(result["p99_ms"] > target_ms for result in results):
+            break
+        report["recommended"] = {setting: cost} if setting else {}
+
+    return report
+
+
+def calibrate(
+    backends: list[str], *, thread_counts: list[int], samples: int, target_ms: float
+) -> dict:
+    """Benchmark ``backends`` on this machine and return a JSON-serializable report."""
+    return {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "target_ms": target_ms,
+        "thread_counts": thread_counts,
+        "samples": samples,
+        "backends": [
+            calibrate_backend(
+                path, thread_counts=thread_counts, samples=samples, target_ms=target_ms
+            )
+            for path in backends
+        ],
+    }
+
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+)
+from concurrent.futures.process import BrokenProcessPool
+
+from keysmith.hashers.base import BaseTokenHasher
+from keysmith.settings import keysmith_settings
+
+
+class HasherUnavailable(RuntimeError):
+    """Hashing could not run: the process pool queue is full or the job timed out."""
+
+
+_thread_executor: ThreadPoolExecutor | None = None
+_thread_executor_lock = threading.Lock()
+
+
+def get_thread_executor() -> ThreadPoolExecutor:
+    """Return the bounded thread pool used for async and batch verification.
+
+    ``hashlib`` releases the GIL while hashing, so a small pool keeps PBKDF2
+    from stalling the loop without competing with Django's own
+    ``sync_to_async`` thread for ORM work.
+    """
+    global _thread_executor
+
+    if _thread_executor is None:
+        with _thread_executor_lock:
+            if _thread_executor is None:
+                _thread_executor = ThreadPoolExecutor(
+                    max_workers=keysmith_settings.HASH_THREAD_WORKERS,
+                    thread_name_prefix="keysmith-hash",
+                )
+    return _thread_executor
+
+
+class _HashProcessPool:
+    """Process pool plus an in-flight counter that bounds queue depth."""
+
+    def __init__(self, *, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pid = os.getpid()
+        # spawn, not fork: children must not inherit DB connections or held locks.
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        for future in [self.executor.submit(_warm) for _ in range(workers)]:
+            future.result()
+
+    def run(self, fn, *args, timeout: float):
+        if not self.slots.acquire(blocking=False):
+            raise HasherUnavailable(
+                f"Token hashing queue is full ({self.queue_limit} jobs in flight)."
+            )
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        # a job that outlives its caller's timeout keeps its slot until it ends,
+        # so the bound covers work the pool is still doing.
+        future.add_done_callback(self._release_slot)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError as exc:
+            future.cancel()
+            raise HasherUnavailable(f"Token hashing did not finish within {timeout}s.") from exc
+
+    def _release_slot(self, future) -> None:
+        self.slots.release()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_process_pool: _HashProcessPool | None = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> _HashProcessPool | None:
+    global _process_pool
+
+    workers = keysmith_settings.HASH_PROCESS_WORKERS
+    if not workers:
+        return None
+
+    queue_limit = keysmith_settings.HASH_QUEUE_LIMIT
+    pool = _process_pool
+    if _pool_matches(pool, workers, queue_limit):
+        return pool
+
+    with _process_pool_lock:
+        pool = _process_pool
+        if not _pool_matches(pool, workers, queue_limit):
+            if pool is not None and pool.pid == os.getpid():
+                pool.shutdown()
+            pool = _process_pool = _HashProcessPool(workers=workers, queue_limit=queue_limit)
+    return pool
+
+
+def _pool_matches(pool: _HashProcessPool | None, workers: int, queue_limit: int) -> bool:
+    return (
+        pool is not None
+        and pool.pid == os.getpid()
+        and pool.workers == workers
+        and pool.queue_limit == queue_limit
+    )
+
+
+def _warm() -> None:
+    return None
+
+
+def _hash(hasher: BaseTokenHasher, secret: str) -> str:
+    return hasher.hash(secret)
+
+
+def _verify(hasher: BaseTokenHasher, secret: str, hashed: str) -> bool:
+    return hasher.verify(secret, hashed)
+
+
+def _run(fn, *args):
+    global _process_pool
+
+    pool = _get_process_pool()
+    if pool is None:
+        return fn(*args)
+
+    try:
+        return pool.run(fn, *args, timeout=keysmith_settings.HASH_TIMEOUT)
+    except BrokenProcessPool as exc:
+        _process_pool = None
+        raise HasherUnavailable("Token hashing worker pool crashed.") from exc
+
+
+def run_hash(hasher: BaseTokenHasher, secret: str) -> str:
+    """Hash ``secret``, in the process pool when ``HASH_PROCESS_WORKERS`` is set."""
+    return _run(_hash, hasher, secret)
+
+
+def run_verify(hasher: BaseTokenHasher, secret: str, hashed: str) -> bool:
+    """Verify ``secret``, in the process pool when ``HASH_PROCESS_WORKERS`` is set."""
+    return _run(_verify, hasher, secret, hashed)
+
+
+async def averify(hasher: BaseTokenHasher, secret: str, hashed: str) -> bool:
+    """Run :func:`run_verify` in the bounded hashing thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_executor(), run_verify, hasher, secret, hashed)
+
+
+def _reset_after_fork() -> None:
+    # a forked web worker must build its own pools; the parent's are unusable.
+    global _process_pool, _thread_executor
+    _process_pool = None
+    _thread_executor = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,3 +1,4 @@
+import copy
 import hashlib
 
 from django.contrib.auth.hashers import PBKDF2PasswordHasher
@@ -13,6 +14,10 @@ class PBKDF2SHA512TokenHasher(BaseTokenHasher):
     """
 
     algorithm = "pbkdf2_sha512"
+    cost_setting = "HASH_ITERATIONS"
+    cost_candidates = (
+        1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000, 500_000, 1_000_000,
+    )
 
     def __init__(self):
         self._hasher = PBKDF2PasswordHasher()
@@ -27,4 +32,23 @@ class PBKDF2SHA512TokenHasher(BaseTokenHasher):
         )
 
     def verify(self, secret: str, hashed: str) -> bool:
-        return self._hasher.verify(secret, hashed)
+        if not hashed.startswith(f"{self.algorithm}$"):
+            return False
+        try:
+            return self._hasher.verify(secret, hashed)
+        except ValueError:
+            return False
+
+    def with_cost(self, cost: int) -> "PBKDF2SHA512TokenHasher":
+        hasher = copy.copy(self)
+        hasher._hasher = copy.copy(self._hasher)
+        hasher._hasher.iterations = cost
+        return hasher
+
+    def must_update(self, hashed: str) -> bool:
+        if not hashed.startswith(f"{self.algorithm}$"):
+            return True
+        try:
+            return self._hasher.must_update(hashed)
+        except ValueError:
+            return True
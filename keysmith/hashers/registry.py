@@ -1,9 +1,113 @@
+from __future__ import annotations
+
+from django.core.signals import setting_changed
 from django.utils.module_loading import import_string
 
 from keysmith.hashers.base import BaseTokenHasher
 from keysmith.settings import keysmith_settings
 
+BUILTIN_HASH_BACKENDS = (
+    "keysmith.hashers.PBKDF2SHA512TokenHasher",
+    "keysmith.hashers.HMACSHA256TokenHasher",
+    "keysmith.hashers.ScryptTokenHasher",
+)
+
+
+def get_hash_backends() -> list[str]:
+    """Return the configured backend paths, the one used for new hashes first.
+
+    ``HASH_BACKENDS`` wins when set. Otherwise ``HASH_BACKEND`` is followed by
+    the built-in backends, so hashes written before a backend switch keep
+    verifying.
+    """
+    backends = keysmith_settings.HASH_BACKENDS
+    if not backends:
+        backends = (keysmith_settings.HASH_BACKEND, *BUILTIN_HASH_BACKENDS)
+    return list(dict.fromkeys(backends))
+
+
+class HasherRegistry:
+    """One cached instance per configured backend, dispatched by algorithm tag.
+
+    The first backend hashes new secrets. Stored hashes are verified by the
+    backend whose ``algorithm`` matches the hash's first ``$``-separated
+    field; if two backends share a tag, the earlier one wins. Hashes with no
+    known tag, such as those from a custom backend that writes none, go to
+    the default backend.
+    """
+
+    def __init__(self, backends):
+        self.hashers: list[BaseTokenHasher] = [import_string(path)() for path in backends]
+        if not self.hashers:
+            raise ValueError("At least one hash backend must be configured.")
+        self.default = self.hashers[0]
+        self._by_algorithm: dict[str, BaseTokenHasher] = {}
+        for hasher in self.hashers:
+            self._by_algorithm.setdefault(hasher.algorithm, hasher)
+
+    def identify(self, hashed: str) -> BaseTokenHasher:
+        algorithm = hashed.split("$", 1)[0]
+        hasher = self._by_algorithm.get(algorithm)
+        if hasher is None:
+            raise ValueError(f"Unknown token hash algorithm: {algorithm!r}")
+        return hasher
+
+    def verifier_for(self, hashed: str) -> BaseTokenHasher:
+        """Return the backend tagged in ``hashed``, or the default when no tag matches."""
+        return self._by_algorithm.get(hashed.split("$", 1)[0], self.default)
+
+    def hash(self, secret: str) -> str:
+        return self.default.hash(secret)
+
+    def verify(self, secret: str, hashed: str) -> bool:
+        """Verify ``secret`` with the backend that produced ``hashed``."""
+        return self.verifier_for(hashed).verify(secret, hashed)
+
+    def needs_update(self, hashed: str) -> bool:
+        """Return whether ``hashed`` should be rewritten with the default backend.
+
+        True when it was produced by another configured backend or with
+        outdated parameters. Untagged hashes are left to the default
+        backend's ``must_update()``.
+        """
+        hasher = self.verifier_for(hashed)
+        return hasher is not self.default or hasher.must_update(hashed)
+
+
+_registry: HasherRegistry | None = None
+
+
+def get_registry() -> HasherRegistry:
+    """Return the process-wide registry, built on first use."""
+    global _registry
+
+    registry = _registry
+    if registry is None:
+        registry = _registry = HasherRegistry(get_hash_backends())
+    return registry
+
 
 def get_hasher() -> BaseTokenHasher:
-    hasher_cls = import_string(keysmith_settings.HASH_BACKEND)
-    return hasher_cls()
+    """Return the cached hasher used for new hashes."""
+    return get_registry().default
+
+
+def identify_hasher(hashed: str) -> BaseTokenHasher:
+    """Return the cached hasher able to verify ``hashed``, chosen by its algorithm tag."""
+    return get_registry().identify(hashed)
+
+
+def needs_update(hashed: str) -> bool:
+    """Return whether ``hashed`` should be rehashed with the default backend."""
+    return get_registry().needs_update(hashed)
+
+
+def _reset_registry(*, setting, **kwargs) -> None:
+    # hashers read their parameters from settings when they are built.
+    global _registry
+
+    if setting == "KEYSMITH":
+        _registry = None
+
+
+setting_changed.connect(_reset_registry)
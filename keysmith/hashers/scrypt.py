@@ -0,0 +1,82 @@
+import base64
+import copy
+import hashlib
+
+from django.utils.crypto import constant_time_compare, get_random_string
+
+from keysmith.settings import keysmith_settings
+
+from .base import BaseTokenHasher
+
+
+class ScryptTokenHasher(BaseTokenHasher):
+    """
+    Memory-hard scrypt hasher for deployments that require one.
+
+    Each verify needs about ``128 * N * r`` bytes of memory, which limits how
+    many guesses an attacker can run in parallel on GPUs. ``SCRYPT_N``,
+    ``SCRYPT_R`` and ``SCRYPT_P`` set the cost of new hashes. Encoded hashes
+    carry their own parameters, so changing them does not break issued tokens.
+
+    Format: ``scrypt$<N>$<r>$<p>$<salt>$<base64 digest>``
+    """
+
+    algorithm = "scrypt"
+    salt_length = 16
+    dklen = 32
+    cost_setting = "SCRYPT_N"
+    cost_candidates = tuple(2**exponent for exponent in range(10, 19))
+
+    def __init__(self):
+        self.n = keysmith_settings.SCRYPT_N
+        self.r = keysmith_settings.SCRYPT_R
+        self.p = keysmith_settings.SCRYPT_P
+
+    @staticmethod
+    def memory_required(n: int, r: int, p: int) -> int:
+        """Bytes OpenSSL allocates for one derivation with these parameters."""
+        return 128 * r * (n + p + 2)
+
+    def _digest(self, secret: str, salt: str, n: int, r: int, p: int) -> str:
+        derived = hashlib.scrypt(
+            secret.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=self.memory_required(n, r, p),
+            dklen=self.dklen,
+        )
+        return base64.b64encode(derived).decode("ascii")
+
+    def _decode(self, hashed: str):
+        algorithm, n, r, p, salt, digest = hashed.split("$", 5)
+        if algorithm != self.algorithm:
+            raise ValueError(f"Not a {self.algorithm} hash.")
+        return int(n), int(r), int(p), salt, digest
+
+    def hash(self, secret: str) -> str:
+        salt = get_random_string(self.salt_length)
+        digest = self._digest(secret, salt, self.n, self.r, self.p)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${salt}${digest}"
+
+    def verify(self, secret: str, hashed: str) -> bool:
+        try:
+            n, r, p, salt, digest = self._decode(hashed)
+            expected = self._digest(secret, salt, n, r, p)
+        except ValueError:
+            return False
+
+        return constant_time_compare(digest, expected)
+
+    def with_cost(self, cost: int) -> "ScryptTokenHasher":
+        hasher = copy.copy(self)
+        hasher.n = cost
+        return hasher
+
+    def must_update(self, hashed: str) -> bool:
+        try:
+            n, r, p, _, _ = self._decode(hashed)
+        except ValueError:
+            return True
+        return (n, r, p) != (self.n, self.r, self.p)
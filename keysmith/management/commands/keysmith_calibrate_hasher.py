@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from keysmith.hashers.calibration import calibrate
+from keysmith.hashers.registry import get_hash_backends
+from keysmith.settings import keysmith_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the configured Keysmith hash backends on this machine across cost "
+        "settings and thread counts, and recommend the most expensive cost whose p99 "
+        "verify latency fits a target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=5.0,
+            help="Per-verify p99 latency budget in milliseconds (default: 5).",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            nargs="+",
+            help="Thread counts to measure (default: 1 and HASH_THREAD_WORKERS).",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=20,
+            help="Verifies timed per thread for each cost and thread count (default: 20).",
+        )
+        parser.add_argument(
+            "--backend",
+            action="append",
+            dest="backends",
+            help="Dotted path of a backend to measure; repeatable (default: configured backends).",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Write the report as JSON.",
+        )
+
+    def handle(self, *args, **options):
+        thread_counts = options["threads"] or [1, keysmith_settings.HASH_THREAD_WORKERS]
+        thread_counts = sorted(set(thread_counts))
+        if options["samples"] < 2 or thread_counts[0] < 1 or options["target_ms"] <= 0:
+            raise CommandError("--samples must be at least 2, --threads and --target-ms positive.")
+
+        report = calibrate(
+            options["backends"] or get_hash_backends(),
+            thread_counts=thread_counts,
+            samples=options["samples"],
+            target_ms=options["target_ms"],
+        )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        machine = report["machine"]
+        self.stdout.write(
+            f"{machine['processor']}, {machine['cpu_count']} CPUs, Python {machine['python']}; "
+            f"target p99 {report['target_ms']:g} ms"
+        )
+        for backend in report["backends"]:
+            self._write_backend(backend)
+
+    def _write_backend(self, backend):
+        setting = backend["cost_setting"]
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING(backend["backend"]))
+        self.stdout.write(
+            f"  {setting or 'cost':>16}  {'threads':>7}  {'p50 ms':>9}  {'p99 ms':>9}  "
+            f"{'hashes/s/core':>13}"
+        )
+        for result in backend["results"]:
+            cost = "current" if result["cost"] is None else result["cost"]
+            self.stdout.write(
+                f"  {cost:>16}  {result['threads']:>7}  {result['p50_ms']:>9.3f}  "
+                f"{result['p99_ms']:>9.3f}  {result['hashes_per_sec_per_core']:>13.1f}"
+            )
+
+        if "error" in backend:
+            self.stdout.write(self.style.ERROR(f"  Stopped: {backend['error']}"))
+        recommended = backend["recommended"]
+        if recommended:
+            self.stdout.write(
+                self.style.SUCCESS(f"  Recommended: {setting} = {recommended[setting]}")
+            )
+        elif recommended is not None:
+            self.stdout.write(self.style.SUCCESS("  Fits the target at the current settings."))
+        elif backend["results"]:
+            self.stdout.write(self.style.WARNING("  No measured cost fits the target."))
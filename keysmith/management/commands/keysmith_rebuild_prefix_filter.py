@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from keysmith.auth.prefix_filter import get_prefix_filter
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the Keysmith prefix filter from the token table and publish it "
+        "to PREFIX_FILTER_ALIAS so every worker adopts it on its next refresh."
+    )
+
+    def handle(self, *args, **options):
+        prefix_filter = get_prefix_filter()
+        if prefix_filter is None:
+            raise CommandError("KEYSMITH['PREFIX_FILTER'] is not enabled.")
+
+        bloom = prefix_filter.rebuild()
+        self.stdout.write(
+            f"Indexed {bloom.count} prefixes into {bloom.nbytes / 1024:.1f} KiB "
+            f"({bloom.hashes} hashes)."
+        )
+        if prefix_filter.alias:
+            self.stdout.write(
+                self.style.SUCCESS(f"Published to cache alias '{prefix_filter.alias}'.")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    "PREFIX_FILTER_ALIAS is not set; running workers keep their own filters."
+                )
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from keysmith.auth.cache import invalidate_token
+from keysmith.models.utils import backfill_scope_codenames, get_token_model, has_scope_column
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the denormalized scope_codenames column of the configured token model "
+        "from its scopes relation. Run once after adding the column to a custom "
+        "TOKEN_MODEL, or after writing scopes without the ORM relation manager."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to update (default: 'default').",
+        )
+
+    def handle(self, *args, **options):
+        Token = get_token_model()
+        if not has_scope_column(Token):
+            raise CommandError(f"{Token._meta.label} has no scope_codenames column.")
+
+        updated = backfill_scope_codenames(Token, using=options["database"])
+        # cached verification records carry the old codenames.
+        for start in range(0, len(updated), 500):
+            batch = updated[start : start + 500]
+            for token in Token.objects.using(options["database"]).filter(pk__in=batch):
+                invalidate_token(token)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Synced scope_codenames for {len(updated)} token(s).")
+        )
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import uuid
+from datetime import timedelta
 
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from keysmith.settings import keysmith_settings
+
 
 class AbstractToken(models.Model):
     """Abstract contract for token models used by Keysmith auth services."""
@@ -46,7 +49,6 @@ class AbstractToken(models.Model):
         blank=True,
         help_text="Django permissions associated with this token",
     )
-
     key = models.CharField(max_length=256, unique=True)
 
     prefix = models.CharField(max_length=12, db_index=True)
@@ -83,9 +85,27 @@ class AbstractToken(models.Model):
         return self.is_active
 
     def mark_used(self, *, commit: bool = True) -> None:
-        self.last_used_at = timezone.now()
-        if commit:
-            self.save(update_fields=["last_used_at"])
+        """
+        Record usage now.
+
+        With ``commit=True`` the row is only written when its stored
+        ``last_used_at`` is older than ``LAST_USED_RESOLUTION`` seconds, using
+        a conditional ``UPDATE`` so concurrent workers cannot race.
+        """
+        now = timezone.now()
+        if not commit:
+            self.last_used_at = now
+            return
+
+        threshold = now - timedelta(seconds=keysmith_settings.LAST_USED_RESOLUTION)
+        updated = (
+            type(self)
+            ._default_manager.filter(pk=self.pk)
+            .filter(models.Q(last_used_at__isnull=True) | models.Q(last_used_at__lt=threshold))
+            .update(last_used_at=now)
+        )
+        if updated:
+            self.last_used_at = now
 
     def __str__(self):
         return f"{self.name} ({self.token_type})"
@@ -1,5 +1,6 @@
 from django.apps import apps
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
 
 from keysmith.settings import keysmith_settings
 
@@ -28,3 +29,39 @@ def get_audit_log_model():
         raise ImproperlyConfigured(
             f"Audit log model '{keysmith_settings.AUDIT_LOG_MODEL}' not found"
         ) from exc
+
+
+def has_scope_column(model) -> bool:
+    """Return whether ``model`` keeps the denormalized ``scope_codenames`` column."""
+    try:
+        model._meta.get_field("scope_codenames")
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def backfill_scope_codenames(model, *, using: str = DEFAULT_DB_ALIAS) -> list:
+    """Rewrite ``scope_codenames`` from the ``scopes`` relation for every token of ``model``.
+
+    Works with historical models inside a ``RunPython`` data migration and
+    with concrete models. Only rows whose stored codenames differ are written;
+    their primary keys are returned.
+    """
+    field = model._meta.get_field("scopes")
+    source = f"{field.m2m_field_name()}_id"
+    target = f"{field.m2m_reverse_field_name()}__codename"
+
+    through = field.remote_field.through._default_manager.using(using)
+    codenames: dict = {}
+    for token_id, codename in through.values_list(source, target):
+        codenames.setdefault(token_id, []).append(codename)
+
+    updated = []
+    rows = model._default_manager.using(using).values_list("pk", "scope_codenames")
+    for pk, stored in rows.iterator():
+        expected = sorted(codenames.get(pk, ()))
+        if stored != expected:
+            model._default_manager.using(using).filter(pk=pk).update(scope_codenames=expected)
+            updated.append(pk)
+    return updated
+
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from django.core.signals import setting_changed
+
+from keysmith.django.exclusions import ExclusionRules
+from keysmith.hashers.registry import HasherRegistry, get_registry
+from keysmith.hooks import load_hook
+from keysmith.models.utils import get_audit_log_model, get_token_model
+from keysmith.settings import keysmith_settings
+
+logger = logging.getLogger("keysmith")
+
+
+@dataclass(frozen=True)
+class Runtime:
+    """Resolved configuration read by the request hot path.
+
+    Built once in ``KeysmithConfig.ready()`` and replaced as a whole when
+    ``KEYSMITH`` changes, so a request always sees one consistent snapshot
+    and never imports a hook, builds a hasher or looks up a model.
+    """
+
+    token_model: type
+    audit_log_model: type
+    hashers: HasherRegistry
+    rate_limit_hook: Callable | None
+    drf_throttle_hook: Callable | None
+    header_name: str
+    drf_header_name: str
+    allow_query_param: bool
+    query_param_name: str
+    enable_audit_logging: bool
+    lazy_auth: bool
+    exclusions: ExclusionRules
+
+    @classmethod
+    def build(cls) -> Runtime:
+        header_name = keysmith_settings.HEADER_NAME
+        return cls(
+            token_model=get_token_model(),
+            audit_log_model=get_audit_log_model(),
+            hashers=get_registry(),
+            rate_limit_hook=load_hook("RATE_LIMIT_HOOK"),
+            drf_throttle_hook=load_hook("DRF_THROTTLE_HOOK"),
+            header_name=header_name,
+            drf_header_name=header_name.replace("HTTP_", "").replace("_", "-"),
+            allow_query_param=keysmith_settings.ALLOW_QUERY_PARAM,
+            query_param_name=keysmith_settings.QUERY_PARAM_NAME,
+            enable_audit_logging=keysmith_settings.ENABLE_AUDIT_LOGGING,
+            lazy_auth=keysmith_settings.LAZY_AUTH,
+            exclusions=ExclusionRules.from_settings(keysmith_settings.EXCLUDE),
+        )
+
+
+_runtime: Runtime | None = None
+
+
+def get_runtime() -> Runtime:
+    """Return the current snapshot, building it if it is missing."""
+    runtime = _runtime
+    if runtime is None:
+        runtime = rebuild_runtime()
+    return runtime
+
+
+def rebuild_runtime() -> Runtime:
+    """Build a fresh snapshot and swap it in with a single assignment."""
+    global _runtime
+
+    runtime = _runtime = Runtime.build()
+    return runtime
+
+
+def prepare_runtime() -> None:
+    """Build the snapshot ahead of the first request.
+
+    A configuration that cannot be resolved is left for the system checks to
+    report; the snapshot is then built, and fails loudly, on first use.
+    """
+    global _runtime
+
+    try:
+        rebuild_runtime()
+    except Exception:
+        _runtime = None
+        logger.debug("Deferred Keysmith runtime snapshot", exc_info=True)
+
+
+def _rebuild_on_setting_changed(*, setting: str, **kwargs: Any) -> None:
+    if setting == "KEYSMITH":
+        prepare_runtime()
+
+
+setting_changed.connect(_rebuild_on_setting_changed)
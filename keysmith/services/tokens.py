@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import logging
 from collections.abc import Iterable
 from datetime import timedelta
 
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from keysmith.audit.logger import log_audit_event
+from keysmith.auth.cache import forget_failures, invalidate_token
+from keysmith.auth.prefix_filter import record_issued_prefix
 from keysmith.hashers.base import BaseTokenHasher
+from keysmith.hashers.executor import HasherUnavailable, run_hash
 from keysmith.hashers.registry import get_hasher
 from keysmith.models.utils import get_token_model
+from keysmith.services.usage import arecord_usage, get_usage_buffer
 from keysmith.settings import keysmith_settings
 from keysmith.utils.tokens import (
     PublicToken,
@@ -17,6 +23,8 @@ from keysmith.utils.tokens import (
     generate_raw_secret,
 )
 
+logger = logging.getLogger("keysmith.services")
+
 
 def _default_expiry():
     if keysmith_settings.DEFAULT_EXPIRY_DAYS:
@@ -115,7 +123,7 @@ def create_token(
         identifier=identifier,
         namespace=namespace,
     )
-    hashed: str = hasher.hash(secret)
+    hashed: str = run_hash(hasher, secret)
 
     scopes_to_assign = scopes
     if scopes_to_assign is None:
@@ -142,6 +150,10 @@ def create_token(
     if scopes_to_assign is not None:
         token.scopes.set(scopes_to_assign)
 
+    # the prefix may have been probed, and remembered as missing, before issue.
+    forget_failures(token.prefix)
+    record_issued_prefix(token.prefix)
+
     log_audit_event(
         action="created",
         request=request,
@@ -172,9 +184,10 @@ def rotate_token(token, *, request=None, actor=None) -> str:
         namespace=namespace,
     )
 
-    token.key = hasher.hash(secret)
+    token.key = run_hash(hasher, secret)
     token.last_used_at = None
     token.save(update_fields=["key", "last_used_at"])
+    invalidate_token(token)
     log_audit_event(
         action="rotated",
         request=request,
@@ -201,6 +214,7 @@ def revoke_token(token, *, purge: bool = False, request=None, actor=None) -> Non
 
     token.__class__.objects.filter(pk=token.pk).update(revoked=True)
     token.revoked = True
+    invalidate_token(token)
     log_audit_event(
         action="revoked",
         request=request,
@@ -228,6 +242,7 @@ def purge_token(token, *, request=None, actor=None) -> None:
     token.__class__.objects.filter(pk=token.pk).update(**updates)
     for field, value in updates.items():
         setattr(token, field, value)
+    invalidate_token(token)
 
     log_audit_event(
         action="revoked",
@@ -241,5 +256,130 @@ def purge_token(token, *, request=None, actor=None) -> None:
     )
 
 
+def sync_scope_codenames(token) -> None:
+    """Copy ``token.scopes`` into the denormalized ``scope_codenames`` column.
+
+    Called by the ``m2m_changed`` receiver in :mod:`keysmith.signals`, so
+    ``scopes.set()``, ``add()``, ``remove()`` and ``clear()`` (including the
+    admin form) keep the column current. Writes that bypass the ORM relation
+    manager, such as bulk inserts into the through table, must call this
+    directly. Cached verification records are invalidated as well.
+    """
+    codenames = sorted(token.scopes.values_list("codename", flat=True))
+    token.__class__.objects.filter(pk=token.pk).update(scope_codenames=codenames)
+    token.scope_codenames = codenames
+    token.__dict__.pop("_keysmith_scope_codenames", None)
+    token.__dict__.pop("_keysmith_scope_mask", None)
+    invalidate_token(token)
+
+
+def upgrade_token_hash(token, secret: str, *, hasher: BaseTokenHasher | None = None) -> None:
+    """Rewrite ``token.key`` with the configured hasher once the current transaction commits.
+
+    Called after a successful verification against an outdated hash. The write
+    is a compare-and-swap on the old key, so a concurrent rotation always wins,
+    and it runs after commit so the auth row lock is not held while hashing.
+    """
+    hasher = hasher or get_hasher()
+    old_key = token.key
+    model = token.__class__
+
+    def _upgrade() -> None:
+        try:
+            new_key = run_hash(hasher, secret)
+        except HasherUnavailable:
+            # the old hash still verifies; retry on a later authentication.
+            logger.warning("Skipped Keysmith hash upgrade for token %s", token.pk)
+            return
+        if model.objects.filter(pk=token.pk, key=old_key).update(key=new_key):
+            token.key = new_key
+
+    transaction.on_commit(_upgrade)
+
+
+def _usage_timestamps(token):
+    """Return ``(now, threshold)``, or ``None`` when the loaded instance is recent enough."""
+    now = timezone.now()
+    threshold = now - timedelta(seconds=keysmith_settings.LAST_USED_RESOLUTION)
+    # read through __dict__ so a deferred field is not loaded just for this check.
+    loaded_last_used = token.__dict__.get("last_used_at")
+    if loaded_last_used is not None and loaded_last_used >= threshold:
+        return None
+    return now, threshold
+
+
+def _stale_usage_filter(threshold) -> Q:
+    return Q(last_used_at__isnull=True) | Q(last_used_at__lt=threshold)
+
+
 def mark_token_used(token) -> None:
-    token.__class__.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+    """Record usage with a conditional update that never moves `last_used_at` backwards.
+
+    The ``WHERE`` clause lets concurrent lock-free authentications race safely:
+    whichever write lands last with the newest timestamp wins, and no row lock is
+    held beyond the single statement.
+
+    ``LAST_USED_RESOLUTION`` widens that clause: the row is only written when the
+    stored value is older than the resolution, and the statement is skipped
+    entirely when the loaded instance is already recent enough.
+
+    With ``USAGE_RECORDING = "buffered"`` the timestamp is handed to the
+    process-wide :class:`~keysmith.services.usage.UsageBuffer` instead.
+    """
+    timestamps = _usage_timestamps(token)
+    if timestamps is None:
+        return
+    now, threshold = timestamps
+
+    if keysmith_settings.USAGE_RECORDING == "buffered":
+        get_usage_buffer().record(token, now)
+        token.last_used_at = now
+        return
+
+    queryset = token.__class__.objects.filter(pk=token.pk).filter(_stale_usage_filter(threshold))
+    if queryset.update(last_used_at=now):
+        token.last_used_at = now
+
+
+def mark_tokens_used(tokens: Iterable) -> None:
+    """Bulk counterpart of :func:`mark_token_used` for batch authentication.
+
+    Issues one conditional ``UPDATE`` per token model instead of one per token,
+    with the same monotonic ``WHERE`` clause and ``LAST_USED_RESOLUTION``
+    handling. Buffered recording hands each token to the usage buffer.
+    """
+    now = timezone.now()
+    threshold = now - timedelta(seconds=keysmith_settings.LAST_USED_RESOLUTION)
+    by_model: dict[type, list] = {}
+    for token in tokens:
+        if _usage_timestamps(token) is not None:
+            by_model.setdefault(token.__class__, []).append(token)
+
+    for model, stale_tokens in by_model.items():
+        if keysmith_settings.USAGE_RECORDING == "buffered":
+            buffer = get_usage_buffer()
+            for token in stale_tokens:
+                buffer.record(token, now)
+        else:
+            model.objects.filter(pk__in=[token.pk for token in stale_tokens]).filter(
+                _stale_usage_filter(threshold)
+            ).update(last_used_at=now)
+        for token in stale_tokens:
+            token.last_used_at = now
+
+
+async def amark_token_used(token) -> None:
+    """Async counterpart of :func:`mark_token_used` using ``aupdate()``."""
+    timestamps = _usage_timestamps(token)
+    if timestamps is None:
+        return
+    now, threshold = timestamps
+
+    if keysmith_settings.USAGE_RECORDING == "buffered":
+        await arecord_usage(token, now)
+        token.last_used_at = now
+        return
+
+    queryset = token.__class__.objects.filter(pk=token.pk).filter(_stale_usage_filter(threshold))
+    if await queryset.aupdate(last_used_at=now):
+        token.last_used_at = now
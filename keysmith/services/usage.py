@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+
+from keysmith.settings import keysmith_settings
+
+logger = logging.getLogger("keysmith.usage")
+
+
+class UsageBuffer:
+    """Coalesce `last_used_at` writes per token and flush them in bulk.
+
+    ``record()`` only touches memory. Pending timestamps are written with one
+    ``UPDATE`` per token model when ``max_tokens`` distinct tokens are pending,
+    every ``interval`` seconds from a daemon thread, and at interpreter exit.
+    Usage data is advisory, so anything still buffered when a worker crashes
+    is lost.
+    """
+
+    def __init__(self, *, interval: float, max_tokens: int):
+        self.interval = interval
+        self.max_tokens = max_tokens
+        self._pending: dict[tuple[type, object], object] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, token, used_at) -> None:
+        if self.add(token, used_at):
+            self.flush()
+
+    def add(self, token, used_at) -> bool:
+        """Buffer ``used_at`` without writing; return whether a flush is due."""
+        with self._lock:
+            self._pending[(token.__class__, token.pk)] = used_at
+            should_flush = len(self._pending) >= self.max_tokens
+
+        self._ensure_thread()
+        return should_flush
+
+    def flush(self) -> int:
+        """Write all pending timestamps, returning the number of tokens flushed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        by_model: dict[type, dict] = {}
+        for (model, pk), used_at in pending.items():
+            by_model.setdefault(model, {})[pk] = used_at
+
+        for model, timestamps in by_model.items():
+            # per-row CASE keeps last_used_at monotonic when another worker
+            # already wrote a newer value.
+            whens = [
+                When(
+                    Q(pk=pk) & (Q(last_used_at__isnull=True) | Q(last_used_at__lt=used_at)),
+                    then=Value(used_at),
+                )
+                for pk, used_at in timestamps.items()
+            ]
+            model.objects.filter(pk__in=list(timestamps)).update(
+                last_used_at=Case(*whens, default=F("last_used_at"), output_field=DateTimeField())
+            )
+        return len(pending)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _ensure_thread(self) -> None:
+        if not self.interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="keysmith-usage-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush Keysmith token usage")
+            finally:
+                connection.close()
+
+
+_usage_buffer: UsageBuffer | None = None
+_usage_buffer_lock = threading.Lock()
+
+
+def _current_usage_buffer() -> UsageBuffer | None:
+    buffer = _usage_buffer
+    if (
+        buffer is not None
+        and buffer.interval == keysmith_settings.USAGE_FLUSH_INTERVAL
+        and buffer.max_tokens == keysmith_settings.USAGE_FLUSH_MAX_TOKENS
+    ):
+        return buffer
+    return None
+
+
+def get_usage_buffer() -> UsageBuffer:
+    """Return the process-wide usage buffer for the current settings."""
+    global _usage_buffer
+
+    buffer = _current_usage_buffer()
+    if buffer is not None:
+        return buffer
+
+    interval = keysmith_settings.USAGE_FLUSH_INTERVAL
+    max_tokens = keysmith_settings.USAGE_FLUSH_MAX_TOKENS
+    with _usage_buffer_lock:
+        previous = _usage_buffer
+        if previous is not None:
+            previous.stop()
+            previous.flush()
+        buffer = _usage_buffer = UsageBuffer(interval=interval, max_tokens=max_tokens)
+    return buffer
+
+
+async def arecord_usage(token, used_at) -> None:
+    """Buffer ``used_at`` from async code, flushing off the event loop when due.
+
+    Only memory is touched on the loop; replacing the buffer after a settings
+    change and size-triggered flushes write to the database, so they run in
+    a worker thread.
+    """
+    buffer = _current_usage_buffer()
+    if buffer is None:
+        buffer = await sync_to_async(get_usage_buffer)()
+    if buffer.add(token, used_at):
+        await sync_to_async(buffer.flush)()
+
+
+def flush_usage() -> int:
+    """Flush buffered usage now; a no-op when nothing has been buffered."""
+    buffer = _usage_buffer
+    if buffer is None:
+        return 0
+    return buffer.flush()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush_usage()
+    except Exception:
+        logger.exception("Failed to flush Keysmith token usage at exit")
+
+
+def _reset_after_fork() -> None:
+    # the child inherits the parent's pending writes but not its flush thread.
+    global _usage_buffer
+    _usage_buffer = None
+
+
+atexit.register(_flush_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -4,7 +4,14 @@ from django.utils.translation import gettext_lazy as _
 
 KEYSMITH_DEFAULTS = {
     "HASH_BACKEND": "keysmith.hashers.PBKDF2SHA512TokenHasher",
+    "HASH_BACKENDS": None,  # [new-hash backend, *also verified]; overrides HASH_BACKEND when set
     "HASH_ITERATIONS": 100_000,
+    "SCRYPT_N": 2**14,  # scrypt CPU/memory cost (power of two; ~128 * N * r bytes per hash)
+    "SCRYPT_R": 8,  # scrypt block size
+    "SCRYPT_P": 1,  # scrypt parallelization
+    "HMAC_PEPPERS": {},  # {pepper_id: secret} accepted by HMACSHA256TokenHasher
+    "HMAC_PEPPER_ID": None,  # Pepper used for new hashes (defaults to the first entry)
+    "UPGRADE_HASHES": True,  # Rehash with the primary backend after verifying an outdated hash
     "DEFAULT_EXPIRY_DAYS": 90,
     "AVAILABLE_SCOPES": [],
     "DEFAULT_SCOPES": [],
@@ -18,6 +25,41 @@ KEYSMITH_DEFAULTS = {
     "TOKEN_SECRET_LENGTH": 32,
     "RATE_LIMIT_HOOK": None,  # Optional dotted callable: hook(request, raw_token=None)
     "DRF_THROTTLE_HOOK": None,  # Optional dotted callable: hook(request, token=None)
+    "LAST_USED_RESOLUTION": 0,  # Skip last_used_at writes newer than this many seconds
+    "USAGE_RECORDING": "sync",  # "sync" (UPDATE per auth) or "buffered" (write-behind)
+    "USAGE_FLUSH_INTERVAL": 5,  # Seconds between buffered flushes (0 = count/exit only)
+    "USAGE_FLUSH_MAX_TOKENS": 500,  # Flush once this many distinct tokens are pending
+    "LOCK_FREE_AUTH": False,  # Skip SELECT FOR UPDATE; verify outside any transaction
+    "HASH_THREAD_WORKERS": 4,  # Thread pool size for hash verification in async and batch auth
+    "HASH_PROCESS_WORKERS": 0,  # Hash in a process pool of this size (0 = hash in-process)
+    "HASH_QUEUE_LIMIT": 64,  # Max hashing jobs in flight before HasherUnavailable
+    "HASH_TIMEOUT": 5,  # Seconds to wait for a pooled hashing job
+    "VERIFIED_CACHE_TTL": 0,  # Seconds to remember successful verifications per process (0 = off)
+    "VERIFIED_CACHE_MAX_ENTRIES": 10_000,
+    "SHARED_CACHE_ALIAS": None,  # Optional django.core.cache alias for verified token records
+    "SHARED_CACHE_TTL": 60,
+    "SHARED_CACHE_LOCK_TIMEOUT": 5,  # Seconds other workers wait for a cold token's first verify
+    "SHARED_CACHE_STALE_TTL": 0,  # Seconds a record is served stale while one refresh runs (0 = off)
+    "NEGATIVE_CACHE_TTL": 0,  # Seconds to remember failed tokens (0 = off)
+    "NEGATIVE_CACHE_MAX_ENTRIES": 10_000,  # Prefixes remembered per process in local mode
+    "NEGATIVE_CACHE_ALIAS": None,  # Optional django.core.cache alias to share failures
+    "PREFIX_FILTER": False,  # Reject never-issued prefixes from a per-worker Bloom filter
+    "PREFIX_FILTER_ERROR_RATE": 0.001,  # Bloom false-positive rate (~1.8 MB per million prefixes)
+    "PREFIX_FILTER_REBUILD_INTERVAL": 300,  # Seconds between background rebuilds
+    "PREFIX_FILTER_ALIAS": None,  # django.core.cache alias for the published filter and markers
+    "SINGLE_FLIGHT_TIMEOUT": 0,  # Seconds concurrent auths of one token wait on the first (0 = off)
+    "BREAKER_FAILURE_THRESHOLD": 0,  # Consecutive database errors that open the breaker (0 = off)
+    "BREAKER_RESET_TIMEOUT": 30,  # Seconds the breaker stays open before a trial query
+    "OUTAGE_POLICY": "fail_closed",  # "fail_closed" or "fail_open_known" while the database fails
+    "OUTAGE_GRACE_PERIOD": 300,  # Max age in seconds of a verification honoured by fail_open_known
+    "OUTAGE_MAX_KNOWN_TOKENS": 10_000,  # Per-process verified tokens kept for fail_open_known
+    "EXCLUDE": {  # Requests the middleware leaves alone, compiled at startup
+        "paths": [],  # Path prefixes, e.g. "/static/"
+        "regexes": [],  # Regexes matched from the start of the path
+        "url_names": [],  # URL names, namespaced ones as "ns:name"
+    },
+    "LAZY_AUTH": False,  # Middleware authenticates on first access to request.keysmith_token
+    "TOKEN_PRINCIPAL": False,  # Attach a lightweight TokenPrincipal to requests instead of the row
     "DEFAULT_ERROR_MESSAGES": {
         "missing_token": _("Authentication credentials were not provided."),
         "invalid_token": _("Your session has expired or the token is invalid."),
@@ -43,10 +85,8 @@ class KeysmithSettings:
         if attr not in KEYSMITH_DEFAULTS:
             raise AttributeError(f"Invalid Keysmith setting: {attr!r}")
 
-        if attr == "DEFAULT_ERROR_MESSAGES":
-            default_messages = KEYSMITH_DEFAULTS[attr]
-            user_messages = self.user_settings.get(attr, {})
-            val = {**default_messages, **user_messages}
+        if isinstance(KEYSMITH_DEFAULTS[attr], dict):
+            val = {**KEYSMITH_DEFAULTS[attr], **self.user_settings.get(attr, {})}
         else:
             val = self.user_settings.get(attr, KEYSMITH_DEFAULTS[attr])
 
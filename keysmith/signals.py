@@ -0,0 +1,73 @@
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from keysmith.auth.cache import invalidate_token
+from keysmith.models.utils import get_token_model, has_scope_column
+from keysmith.services.tokens import sync_scope_codenames
+
+
+def _synced_token_model(sender=None):
+    Token = get_token_model()
+    if not has_scope_column(Token):
+        return None
+    if sender is not None and sender is not Token.scopes.through:
+        return None
+    return Token
+
+
+@receiver(m2m_changed, dispatch_uid="keysmith_scopes_changed")
+def _scopes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    Token = _synced_token_model(sender)
+    if Token is None:
+        return
+
+    if not reverse:
+        if action in {"post_add", "post_remove", "post_clear"}:
+            sync_scope_codenames(instance)
+        return
+
+    # permission.token_set changes; post_clear carries no pk_set, so capture first.
+    if action == "pre_clear":
+        instance._keysmith_tokens = list(Token.objects.filter(scopes=instance))
+    elif action == "post_clear":
+        for token in instance.__dict__.pop("_keysmith_tokens", ()):
+            sync_scope_codenames(token)
+    elif action in {"post_add", "post_remove"}:
+        for token in Token.objects.filter(pk__in=pk_set):
+            sync_scope_codenames(token)
+
+
+@receiver(pre_delete, sender=Permission, dispatch_uid="keysmith_permission_pre_delete")
+def _capture_permission_tokens(sender, instance, **kwargs):
+    Token = _synced_token_model()
+    if Token is not None:
+        instance._keysmith_tokens = list(Token.objects.filter(scopes=instance))
+
+
+@receiver(post_delete, sender=Permission, dispatch_uid="keysmith_permission_post_delete")
+def _permission_deleted(sender, instance, **kwargs):
+    for token in instance.__dict__.pop("_keysmith_tokens", ()):
+        sync_scope_codenames(token)
+
+
+def _token_changed(sender, instance, **kwargs):
+    # cached verifications skip the row read; drop them when the row changes or goes away.
+    invalidate_token(instance)
+
+
+def connect_token_receivers() -> None:
+    """Connect receivers bound to the configured token model.
+
+    Called from ``KeysmithConfig.ready()``. Binding them to one sender keeps
+    ``QuerySet.delete()`` on unrelated models on Django's fast-delete path.
+    """
+    try:
+        Token = get_token_model()
+    except ImproperlyConfigured:
+        # surfaced by the system checks, which resolve the model too.
+        return
+
+    post_save.connect(_token_changed, sender=Token, dispatch_uid="keysmith_token_saved")
+    post_delete.connect(_token_changed, sender=Token, dispatch_uid="keysmith_token_deleted")
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.db import models
 
+from keysmith.models.base import AbstractToken
+
 
 class TestResource(models.Model):
     """A simple model for testing API endpoints with token authentication."""
@@ -14,3 +17,23 @@ class TestResource(models.Model):
 
     def __str__(self) -> str:
         return self.name
+
+
+class ScopedToken(AbstractToken):
+    """A custom token model that opts in to the ``scope_codenames`` column."""
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="created_scoped_tokens",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="scoped_tokens",
+    )
+    scope_codenames = models.JSONField(default=list, blank=True, editable=False)
@@ -125,8 +125,8 @@ class TestAuditLogging:
 
     def test_audit_log_swallows_exceptions(self):
         """Audit logging failures don't raise exceptions."""
-        with patch("keysmith.audit.logger.get_audit_log_model") as mock_get:
-            mock_get.side_effect = Exception("Database error")
+        with patch.object(TokenAuditLog.objects, "create") as mock_create:
+            mock_create.side_effect = Exception("Database error")
 
             # Should not raise
             log_audit_event(
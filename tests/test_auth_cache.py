@@ -0,0 +1,406 @@
+import pytest
+
+from keysmith.auth.base import authenticate_token
+from keysmith.auth.cache import VerifiedTokenCache, get_verified_cache, token_digest
+from keysmith.auth.exceptions import InvalidToken, RevokedToken
+from keysmith.hashers.pbkdf2 import PBKDF2SHA512TokenHasher
+from keysmith.services.tokens import create_token, revoke_token, rotate_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestVerifiedTokenCache:
+    """Test the in-process verification cache."""
+
+    def test_token_digest_does_not_contain_secret(self):
+        """Digest is stable and never embeds the raw token."""
+        digest = token_digest("tok_abc:secret123456")
+
+        assert digest == token_digest("tok_abc:secret123456")
+        assert "secret" not in digest
+
+    def test_hit_requires_matching_key(self):
+        """A cached verification only applies to the key it was verified against."""
+        cache = VerifiedTokenCache(ttl=60, max_entries=10)
+        cache.add("digest", "tok_a", "key-1")
+
+        assert cache.contains("digest", "key-1") is True
+        assert cache.contains("digest", "key-2") is False
+
+    def test_entries_expire_after_ttl(self):
+        """Entries are dropped once their TTL elapses."""
+        clock = FakeClock()
+        cache = VerifiedTokenCache(ttl=10, max_entries=10, clock=clock)
+        cache.add("digest", "tok_a", "key")
+
+        clock.now = 11
+
+        assert cache.contains("digest", "key") is False
+        assert len(cache) == 0
+
+    def test_lru_eviction_respects_max_entries(self):
+        """The least recently used entry is evicted past the cap."""
+        cache = VerifiedTokenCache(ttl=60, max_entries=2)
+        cache.add("a", "tok_a", "key")
+        cache.add("b", "tok_b", "key")
+        cache.contains("a", "key")
+        cache.add("c", "tok_c", "key")
+
+        assert len(cache) == 2
+        assert cache.contains("a", "key") is True
+        assert cache.contains("b", "key") is False
+
+    def test_invalidate_prefix(self):
+        """All entries for a prefix are removed."""
+        cache = VerifiedTokenCache(ttl=60, max_entries=10)
+        cache.add("a", "tok_a", "key")
+        cache.add("b", "tok_b", "key")
+
+        cache.invalidate_prefix("tok_a")
+
+        assert cache.contains("a", "key") is False
+        assert cache.contains("b", "key") is True
+
+    def test_disabled_by_default(self):
+        """No cache is returned when VERIFIED_CACHE_TTL is unset."""
+        assert get_verified_cache() is None
+
+
+@pytest.mark.django_db
+class TestAuthenticateWithVerifiedCache:
+    """Test authenticate_token with the verification cache enabled."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_cache(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "VERIFIED_CACHE_TTL": 60}
+        get_verified_cache().clear()
+
+    def test_second_authentication_skips_hasher(self, monkeypatch):
+        """A repeat authentication does not call the hasher again."""
+        _, raw_token = create_token(name="cached-token")
+        authenticate_token(raw_token)
+
+        def fail_verify(self, secret, hashed):
+            raise AssertionError("hasher should not run on a cache hit")
+
+        monkeypatch.setattr(PBKDF2SHA512TokenHasher, "verify", fail_verify)
+
+        assert authenticate_token(raw_token) is not None
+
+    def test_failed_verification_is_not_cached(self):
+        """Wrong secrets never populate the cache."""
+        token, _ = create_token(name="cached-token")
+        fake_token = f"{token.prefix}:wrongsecret1234567890123456789012345678901234"
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(fake_token)
+
+        assert len(get_verified_cache()) == 0
+
+    def test_rotate_invalidates_cached_verification(self):
+        """The old raw token stops working immediately after rotation."""
+        token, raw_token = create_token(name="cached-token")
+        authenticate_token(raw_token)
+
+        rotate_token(token)
+
+        assert len(get_verified_cache()) == 0
+        with pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+    def test_revoke_invalidates_cached_verification(self):
+        """Revoked tokens are rejected even after a cached verification."""
+        token, raw_token = create_token(name="cached-token")
+        authenticate_token(raw_token)
+
+        revoke_token(token)
+
+        assert len(get_verified_cache()) == 0
+        with pytest.raises(RevokedToken):
+            authenticate_token(raw_token)
+
+
+SHARED_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "keysmith": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "keysmith-tests",
+    },
+}
+
+
+@pytest.mark.django_db
+class TestSharedTokenCache:
+    """Test the shared Django-cache verification layer."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_shared_cache(self, settings):
+        from django.core.cache import caches
+
+        settings.CACHES = SHARED_CACHES
+        settings.KEYSMITH = {**settings.KEYSMITH, "SHARED_CACHE_ALIAS": "keysmith"}
+        caches["keysmith"].clear()
+
+    def test_hit_skips_row_read_and_hasher(self, monkeypatch):
+        """A published record authenticates with only the usage update query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        token, raw_token = create_token(name="shared-token")
+        authenticate_token(raw_token)
+
+        def fail_verify(self, secret, hashed):
+            raise AssertionError("hasher should not run on a shared cache hit")
+
+        monkeypatch.setattr(PBKDF2SHA512TokenHasher, "verify", fail_verify)
+
+        with CaptureQueriesContext(connection) as ctx:
+            authenticated = authenticate_token(raw_token)
+
+        assert authenticated.pk == token.pk
+        assert authenticated.prefix == token.prefix
+        statements = [query["sql"].split()[0] for query in ctx.captured_queries]
+        assert "SELECT" not in statements
+        assert statements.count("UPDATE") == 1
+
+    def test_hit_carries_scopes_and_user(self, django_user_model):
+        """Records restore the user id and scope codenames."""
+        from django.contrib.auth.models import Permission
+
+        user = django_user_model.objects.create_user(username="shared-user")
+        permission = Permission.objects.first()
+        _, raw_token = create_token(name="shared-token", user=user, scopes=[permission])
+        authenticate_token(raw_token)
+
+        authenticated = authenticate_token(raw_token)
+
+        assert authenticated.user_id == user.pk
+        assert authenticated._keysmith_scope_codenames == frozenset({permission.codename})
+
+    def test_revoke_invalidates_record(self):
+        """Revoking bumps the prefix version so the record is ignored."""
+        token, raw_token = create_token(name="shared-token")
+        authenticate_token(raw_token)
+
+        revoke_token(token)
+
+        with pytest.raises(RevokedToken):
+            authenticate_token(raw_token)
+
+    def test_rotate_invalidates_record(self):
+        """The pre-rotation raw token is rejected after rotation."""
+        token, raw_token = create_token(name="shared-token")
+        authenticate_token(raw_token)
+
+        rotate_token(token)
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+    def test_delete_invalidates_record(self):
+        """A token deleted through the ORM stops authenticating immediately."""
+        from keysmith.models import Token
+
+        token, raw_token = create_token(name="shared-token")
+        authenticate_token(raw_token)
+
+        Token.objects.filter(pk=token.pk).delete()
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+    def test_token_receivers_keep_fast_delete_for_other_models(self):
+        """Receivers are bound to the token model, not every model."""
+        from django.contrib.sessions.models import Session
+        from django.db.models.deletion import Collector
+
+        from keysmith.models import Token
+
+        assert Collector(using="default").can_fast_delete(Session.objects.all())
+        assert not Collector(using="default").can_fast_delete(Token.objects.all())
+
+    def test_model_save_invalidates_record(self):
+        """Revoking with a plain model save is seen on the next request."""
+        token, raw_token = create_token(name="shared-token")
+        authenticate_token(raw_token)
+
+        token.revoked = True
+        token.save()
+
+        with pytest.raises(RevokedToken):
+            authenticate_token(raw_token)
+
+    def test_failed_verification_releases_fill_lock(self):
+        """A failed verification does not leave other workers waiting."""
+        from keysmith.auth.cache import get_shared_cache
+
+        token, _ = create_token(name="shared-token")
+        fake_token = f"{token.prefix}:wrongsecret1234567890123456789012345678901234"
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(fake_token)
+
+        assert get_shared_cache().acquire(token.prefix, token_digest(fake_token)) is True
+
+    def test_wait_returns_once_lock_is_released(self):
+        """Waiting workers stop polling as soon as the holder gives up."""
+        import time
+
+        from keysmith.auth.cache import get_shared_cache
+
+        shared = get_shared_cache()
+        shared.acquire("tok_abc", "digest")
+        shared.release("tok_abc", "digest")
+
+        started = time.monotonic()
+        token, version = shared.wait("tok_abc", "digest")
+
+        assert token is None
+        assert version is not None
+        assert time.monotonic() - started < shared.lock_timeout
+
+
+def get_negative_cache_entry(token):
+    from keysmith.auth.cache import get_negative_cache
+
+    negative = get_negative_cache()
+    return negative.cache.get(negative._key(token.prefix))
+
+
+@pytest.mark.django_db
+class TestNegativeTokenCache:
+    """Test rejection of repeated failures before the database or hasher."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_negative_cache(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "NEGATIVE_CACHE_TTL": 60}
+
+    def _wrong_secret(self, token):
+        from keysmith.utils.tokens import build_public_token
+
+        namespace, identifier = token.prefix.rsplit("_", 1)
+        return build_public_token(
+            namespace=namespace, identifier=identifier, secret="wrongsecret" * 4
+        ).token
+
+    def test_unknown_prefix_rejected_without_query(self, django_assert_num_queries):
+        """A prefix that was missing is refused for any secret without a query."""
+        from keysmith.models import Token
+
+        token, raw_token = create_token(name="deleted-token")
+        Token.objects.filter(pk=token.pk).delete()
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+        with django_assert_num_queries(0), pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+    def test_revoked_prefix_keeps_error_type(self, django_assert_num_queries):
+        """Remembered failures are raised with their original class."""
+        token, raw_token = create_token(name="revoked-token")
+        revoke_token(token)
+
+        with pytest.raises(RevokedToken):
+            authenticate_token(raw_token)
+
+        with django_assert_num_queries(0), pytest.raises(RevokedToken):
+            authenticate_token(self._wrong_secret(token))
+
+    def test_wrong_secret_does_not_block_owner(self, monkeypatch):
+        """A wrong secret is remembered only for itself, never for the prefix."""
+        token, raw_token = create_token(name="live-token")
+        with pytest.raises(InvalidToken):
+            authenticate_token(self._wrong_secret(token))
+        assert len(get_negative_cache_entry(token)["digests"]) == 1
+
+        def fail_verify(self, secret, hashed):
+            raise AssertionError("remembered wrong secret should skip the hasher")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(PBKDF2SHA512TokenHasher, "verify", fail_verify)
+            with pytest.raises(InvalidToken):
+                authenticate_token(self._wrong_secret(token))
+
+        assert authenticate_token(raw_token).pk == token.pk
+
+    def test_rotation_clears_failures(self):
+        """Rotating a token forgets failures recorded for its prefix."""
+        token, _ = create_token(name="rotated-token")
+        with pytest.raises(InvalidToken):
+            authenticate_token(self._wrong_secret(token))
+        assert get_negative_cache_entry(token) is not None
+
+        new_raw_token = rotate_token(token)
+
+        assert get_negative_cache_entry(token) is None
+        assert authenticate_token(new_raw_token).pk == token.pk
+
+    def test_issuing_prefix_clears_failures(self):
+        """A prefix remembered as missing works as soon as it is issued."""
+        from keysmith.auth.cache import forget_failures, get_negative_cache
+
+        negative = get_negative_cache()
+        negative.reject("tok_fresh", InvalidToken("missing"))
+        assert negative.check("tok_fresh", None) is not None
+
+        forget_failures("tok_fresh")
+
+        assert negative.check("tok_fresh", None) is None
+
+    def test_digests_per_prefix_are_bounded(self):
+        """Only the most recent wrong secrets are kept per prefix."""
+        from keysmith.auth.cache import NegativeTokenCache, get_negative_cache
+
+        negative = get_negative_cache()
+        for i in range(NegativeTokenCache.max_digests + 1):
+            negative.reject("tok_bounded", InvalidToken("wrong"), digest=f"d{i}")
+
+        assert negative.check("tok_bounded", "d0") is None
+        assert negative.check("tok_bounded", f"d{NegativeTokenCache.max_digests}") is not None
+
+    def test_async_path_reads_shared_cache_off_event_loop(self, settings):
+        """A database-backed failure cache works from aauthenticate_token."""
+        from asgiref.sync import async_to_sync
+        from django.core.management import call_command
+
+        from keysmith.auth.base import aauthenticate_token
+
+        settings.CACHES = {
+            **SHARED_CACHES,
+            "keysmith": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "keysmith_negative_cache",
+            },
+        }
+        settings.KEYSMITH = {**settings.KEYSMITH, "NEGATIVE_CACHE_ALIAS": "keysmith"}
+        call_command("createcachetable", "keysmith_negative_cache", verbosity=0)
+        token, _ = create_token(name="async-token")
+        wrong_secret = self._wrong_secret(token)
+
+        for _ in range(2):
+            with pytest.raises(InvalidToken):
+                async_to_sync(aauthenticate_token)(wrong_secret)
+
+        assert get_negative_cache_entry(token)["digests"]
+
+    def test_shared_mode_uses_cache_alias(self, settings):
+        """NEGATIVE_CACHE_ALIAS shares failures through a Django cache."""
+        from django.core.cache import caches
+
+        from keysmith.auth.cache import get_negative_cache
+
+        settings.CACHES = SHARED_CACHES
+        settings.KEYSMITH = {**settings.KEYSMITH, "NEGATIVE_CACHE_ALIAS": "keysmith"}
+        caches["keysmith"].clear()
+
+        get_negative_cache().reject("tok_shared", RevokedToken("revoked"))
+
+        assert caches["keysmith"].get("keysmith:negative:tok_shared") is not None
+        assert isinstance(get_negative_cache().check("tok_shared", None), RevokedToken)
@@ -109,6 +109,53 @@ class TestAuthenticateToken:
         assert str(expiry.date()) in str(exc.value) or str(expiry.year) in str(exc.value)
 
 
+@pytest.mark.django_db
+class TestAuthenticationQueries:
+    """Test the number of queries issued per authentication."""
+
+    def _selects(self, context):
+        return [q["sql"] for q in context.captured_queries if q["sql"].startswith("SELECT")]
+
+    def test_user_and_scopes_loaded_with_token(self, django_user_model):
+        """Token row with user, then scope codenames; later access does not query."""
+        from django.contrib.auth.models import Permission
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from keysmith.auth.utils import get_token_scopes
+
+        user = django_user_model.objects.create_user(username="scoped-user")
+        permission = Permission.objects.create(
+            codename="write", name="Can write", content_type_id=1
+        )
+        _, raw_token = create_token(name="scoped-token", user=user, scopes=[permission])
+
+        with CaptureQueriesContext(connection) as context:
+            token = authenticate_token(raw_token)
+            assert token.user == user
+            assert get_token_scopes(token) == frozenset({"write"})
+            assert get_token_scopes(token) == frozenset({"write"})
+
+        selects = self._selects(context)
+        assert len(selects) == 2
+        assert "auth_user" in selects[0]
+        assert '"description"' not in selects[0]
+
+    def test_lock_free_issues_same_queries(self, settings):
+        """LOCK_FREE_AUTH loads the same data with the same query count."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "LOCK_FREE_AUTH": True}
+        _, raw_token = create_token(name="lock-free-token")
+
+        with CaptureQueriesContext(connection) as context:
+            token = authenticate_token(raw_token)
+            assert token.user is None
+
+        assert len(self._selects(context)) == 2
+
+
 @pytest.mark.django_db
 class TestTokenFormatValidation:
     """Test token format validation during authentication."""
@@ -142,3 +189,401 @@ class TestTokenFormatValidation:
 
         with pytest.raises(InvalidToken):
             authenticate_token(tampered)
+
+
+@pytest.mark.django_db
+class TestLockFreeAuthentication:
+    """Test the lock-free authentication mode."""
+
+    @pytest.fixture(autouse=True)
+    def _lock_free(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "LOCK_FREE_AUTH": True}
+
+    def test_lock_free_authenticate_success(self):
+        """Valid token authenticates without SELECT FOR UPDATE."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        token, raw_token = create_token(name="lock-free-token")
+
+        with CaptureQueriesContext(connection) as ctx:
+            authenticated = authenticate_token(raw_token)
+
+        assert authenticated.pk == token.pk
+        assert not any("FOR UPDATE" in query["sql"] for query in ctx.captured_queries)
+
+    def test_lock_free_updates_last_used(self):
+        """Lock-free mode still records usage."""
+        token, raw_token = create_token(name="lock-free-token")
+
+        authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.last_used_at is not None
+
+    def test_lock_free_usage_update_never_moves_backwards(self):
+        """A newer stored last_used_at is not overwritten by an older write."""
+        from keysmith.models import Token
+
+        token, raw_token = create_token(name="lock-free-token")
+        future = timezone.now() + timedelta(hours=1)
+        Token.objects.filter(pk=token.pk).update(last_used_at=future)
+
+        authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.last_used_at == future
+
+    def test_lock_free_revoked_token_raises_revoked(self):
+        """Lock-free mode keeps revoke checks."""
+        token, raw_token = create_token(name="lock-free-token")
+        revoke_token(token)
+
+        with pytest.raises(RevokedToken):
+            authenticate_token(raw_token)
+
+    def test_lock_free_wrong_secret_raises_invalid(self):
+        """Lock-free mode keeps hash verification."""
+        token, _ = create_token(name="lock-free-token")
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(f"{token.prefix}:wrongsecret1234567890123456789012345678901234")
+
+
+@pytest.mark.django_db
+class TestHMACBackendAuthentication:
+    """Test authentication with the HMAC-SHA256 hasher configured."""
+
+    @pytest.fixture(autouse=True)
+    def _hmac_backend(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+            "HMAC_PEPPERS": {"v1": "test-pepper"},
+        }
+
+    def test_create_and_authenticate(self):
+        """Tokens issued with the HMAC hasher authenticate."""
+        token, raw_token = create_token(name="hmac-token")
+
+        assert token.key.startswith("hmac_sha256$v1$")
+        assert authenticate_token(raw_token).pk == token.pk
+
+    def test_wrong_secret_raises_invalid(self):
+        """HMAC verification rejects wrong secrets."""
+        token, _ = create_token(name="hmac-token")
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(f"{token.prefix}:wrongsecret1234567890123456789012345678901234")
+
+
+@pytest.mark.django_db
+class TestScryptBackendAuthentication:
+    """Test authentication with the scrypt hasher configured."""
+
+    @pytest.fixture(autouse=True)
+    def _scrypt_backend(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "keysmith.hashers.ScryptTokenHasher",
+            "SCRYPT_N": 2**10,
+        }
+
+    def test_create_and_authenticate(self):
+        """Tokens issued with the scrypt hasher authenticate."""
+        token, raw_token = create_token(name="scrypt-token")
+
+        assert token.key.startswith("scrypt$1024$8$1$")
+        assert authenticate_token(raw_token).pk == token.pk
+
+    def test_upgrade_when_cost_changes(self, settings, django_capture_on_commit_callbacks):
+        """Raising SCRYPT_N rehashes on the next successful verify."""
+        token, raw_token = create_token(name="scrypt-token")
+        settings.KEYSMITH = {**settings.KEYSMITH, "SCRYPT_N": 2**11}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.key.startswith("scrypt$2048$8$1$")
+
+
+@pytest.mark.django_db
+class TestUntaggedBackendAuthentication:
+    """Test a custom backend whose hashes carry no algorithm tag."""
+
+    @pytest.fixture(autouse=True)
+    def _untagged_backend(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "tests.test_hashers.UntaggedTokenHasher",
+        }
+
+    def test_authenticates_without_rehashing(self, django_capture_on_commit_callbacks):
+        """Untagged hashes verify with the configured backend and are left as they are."""
+        token, raw_token = create_token(name="untagged-token")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert authenticate_token(raw_token).pk == token.pk
+        token.refresh_from_db()
+
+        assert token.key.startswith("sha:")
+
+    def test_async_and_batch_authenticate(self):
+        """The async and batch paths dispatch untagged hashes the same way."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token, authenticate_tokens
+
+        token, raw_token = create_token(name="untagged-token")
+
+        assert async_to_sync(aauthenticate_token)(raw_token).pk == token.pk
+        (result,) = authenticate_tokens([raw_token])
+
+        assert result.token.pk == token.pk
+
+    def test_wrong_secret_raises_invalid(self):
+        """Untagged verification still rejects wrong secrets."""
+        from keysmith.utils.tokens import build_public_token
+
+        token, _ = create_token(name="untagged-token")
+        wrong = build_public_token(
+            namespace=token.prefix.split("_")[0],
+            identifier=token.prefix.split("_", 1)[1],
+            secret="x" * 32,
+        ).token
+
+        with pytest.raises(InvalidToken):
+            authenticate_token(wrong)
+
+
+@pytest.mark.django_db
+class TestHashUpgradeOnVerify:
+    """Test transparent rehashing after a backend or parameter change."""
+
+    def test_legacy_hash_verifies_and_is_upgraded(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        """A PBKDF2 token keeps working and is rewritten with the new backend."""
+        token, raw_token = create_token(name="legacy-token")
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+            "HMAC_PEPPERS": {"v1": "test-pepper"},
+        }
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.key.startswith("hmac_sha256$")
+        assert authenticate_token(raw_token).pk == token.pk
+
+    def test_upgrade_when_parameters_change(self, settings, django_capture_on_commit_callbacks):
+        """Changing HASH_ITERATIONS rehashes on the next successful verify."""
+        token, raw_token = create_token(name="pbkdf2-token")
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.key.startswith("pbkdf2_sha512$1000$")
+
+    def test_upgrade_does_not_overwrite_concurrent_rotation(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        """The rewrite is skipped when the key changed before commit."""
+        from keysmith.models import Token
+
+        token, raw_token = create_token(name="legacy-token")
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+            Token.objects.filter(pk=token.pk).update(key="rotated-key")
+        token.refresh_from_db()
+
+        assert token.key == "rotated-key"
+
+    def test_upgrade_follows_registry_needs_update(
+        self, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        """Authentication rehashes exactly when HasherRegistry.needs_update says so."""
+        from keysmith.hashers.registry import HasherRegistry
+
+        token, raw_token = create_token(name="current-token")
+        original_key = token.key
+        monkeypatch.setattr(HasherRegistry, "needs_update", lambda self, hashed: True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.key != original_key
+        assert authenticate_token(raw_token).pk == token.pk
+
+    def test_no_upgrade_when_disabled(self, settings, django_capture_on_commit_callbacks):
+        """UPGRADE_HASHES=False leaves outdated hashes untouched."""
+        token, raw_token = create_token(name="legacy-token")
+        original_key = token.key
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_ITERATIONS": 1_000,
+            "UPGRADE_HASHES": False,
+        }
+
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticate_token(raw_token)
+        token.refresh_from_db()
+
+        assert token.key == original_key
+
+
+@pytest.mark.django_db
+class TestAsyncAuthenticateToken:
+    """Test the async authentication pipeline."""
+
+    def test_aauthenticate_token_success(self):
+        """Valid token authenticates through the async ORM."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token
+
+        token, raw_token = create_token(name="async-token")
+
+        authenticated = async_to_sync(aauthenticate_token)(raw_token)
+        token.refresh_from_db()
+
+        assert authenticated.pk == token.pk
+        assert token.last_used_at is not None
+
+    def test_aauthenticate_token_wrong_secret_raises_invalid(self):
+        """Async verification rejects wrong secrets."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token
+
+        token, _ = create_token(name="async-token")
+
+        with pytest.raises(InvalidToken):
+            async_to_sync(aauthenticate_token)(
+                f"{token.prefix}:wrongsecret1234567890123456789012345678901234"
+            )
+
+    def test_aauthenticate_token_revoked_raises_revoked(self):
+        """Async pipeline keeps revoke checks."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token
+
+        token, raw_token = create_token(name="async-token")
+        revoke_token(token)
+
+        with pytest.raises(RevokedToken):
+            async_to_sync(aauthenticate_token)(raw_token)
+
+    def test_aauthenticate_token_unknown_prefix_raises_invalid(self):
+        """Async pipeline rejects unknown prefixes."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token
+
+        with pytest.raises(InvalidToken):
+            async_to_sync(aauthenticate_token)("tok_nonexistent:secret123456")
+
+
+@pytest.mark.django_db
+def test_hasher_unavailable_maps_to_auth_error(monkeypatch):
+    """A saturated or timed-out hashing pool surfaces as VerificationUnavailable."""
+    from keysmith.auth import base
+    from keysmith.auth.exceptions import TokenAuthError, VerificationUnavailable
+    from keysmith.hashers.executor import HasherUnavailable
+
+    _, raw_token = create_token(name="pooled-token")
+
+    def unavailable(hasher, secret, hashed):
+        raise HasherUnavailable("Token hashing did not finish within 5s.")
+
+    monkeypatch.setattr(base, "run_verify", unavailable)
+
+    with pytest.raises(VerificationUnavailable) as exc:
+        authenticate_token(raw_token)
+
+    assert isinstance(exc.value, TokenAuthError)
+
+
+@pytest.mark.django_db
+class TestAuthenticateTokens:
+    """Test batch authentication."""
+
+    def test_results_match_input_order(self):
+        """Each input gets its own result, valid or not, in order."""
+        from keysmith.auth.base import authenticate_tokens
+
+        first, first_raw = create_token(name="first")
+        second, second_raw = create_token(name="second")
+        revoked, revoked_raw = create_token(name="revoked")
+        revoke_token(revoked)
+
+        results = authenticate_tokens(
+            [first_raw, "invalid-token-format", revoked_raw, second_raw, first_raw]
+        )
+
+        assert [result.ok for result in results] == [True, False, False, True, True]
+        assert results[0].token.pk == first.pk
+        assert isinstance(results[1].error, InvalidToken)
+        assert isinstance(results[2].error, RevokedToken)
+        assert results[3].token.pk == second.pk
+        assert results[4].token is results[0].token
+
+    def test_wrong_secret_and_unknown_prefix_are_reported(self):
+        """Verification failures and missing rows do not raise."""
+        from keysmith.auth.base import authenticate_tokens
+
+        token, _ = create_token(name="batch-token")
+
+        results = authenticate_tokens(
+            [
+                f"{token.prefix}:wrongsecret1234567890123456789012345678901234",
+                "tok_nonexistent:secret123456",
+            ]
+        )
+
+        assert all(isinstance(result.error, InvalidToken) for result in results)
+
+    def test_batch_uses_constant_queries(self, django_assert_num_queries):
+        """One SELECT, one scope prefetch and one UPDATE regardless of batch size."""
+        from keysmith.auth.base import authenticate_tokens
+        from keysmith.auth.utils import get_token_scopes
+
+        raw_tokens = [create_token(name=f"batch-{i}")[1] for i in range(5)]
+
+        with django_assert_num_queries(3):
+            results = authenticate_tokens(raw_tokens)
+            for result in results:
+                get_token_scopes(result.token)
+                assert result.token.user is None
+
+        assert all(result.ok for result in results)
+
+    def test_batch_updates_last_used(self):
+        """Usage is recorded for every authenticated token."""
+        from keysmith.auth.base import authenticate_tokens
+
+        first, first_raw = create_token(name="first")
+        second, second_raw = create_token(name="second")
+
+        authenticate_tokens([first_raw, second_raw])
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        assert first.last_used_at is not None
+        assert second.last_used_at is not None
+
+    def test_empty_batch(self, django_assert_num_queries):
+        """An empty batch touches nothing."""
+        from keysmith.auth.base import authenticate_tokens
+
+        with django_assert_num_queries(0):
+            assert authenticate_tokens([]) == []
@@ -1,4 +1,10 @@
-from keysmith.checks import check_sqlite_concurrency
+from keysmith.checks import (
+    check_hmac_peppers,
+    check_outage_policy,
+    check_prefix_filter_alias,
+    check_scrypt_parameters,
+    check_sqlite_concurrency,
+)
 
 
 def test_sqlite_concurrency_check_warns_on_sqlite_default_db():
@@ -10,3 +16,101 @@ def test_sqlite_concurrency_check_warns_on_sqlite_default_db():
     assert "SELECT FOR UPDATE" in warning.msg
     assert "PostgreSQL" in warning.msg
     assert "MySQL" in warning.msg
+
+
+def test_sqlite_concurrency_check_silent_in_lock_free_mode(settings):
+    """keysmith.W001 is not emitted when LOCK_FREE_AUTH is enabled."""
+    settings.KEYSMITH = {**settings.KEYSMITH, "LOCK_FREE_AUTH": True}
+
+    warnings = check_sqlite_concurrency(app_configs=None)
+
+    assert not any(item.id == "keysmith.W001" for item in warnings)
+
+
+def test_hmac_pepper_check_errors_without_pepper(settings):
+    """keysmith.E004 is emitted when the HMAC hasher has no pepper."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+    }
+
+    errors = check_hmac_peppers(app_configs=None)
+
+    assert [error.id for error in errors] == ["keysmith.E004"]
+
+
+def test_hmac_pepper_check_passes_with_pepper(settings):
+    """keysmith.E004 is not emitted once a pepper is configured."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+        "HMAC_PEPPERS": {"v1": "pepper"},
+    }
+
+    assert check_hmac_peppers(app_configs=None) == []
+
+
+def test_hmac_pepper_check_rejects_separator_in_pepper_id(settings):
+    """keysmith.E007 is emitted when HMAC_PEPPER_ID contains the hash separator."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+        "HMAC_PEPPERS": {"v$1": "pepper"},
+        "HMAC_PEPPER_ID": "v$1",
+    }
+
+    errors = check_hmac_peppers(app_configs=None)
+
+    assert [error.id for error in errors] == ["keysmith.E007"]
+
+
+def test_prefix_filter_check_warns_without_alias(settings):
+    """keysmith.W002 is emitted when the prefix filter has no shared alias."""
+    settings.KEYSMITH = {**settings.KEYSMITH, "PREFIX_FILTER": True}
+
+    warnings = check_prefix_filter_alias(app_configs=None)
+
+    assert [warning.id for warning in warnings] == ["keysmith.W002"]
+
+
+def test_prefix_filter_check_passes_with_alias(settings):
+    """keysmith.W002 is not emitted once PREFIX_FILTER_ALIAS is set."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "PREFIX_FILTER": True,
+        "PREFIX_FILTER_ALIAS": "default",
+    }
+
+    assert check_prefix_filter_alias(app_configs=None) == []
+
+
+def test_outage_policy_check_rejects_unknown_policy(settings):
+    """keysmith.E005 is emitted for an unsupported OUTAGE_POLICY."""
+    settings.KEYSMITH = {**settings.KEYSMITH, "OUTAGE_POLICY": "fail_open"}
+
+    errors = check_outage_policy(app_configs=None)
+
+    assert [error.id for error in errors] == ["keysmith.E005"]
+
+
+def test_scrypt_check_errors_on_invalid_cost(settings):
+    """keysmith.E006 is emitted when SCRYPT_N is not a power of two."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "HASH_BACKEND": "keysmith.hashers.ScryptTokenHasher",
+        "SCRYPT_N": 10_000,
+    }
+
+    errors = check_scrypt_parameters(app_configs=None)
+
+    assert [error.id for error in errors] == ["keysmith.E006"]
+
+
+def test_scrypt_check_passes_with_defaults(settings):
+    """keysmith.E006 is not emitted for the default scrypt parameters."""
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "HASH_BACKEND": "keysmith.hashers.ScryptTokenHasher",
+    }
+
+    assert check_scrypt_parameters(app_configs=None) == []
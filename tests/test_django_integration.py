@@ -4,7 +4,8 @@ import pytest
 from django.http import JsonResponse
 from django.test import RequestFactory
 
-from keysmith.django.decorator import keysmith_required
+from keysmith.django.decorator import keysmith_exempt, keysmith_required
+from keysmith.django.exclusions import ExclusionRules
 from keysmith.django.middleware import KeysmithAuthenticationMiddleware
 from keysmith.django.permissions import keysmith_scopes
 from keysmith.services.tokens import create_token
@@ -80,6 +81,295 @@ class TestKeysmithMiddleware:
         assert request.keysmith_auth_error is not None
 
 
+@pytest.mark.django_db
+class TestAsyncKeysmithMiddleware:
+    """Test the middleware in an async request chain."""
+
+    @staticmethod
+    def _middleware():
+        async def get_response(request):
+            return JsonResponse({"ok": True})
+
+        return KeysmithAuthenticationMiddleware(get_response)
+
+    def test_middleware_is_async_when_chain_is_async(self):
+        """The middleware marks itself as a coroutine for async chains."""
+        from asgiref.sync import iscoroutinefunction
+
+        assert iscoroutinefunction(self._middleware()) is True
+        assert KeysmithAuthenticationMiddleware.async_capable is True
+        assert KeysmithAuthenticationMiddleware.sync_capable is True
+
+    def test_async_middleware_sets_token_and_user(self, django_user_model):
+        """Async middleware populates token and user context."""
+        from asgiref.sync import async_to_sync
+
+        user = django_user_model.objects.create_user(username="async-user")
+        token, raw_token = create_token(name="async-token", user=user)
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        response = async_to_sync(self._middleware())(request)
+
+        assert response.status_code == 200
+        assert request.keysmith_token.pk == token.pk
+        assert request.keysmith_user.pk == user.pk
+
+    def test_async_middleware_sets_auth_error_for_invalid_token(self):
+        """Async middleware records auth errors."""
+        from asgiref.sync import async_to_sync
+
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN="invalid-token")
+
+        async_to_sync(self._middleware())(request)
+
+        assert request.keysmith_token is None
+        assert request.keysmith_auth_error is not None
+
+
+@pytest.mark.django_db
+class TestLazyKeysmithMiddleware:
+    """Test deferred authentication with LAZY_AUTH."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_lazy_auth(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "LAZY_AUTH": True,
+            "ENABLE_AUDIT_LOGGING": True,
+        }
+
+    @staticmethod
+    def _audit_actions():
+        from keysmith.models.utils import get_audit_log_model
+
+        audit_logs = get_audit_log_model().objects.filter(action__startswith="auth_")
+        return list(audit_logs.values_list("action", flat=True))
+
+    def test_untouched_context_skips_authentication(self, django_assert_num_queries):
+        """A view that never reads the token costs no queries and no audit row."""
+        _, raw_token = create_token(name="lazy-token")
+        request = RequestFactory().get("/public/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        with django_assert_num_queries(0):
+            KeysmithAuthenticationMiddleware(lambda request: JsonResponse({"ok": True}))(request)
+
+        assert self._audit_actions() == []
+
+    def test_first_access_authenticates_once(self, monkeypatch):
+        """Reading any context attribute authenticates, and only once."""
+        from keysmith.django import middleware
+
+        calls = []
+        original = middleware.authenticate_token
+
+        def counting(raw_token):
+            calls.append(raw_token)
+            return original(raw_token)
+
+        monkeypatch.setattr(middleware, "authenticate_token", counting)
+        token, raw_token = create_token(name="lazy-token")
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        def view(request):
+            assert request.keysmith_token.pk == token.pk
+            assert not request.keysmith_auth_error
+            assert request.keysmith_user is None
+            return JsonResponse({"ok": True})
+
+        KeysmithAuthenticationMiddleware(view)(request)
+
+        assert len(calls) == 1
+        assert request.keysmith_token.pk == token.pk
+        assert self._audit_actions() == ["auth_success"]
+
+    def test_invalid_token_fails_on_access(self):
+        """keysmith_required sees the deferred failure and it is audited."""
+
+        @keysmith_required
+        def view(request):
+            return JsonResponse({"ok": True})
+
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN="invalid-token")
+
+        response = KeysmithAuthenticationMiddleware(view)(request)
+
+        assert response.status_code == 401
+        assert request.keysmith_token is None
+        assert self._audit_actions() == ["auth_failed"]
+
+    def test_scopes_decorator_resolves_lazily(self):
+        """keysmith_scopes authorizes against the deferred token."""
+        from django.contrib.auth.models import Permission
+
+        permission = Permission.objects.first()
+        _, raw_token = create_token(name="lazy-token", scopes=[permission])
+
+        @keysmith_scopes(permission.codename)
+        def view(request):
+            return JsonResponse({"ok": True})
+
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert KeysmithAuthenticationMiddleware(view)(request).status_code == 200
+
+    def test_async_views_await_token(self):
+        """Async chains resolve through request.akeysmith_token()."""
+        from asgiref.sync import async_to_sync
+
+        token, raw_token = create_token(name="lazy-token")
+        seen = []
+
+        async def view(request):
+            seen.append(await request.akeysmith_token())
+            return JsonResponse({"ok": True})
+
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        async_to_sync(KeysmithAuthenticationMiddleware(view))(request)
+
+        assert seen[0].pk == token.pk
+        assert request.keysmith_token.pk == token.pk
+
+
+class TestExclusionRules:
+    """Test the compiled EXCLUDE matcher."""
+
+    def test_paths_match_as_prefixes(self):
+        rules = ExclusionRules(paths=["/static/", "/healthz"])
+
+        assert rules.excludes_path("/static/app.css")
+        assert rules.excludes_path("/healthz")
+        assert not rules.excludes_path("/api/static/")
+
+    def test_regexes_match_from_path_start(self):
+        rules = ExclusionRules(regexes=[r"/metrics/?$"])
+
+        assert rules.excludes_path("/metrics")
+        assert not rules.excludes_path("/metrics/extra")
+        assert not rules.excludes_path("/api/metrics")
+
+    def test_no_rules_exclude_nothing(self):
+        assert not ExclusionRules().excludes_path("/")
+
+    def test_url_names_match_resolved_view(self):
+        from django.urls import resolve
+
+        rules = ExclusionRules(url_names=["token_status"])
+
+        assert rules.excludes_view(lambda request: None, resolve("/api/status/"))
+        assert not rules.excludes_view(lambda request: None, resolve("/api/resources/"))
+
+
+@pytest.mark.django_db
+class TestMiddlewareExclusions:
+    """Test EXCLUDE rules and keysmith_exempt in the middleware."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_audit(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "ENABLE_AUDIT_LOGGING": True}
+
+    @staticmethod
+    def _auth_audit_count():
+        from keysmith.models.utils import get_audit_log_model
+
+        return get_audit_log_model().objects.filter(action__startswith="auth_").count()
+
+    def test_excluded_path_skips_authentication(self, settings, django_assert_num_queries):
+        """Excluded paths get an empty context without any query."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "EXCLUDE": {"paths": ["/healthz"]}}
+        _, raw_token = create_token(name="excluded")
+        request = RequestFactory().get("/healthz", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        with django_assert_num_queries(0):
+            KeysmithAuthenticationMiddleware(lambda request: JsonResponse({"ok": True}))(request)
+
+        assert request.keysmith_token is None
+        assert self._auth_audit_count() == 0
+
+    def test_excluded_url_name_gets_empty_context(self, client, settings):
+        """Views matched by URL name see no token and are not audited."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "EXCLUDE": {"url_names": ["token_status"]}}
+        _, raw_token = create_token(name="excluded")
+
+        response = client.get("/api/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 401
+        assert self._auth_audit_count() == 0
+
+    def test_excluded_url_name_never_authenticates_in_eager_mode(
+        self, client, settings, monkeypatch
+    ):
+        """Eager mode resolves the view first and skips the lookup for excluded URL names."""
+        from keysmith.django import middleware
+
+        def fail(raw_token):
+            raise AssertionError("excluded views must not authenticate")
+
+        monkeypatch.setattr(middleware, "authenticate_token", fail)
+        settings.KEYSMITH = {**settings.KEYSMITH, "EXCLUDE": {"url_names": ["token_status"]}}
+        _, raw_token = create_token(name="excluded")
+
+        response = client.get("/api/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 401
+        assert self._auth_audit_count() == 0
+
+    def test_exempt_view_never_authenticates_in_async_eager_mode(self, monkeypatch):
+        """keysmith_exempt views are skipped before the async lookup too."""
+        from asgiref.sync import async_to_sync
+        from django.urls import path
+
+        from keysmith.django import middleware
+
+        async def fail(raw_token):
+            raise AssertionError("exempt views must not authenticate")
+
+        monkeypatch.setattr(middleware, "aauthenticate_token", fail)
+        _, raw_token = create_token(name="exempt")
+
+        @keysmith_exempt
+        async def view(request):
+            return JsonResponse({"token": bool(request.keysmith_token)})
+
+        class urlconf:
+            urlpatterns = [path("exempt/", view)]
+
+        mw = KeysmithAuthenticationMiddleware(view)
+        request = RequestFactory().get("/exempt/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+        request.urlconf = urlconf
+
+        response = async_to_sync(mw)(request)
+
+        assert json.loads(response.content) == {"token": False}
+        assert self._auth_audit_count() == 0
+
+    def test_exempt_view_never_authenticates_in_lazy_mode(self, settings, monkeypatch):
+        """keysmith_exempt drops the deferred lookup before it runs."""
+        from keysmith.django import middleware
+
+        def fail(raw_token):
+            raise AssertionError("exempt views must not authenticate")
+
+        monkeypatch.setattr(middleware, "authenticate_token", fail)
+        settings.KEYSMITH = {**settings.KEYSMITH, "LAZY_AUTH": True}
+        _, raw_token = create_token(name="exempt")
+
+        @keysmith_exempt
+        def view(request):
+            return JsonResponse({"token": bool(request.keysmith_token)})
+
+        def handler(request):
+            # what Django's handler does between the middleware and the view.
+            mw.process_view(request, view, (), {})
+            return view(request)
+
+        mw = KeysmithAuthenticationMiddleware(handler)
+        request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+        response = mw(request)
+
+        assert json.loads(response.content) == {"token": False}
+
+
 @pytest.mark.django_db
 class TestKeysmithDecorator:
     """Test @keysmith_required decorator."""
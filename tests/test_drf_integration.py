@@ -80,6 +80,71 @@ class TestDRFAuthentication:
         assert response.status_code == 200
         assert response.json()["token_prefix"] is not None
 
+    @staticmethod
+    def _count_authentications(monkeypatch):
+        from keysmith.django import middleware
+        from keysmith.drf import auth
+
+        calls = []
+        original = middleware.authenticate_token
+
+        def counting(raw_token):
+            calls.append(raw_token)
+            return original(raw_token)
+
+        monkeypatch.setattr(middleware, "authenticate_token", counting)
+        monkeypatch.setattr(auth, "authenticate_token", counting)
+        return calls
+
+    def test_drf_reuses_middleware_success(self, client, monkeypatch, settings):
+        """With the middleware enabled, the token is authenticated once."""
+        from keysmith.models.utils import get_audit_log_model
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "ENABLE_AUDIT_LOGGING": True}
+        calls = self._count_authentications(monkeypatch)
+        token, raw_token = create_token(name="test-token")
+
+        response = client.get("/api/drf/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 200
+        assert response.json()["token_prefix"] == token.prefix
+        assert len(calls) == 1
+        audit_logs = get_audit_log_model().objects.filter(action__startswith="auth_")
+        assert list(audit_logs.values_list("action", flat=True)) == ["auth_success"]
+
+    def test_drf_reuses_middleware_failure(self, client, monkeypatch):
+        """A failure recorded by the middleware is raised without a second attempt."""
+        calls = self._count_authentications(monkeypatch)
+        token, raw_token = create_token(name="revoked-token")
+        revoke_token(token)
+
+        response = client.get("/api/drf/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 401
+        assert len(calls) == 1
+
+    def test_drf_reuses_lazy_middleware_context(self, client, monkeypatch, settings):
+        """A lazy middleware context is resolved once and shared."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "LAZY_AUTH": True}
+        calls = self._count_authentications(monkeypatch)
+        _, raw_token = create_token(name="test-token")
+
+        response = client.get("/api/drf/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 200
+        assert len(calls) == 1
+
+    def test_drf_authenticates_without_middleware(self, client, monkeypatch, settings):
+        """Without the middleware, DRF authenticates on its own."""
+        settings.MIDDLEWARE = [m for m in settings.MIDDLEWARE if not m.startswith("keysmith.")]
+        calls = self._count_authentications(monkeypatch)
+        _, raw_token = create_token(name="test-token")
+
+        response = client.get("/api/drf/status/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 200
+        assert len(calls) == 1
+
 
 @drf_only
 @pytest.mark.django_db
@@ -135,6 +200,20 @@ class TestDRFPermissionClasses:
 
         assert response.status_code == 403
 
+    def test_has_keysmith_scopes_with_token_principal(self, client, settings):
+        """HasKeysmithScopes accepts a TokenPrincipal as request.auth."""
+        from django.contrib.auth.models import Permission
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "TOKEN_PRINCIPAL": True}
+        permission = Permission.objects.create(
+            codename="write", name="Can write", content_type_id=1
+        )
+        _, raw_token = create_token(name="scoped-token", scopes=[permission])
+
+        response = client.get("/api/drf/scoped/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+        assert response.status_code == 200
+
 
 @drf_only
 @pytest.mark.django_db
@@ -1,8 +1,28 @@
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 
 from keysmith.hashers.base import BaseTokenHasher
+from keysmith.hashers.hmac_sha256 import HMACSHA256TokenHasher
 from keysmith.hashers.pbkdf2 import PBKDF2SHA512TokenHasher
-from keysmith.hashers.registry import get_hasher
+from keysmith.hashers.registry import (
+    get_hasher,
+    get_registry,
+    identify_hasher,
+    needs_update,
+)
+from keysmith.hashers.scrypt import ScryptTokenHasher
+
+
+class UntaggedTokenHasher(BaseTokenHasher):
+    """Custom backend that writes no algorithm tag, as allowed before tags existed."""
+
+    def hash(self, secret: str) -> str:
+        import hashlib
+
+        return f"sha:{hashlib.sha256(secret.encode()).hexdigest()}"
+
+    def verify(self, secret: str, hashed: str) -> bool:
+        return self.hash(secret) == hashed
 
 
 class TestBaseTokenHasher:
@@ -78,12 +98,170 @@ class TestPBKDF2SHA512TokenHasher:
         assert hasher.verify(secret, hash1) is True
         assert hasher.verify(secret, hash2) is True
 
+    def test_hasher_rejects_foreign_hashes(self):
+        """Hashes from other backends are rejected instead of raising."""
+        hasher = PBKDF2SHA512TokenHasher()
+
+        assert hasher.verify("secret", "md5$abc$def") is False
+        assert hasher.verify("secret", "pbkdf2_sha512$x") is False
+        assert hasher.must_update("sha:abc") is True
+
     def test_hasher_algorithm_name(self):
         """Hasher reports correct algorithm name."""
         hasher = PBKDF2SHA512TokenHasher()
 
         assert hasher.algorithm == "pbkdf2_sha512"
 
+    def test_must_update_when_iterations_change(self, settings):
+        """Hashes made with a different iteration count need an update."""
+        hashed = PBKDF2SHA512TokenHasher().hash("test-secret-12345")
+        assert PBKDF2SHA512TokenHasher().must_update(hashed) is False
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+
+        assert PBKDF2SHA512TokenHasher().must_update(hashed) is True
+
+    def test_with_cost_returns_independent_copy(self):
+        """with_cost changes iterations for new hashes without touching the original."""
+        hasher = PBKDF2SHA512TokenHasher()
+        cheaper = hasher.with_cost(1_000)
+
+        assert cheaper.hash("secret").startswith("pbkdf2_sha512$1000$")
+        assert hasher.must_update(cheaper.hash("secret")) is True
+        assert hasher._hasher.iterations == 100_000
+
+
+class TestHMACSHA256TokenHasher:
+    """Test keyed HMAC-SHA256 hasher."""
+
+    @pytest.fixture(autouse=True)
+    def _peppers(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HMAC_PEPPERS": {"v1": "pepper-one", "v2": "pepper-two"},
+            "HMAC_PEPPER_ID": "v2",
+        }
+
+    def test_hasher_produces_self_describing_output(self):
+        """Encoded hash carries algorithm and pepper id."""
+        hashed = HMACSHA256TokenHasher().hash("test-secret-12345")
+
+        algorithm, pepper_id, salt, digest = hashed.split("$")
+        assert algorithm == "hmac_sha256"
+        assert pepper_id == "v2"
+        assert salt and digest
+
+    def test_hasher_verifies_correct_secret(self):
+        """Hasher verifies correct secret."""
+        hasher = HMACSHA256TokenHasher()
+        hashed = hasher.hash("test-secret-12345")
+
+        assert hasher.verify("test-secret-12345", hashed) is True
+        assert hasher.verify("wrong-secret-12345", hashed) is False
+
+    def test_hasher_verifies_hashes_from_older_pepper(self, settings):
+        """Hashes made with a retired-but-configured pepper still verify."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPER_ID": "v1"}
+        hashed = HMACSHA256TokenHasher().hash("test-secret-12345")
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPER_ID": "v2"}
+
+        assert HMACSHA256TokenHasher().verify("test-secret-12345", hashed) is True
+
+    def test_hasher_rejects_unknown_pepper(self, settings):
+        """Hashes made with a removed pepper no longer verify."""
+        hashed = HMACSHA256TokenHasher().hash("test-secret-12345")
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPERS": {"v1": "pepper-one"}}
+
+        assert HMACSHA256TokenHasher().verify("test-secret-12345", hashed) is False
+
+    def test_hasher_rejects_other_algorithms(self):
+        """Non-HMAC encodings are rejected instead of raising."""
+        hasher = HMACSHA256TokenHasher()
+
+        assert hasher.verify("secret", PBKDF2SHA512TokenHasher().hash("secret")) is False
+        assert hasher.verify("secret", "garbage") is False
+
+    def test_must_update_when_pepper_changes(self, settings):
+        """Hashes made with a non-current pepper need an update."""
+        hashed = HMACSHA256TokenHasher().hash("test-secret-12345")
+        assert HMACSHA256TokenHasher().must_update(hashed) is False
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPER_ID": "v1"}
+
+        assert HMACSHA256TokenHasher().must_update(hashed) is True
+
+    def test_non_string_pepper_ids(self, settings):
+        """Integer pepper ids round-trip through the encoded hash."""
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HMAC_PEPPERS": {1: "pepper-one", 2: "pepper-two"},
+            "HMAC_PEPPER_ID": 2,
+        }
+        hasher = HMACSHA256TokenHasher()
+        hashed = hasher.hash("test-secret-12345")
+
+        assert hashed.startswith("hmac_sha256$2$")
+        assert hasher.verify("test-secret-12345", hashed) is True
+        assert hasher.must_update(hashed) is False
+
+    def test_hasher_requires_pepper(self, settings):
+        """Hashing without a configured pepper is a configuration error."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPERS": {}, "HMAC_PEPPER_ID": None}
+
+        with pytest.raises(ImproperlyConfigured):
+            HMACSHA256TokenHasher().hash("secret")
+
+
+class TestScryptTokenHasher:
+    """Test memory-hard scrypt hasher."""
+
+    @pytest.fixture(autouse=True)
+    def _cheap_cost(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "SCRYPT_N": 2**10, "SCRYPT_R": 8, "SCRYPT_P": 1}
+
+    def test_hasher_produces_self_describing_output(self):
+        """Encoded hash carries algorithm and cost parameters."""
+        hashed = ScryptTokenHasher().hash("test-secret-12345")
+
+        algorithm, n, r, p, salt, digest = hashed.split("$")
+        assert (algorithm, n, r, p) == ("scrypt", "1024", "8", "1")
+        assert salt and digest
+
+    def test_hasher_verifies_correct_secret(self):
+        """Hasher verifies correct secret."""
+        hasher = ScryptTokenHasher()
+        hashed = hasher.hash("test-secret-12345")
+
+        assert hasher.verify("test-secret-12345", hashed) is True
+        assert hasher.verify("wrong-secret-12345", hashed) is False
+
+    def test_hasher_verifies_with_stored_parameters(self, settings):
+        """Hashes keep verifying after the configured cost changes."""
+        hashed = ScryptTokenHasher().hash("test-secret-12345")
+        settings.KEYSMITH = {**settings.KEYSMITH, "SCRYPT_N": 2**11, "SCRYPT_P": 2}
+        hasher = ScryptTokenHasher()
+
+        assert hasher.verify("test-secret-12345", hashed) is True
+        assert hasher.must_update(hashed) is True
+        assert hasher.must_update(hasher.hash("test-secret-12345")) is False
+
+    def test_with_cost_returns_independent_copy(self):
+        """with_cost changes N for new hashes without touching the original."""
+        hasher = ScryptTokenHasher()
+        cheaper = hasher.with_cost(2**9)
+
+        assert cheaper.hash("secret").startswith("scrypt$512$8$1$")
+        assert hasher.n == 2**10
+
+    def test_hasher_rejects_malformed_hashes(self):
+        """Foreign or corrupt encodings are rejected instead of raising."""
+        hasher = ScryptTokenHasher()
+
+        assert hasher.verify("secret", PBKDF2SHA512TokenHasher().hash("secret")) is False
+        assert hasher.verify("secret", "scrypt$1000$8$1$salt$digest") is False
+        assert hasher.verify("secret", "garbage") is False
+        assert hasher.must_update("garbage") is True
+
 
 class TestHasherRegistry:
     """Test hasher registry."""
@@ -94,12 +272,267 @@ class TestHasherRegistry:
 
         assert isinstance(hasher, PBKDF2SHA512TokenHasher)
 
-    def test_get_hasher_returns_new_instance(self):
-        """get_hasher returns a new instance each time."""
+    def test_get_hasher_returns_cached_instance(self):
+        """get_hasher reuses one instance until KEYSMITH changes."""
         hasher1 = get_hasher()
         hasher2 = get_hasher()
 
-        # Not the same instance (no singleton)
-        assert hasher1 is not hasher2
-        # But same type
-        assert type(hasher1) is type(hasher2)
+        assert hasher1 is hasher2
+
+    def test_settings_change_rebuilds_hashers(self, settings):
+        """Hashers are rebuilt when KEYSMITH changes, picking up new parameters."""
+        before = get_hasher()
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+
+        after = get_hasher()
+        assert after is not before
+        assert after._hasher.iterations == 1_000
+
+    def test_identify_hasher_by_algorithm_tag(self, settings):
+        """identify_hasher picks the backend matching the encoded hash."""
+        hashed = PBKDF2SHA512TokenHasher().hash("secret")
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "keysmith.hashers.HMACSHA256TokenHasher",
+            "HMAC_PEPPERS": {"v1": "pepper"},
+        }
+
+        hasher = identify_hasher(hashed)
+
+        assert isinstance(hasher, PBKDF2SHA512TokenHasher)
+        assert hasher.verify("secret", hashed) is True
+
+    def test_identify_hasher_rejects_unknown_algorithm(self):
+        """Unknown algorithm tags raise ValueError."""
+        with pytest.raises(ValueError):
+            identify_hasher("md5$abc$def")
+
+    def test_hash_backends_list_orders_backends(self, settings):
+        """The first HASH_BACKENDS entry hashes; the rest still verify."""
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKENDS": [
+                "keysmith.hashers.HMACSHA256TokenHasher",
+                "keysmith.hashers.PBKDF2SHA512TokenHasher",
+            ],
+            "HMAC_PEPPERS": {"v1": "pepper"},
+        }
+        registry = get_registry()
+        old_hash = registry.hashers[1].hash("secret")
+
+        assert isinstance(get_hasher(), HMACSHA256TokenHasher)
+        assert registry.verify("secret", old_hash) is True
+        assert registry.verify("secret", registry.hash("secret")) is True
+        assert registry.verify("secret", "md5$abc$def") is False
+
+    def test_hash_backends_list_is_exhaustive(self, settings):
+        """Backends missing from HASH_BACKENDS are not consulted."""
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKENDS": ["keysmith.hashers.HMACSHA256TokenHasher"],
+            "HMAC_PEPPERS": {"v1": "pepper"},
+        }
+
+        with pytest.raises(ValueError):
+            identify_hasher(PBKDF2SHA512TokenHasher().hash("secret"))
+
+    def test_untagged_hashes_go_to_default_backend(self, settings):
+        """A custom backend without a tag keeps verifying and is not rehashed."""
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_BACKEND": "tests.test_hashers.UntaggedTokenHasher",
+        }
+        registry = get_registry()
+        hashed = registry.hash("secret")
+
+        assert isinstance(registry.default, UntaggedTokenHasher)
+        assert registry.verify("secret", hashed) is True
+        assert registry.verify("wrong", hashed) is False
+        assert needs_update(hashed) is False
+
+    def test_needs_update(self, settings):
+        """needs_update flags other backends, old parameters and unknown tags."""
+        current = get_hasher().hash("secret")
+        weaker = PBKDF2SHA512TokenHasher()
+        weaker._hasher.iterations = 1_000
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPERS": {"v1": "pepper"}}
+
+        assert needs_update(get_hasher().hash("secret")) is False
+        assert needs_update(weaker.hash("secret")) is True
+        assert needs_update(HMACSHA256TokenHasher().hash("secret")) is True
+        assert needs_update("md5$abc$def") is True
+        assert current.startswith("pbkdf2_sha512$")
+
+
+class TestHashExecutor:
+    """Test the opt-in hashing process pool."""
+
+    @pytest.fixture
+    def process_pool(self, settings):
+        from keysmith.hashers import executor
+
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_ITERATIONS": 1_000,
+            "HASH_PROCESS_WORKERS": 1,
+        }
+        yield
+        if executor._process_pool is not None:
+            executor._process_pool.shutdown()
+            executor._process_pool = None
+
+    def test_runs_inline_by_default(self):
+        """Without HASH_PROCESS_WORKERS hashing runs in-process."""
+        from keysmith.hashers import executor
+
+        hasher = PBKDF2SHA512TokenHasher()
+        hashed = executor.run_hash(hasher, "secret")
+
+        assert executor._get_process_pool() is None
+        assert executor.run_verify(hasher, "secret", hashed) is True
+
+    def test_hash_and_verify_in_process_pool(self, process_pool):
+        """Pooled hashing produces hashes that verify in and out of the pool."""
+        from keysmith.hashers import executor
+
+        hasher = PBKDF2SHA512TokenHasher()
+        hashed = executor.run_hash(hasher, "secret")
+
+        assert executor._get_process_pool() is not None
+        assert executor.run_verify(hasher, "secret", hashed) is True
+        assert executor.run_verify(hasher, "wrong", hashed) is False
+        assert hasher.verify("secret", hashed) is True
+
+    def test_full_queue_raises_unavailable(self, process_pool):
+        """Jobs beyond HASH_QUEUE_LIMIT fail fast."""
+        from keysmith.hashers import executor
+
+        pool = executor._get_process_pool()
+        for _ in range(pool.queue_limit):
+            pool.slots.acquire()
+        try:
+            with pytest.raises(executor.HasherUnavailable):
+                executor.run_hash(PBKDF2SHA512TokenHasher(), "secret")
+        finally:
+            for _ in range(pool.queue_limit):
+                pool.slots.release()
+
+    def test_timeout_raises_unavailable(self, process_pool, settings):
+        """Jobs exceeding HASH_TIMEOUT fail with HasherUnavailable."""
+        from keysmith.hashers import executor
+
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_ITERATIONS": 2_000_000,
+            "HASH_TIMEOUT": 0.01,
+        }
+
+        with pytest.raises(executor.HasherUnavailable):
+            executor.run_hash(PBKDF2SHA512TokenHasher(), "secret")
+
+    def test_timed_out_job_keeps_its_slot_until_done(self, process_pool, settings):
+        """A job still running after its timeout counts against HASH_QUEUE_LIMIT."""
+        from keysmith.hashers import executor
+
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HASH_ITERATIONS": 500_000,
+            "HASH_QUEUE_LIMIT": 1,
+            "HASH_TIMEOUT": 0.01,
+        }
+        with pytest.raises(executor.HasherUnavailable, match="did not finish"):
+            executor.run_hash(PBKDF2SHA512TokenHasher(), "secret")
+
+        with pytest.raises(executor.HasherUnavailable, match="queue is full"):
+            executor.run_hash(PBKDF2SHA512TokenHasher(), "secret")
+
+        pool = executor._get_process_pool()
+        assert pool.slots.acquire(timeout=30)
+        pool.slots.release()
+
+
+class TestCalibrateHasherCommand:
+    """Test the keysmith_calibrate_hasher management command."""
+
+    PBKDF2 = "keysmith.hashers.PBKDF2SHA512TokenHasher"
+
+    def _run(self, *args):
+        import json
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("keysmith_calibrate_hasher", "--json", "--samples", "2", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_recommends_most_expensive_cost_within_target(self, settings, monkeypatch):
+        """Every candidate fits a generous target, so the last one is recommended."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+        monkeypatch.setattr(PBKDF2SHA512TokenHasher, "cost_candidates", (1_000, 2_000))
+
+        registry = get_registry()
+
+        report = self._run("--backend", self.PBKDF2, "--threads", "1", "2", "--target-ms", "10000")
+
+        assert get_registry() is registry
+
+        (backend,) = report["backends"]
+        assert backend["recommended"] == {"HASH_ITERATIONS": 2_000}
+        assert [(result["cost"], result["threads"]) for result in backend["results"]] == [
+            (1_000, 1),
+            (1_000, 2),
+            (2_000, 1),
+            (2_000, 2),
+        ]
+        assert all(result["p99_ms"] >= result["p50_ms"] > 0 for result in backend["results"])
+        assert all(result["hashes_per_sec_per_core"] > 0 for result in backend["results"])
+        assert report["machine"]["cpu_count"]
+
+    def test_stops_after_first_cost_over_target(self, settings):
+        """The sweep ends at the first cost that misses the target."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "HASH_ITERATIONS": 1_000}
+
+        report = self._run("--backend", self.PBKDF2, "--threads", "1", "--target-ms", "0.000001")
+
+        (backend,) = report["backends"]
+        assert backend["recommended"] is None
+        assert [result["cost"] for result in backend["results"]] == [1_000]
+
+    def test_reports_unusable_backend(self, settings):
+        """A backend that cannot hash is reported instead of aborting the run."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPERS": {}}
+
+        report = self._run(
+            "--backend", "keysmith.hashers.HMACSHA256TokenHasher", "--threads", "1"
+        )
+
+        (backend,) = report["backends"]
+        assert backend["results"] == []
+        assert "ImproperlyConfigured" in backend["error"]
+
+    def test_text_report(self, settings):
+        """Without --json the command prints a table and the recommendation."""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "HMAC_PEPPERS": {"v1": "pepper"}}
+        out = StringIO()
+
+        call_command(
+            "keysmith_calibrate_hasher",
+            "--backend",
+            "keysmith.hashers.HMACSHA256TokenHasher",
+            "--samples",
+            "2",
+            "--threads",
+            "1",
+            "--target-ms",
+            "1000",
+            stdout=out,
+        )
+
+        assert "p99 ms" in out.getvalue()
+        assert "Fits the target at the current settings." in out.getvalue()
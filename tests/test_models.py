@@ -119,6 +119,24 @@ class TestTokenModel:
         token.refresh_from_db()
         assert token.last_used_at is None
 
+    def test_token_mark_used_respects_resolution(self, settings):
+        """mark_used skips the write while last_used_at is within LAST_USED_RESOLUTION."""
+        settings.KEYSMITH = {**settings.KEYSMITH, "LAST_USED_RESOLUTION": 60}
+        token, _ = create_token(name="test-token")
+        recent = timezone.now() - timedelta(seconds=30)
+        Token.objects.filter(pk=token.pk).update(last_used_at=recent)
+
+        token.mark_used()
+        token.refresh_from_db()
+        assert token.last_used_at == recent
+
+        stale = timezone.now() - timedelta(seconds=120)
+        Token.objects.filter(pk=token.pk).update(last_used_at=stale)
+
+        token.mark_used()
+        token.refresh_from_db()
+        assert token.last_used_at > stale
+
     def test_token_ordering(self):
         """Tokens are ordered by created_at descending."""
         token1, _ = create_token(name="older-token")
@@ -0,0 +1,155 @@
+import pytest
+
+from keysmith.auth.base import authenticate_token
+from keysmith.auth.exceptions import InvalidToken
+from keysmith.auth.prefix_filter import BloomFilter, get_prefix_filter
+from keysmith.models import Token
+from keysmith.services.tokens import create_token
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "keysmith": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "keysmith-prefix-filter-tests",
+    },
+}
+
+
+class TestBloomFilter:
+    """Test the Bloom filter itself."""
+
+    def test_added_items_are_members(self):
+        """There are never false negatives."""
+        bloom = BloomFilter(capacity=1_000, error_rate=0.01)
+        items = [f"tok_{i:08d}" for i in range(1_000)]
+        for item in items:
+            bloom.add(item)
+
+        assert all(item in bloom for item in items)
+        assert bloom.count == 1_000
+
+    def test_false_positive_rate_is_bounded(self):
+        """Misses are rejected at roughly the configured error rate."""
+        bloom = BloomFilter(capacity=5_000, error_rate=0.01)
+        for i in range(5_000):
+            bloom.add(f"tok_{i:08d}")
+
+        false_positives = sum(f"miss_{i:08d}" in bloom for i in range(10_000))
+
+        assert false_positives < 300
+
+    def test_size_for_a_million_prefixes(self):
+        """A million prefixes at 0.1% fit in under 2 MB."""
+        bloom = BloomFilter(capacity=1_000_000, error_rate=0.001)
+
+        assert bloom.nbytes < 2 * 1024 * 1024
+
+
+@pytest.mark.django_db
+class TestPrefixFilterAuthentication:
+    """Test authenticate_token with the prefix filter enabled."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_filter(self, settings, monkeypatch):
+        from keysmith.auth import prefix_filter
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "PREFIX_FILTER": True}
+        monkeypatch.setattr(prefix_filter, "_prefix_filter", None)
+
+    def test_filter_passes_everything_until_built(self, monkeypatch):
+        """No prefix is rejected before the first build finishes."""
+        prefix_filter = get_prefix_filter()
+        monkeypatch.setattr(prefix_filter, "refresh_in_background", lambda: None)
+
+        assert prefix_filter.might_exist("tok_unknown")
+
+    def test_unknown_prefix_rejected_without_query(self, django_assert_num_queries):
+        """A definite miss never reaches the database."""
+        from keysmith.utils.tokens import build_public_token
+
+        create_token(name="issued-token")
+        get_prefix_filter().rebuild()
+        raw_token = build_public_token(
+            namespace="tok", identifier="neverissued", secret="secret" * 6
+        ).token
+
+        with django_assert_num_queries(0), pytest.raises(InvalidToken):
+            authenticate_token(raw_token)
+
+    def test_issued_prefixes_pass(self):
+        """Tokens present at build time and created afterwards both authenticate."""
+        existing, existing_raw = create_token(name="existing-token")
+        get_prefix_filter().rebuild()
+        created, created_raw = create_token(name="created-token")
+
+        assert authenticate_token(existing_raw).pk == existing.pk
+        assert authenticate_token(created_raw).pk == created.pk
+
+    def test_local_issue_survives_rebuild(self, monkeypatch):
+        """A prefix issued here is carried into a filter built from an older scan."""
+        prefix_filter = get_prefix_filter()
+        prefix_filter.rebuild()
+        token, _ = create_token(name="late-token")
+        monkeypatch.setattr(Token.objects, "filter", lambda **kwargs: Token.objects.none())
+
+        prefix_filter.rebuild(publish=False)
+
+        assert token.prefix in prefix_filter.bloom
+
+    def test_marker_admits_prefix_issued_elsewhere(self, settings):
+        """A recently issued marker in the shared alias overrides a filter miss."""
+        from django.core.cache import caches
+
+        settings.CACHES = CACHES
+        settings.KEYSMITH = {**settings.KEYSMITH, "PREFIX_FILTER_ALIAS": "keysmith"}
+        caches["keysmith"].clear()
+        prefix_filter = get_prefix_filter()
+        prefix_filter.rebuild()
+
+        caches["keysmith"].set("keysmith:issued:tok_elsewhere", 1)
+
+        assert prefix_filter.might_exist("tok_elsewhere")
+        assert not prefix_filter.might_exist("tok_neverseen")
+
+    def test_async_path_reads_marker_off_event_loop(self, settings):
+        """A database-backed PREFIX_FILTER_ALIAS works from aauthenticate_token."""
+        from asgiref.sync import async_to_sync
+        from django.core.management import call_command
+
+        from keysmith.auth.base import aauthenticate_token
+        from keysmith.utils.tokens import build_public_token
+
+        settings.CACHES = {
+            **CACHES,
+            "keysmith": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "keysmith_prefix_filter_cache",
+            },
+        }
+        settings.KEYSMITH = {**settings.KEYSMITH, "PREFIX_FILTER_ALIAS": "keysmith"}
+        call_command("createcachetable", "keysmith_prefix_filter_cache", verbosity=0)
+        get_prefix_filter().rebuild()
+        raw_token = build_public_token(
+            namespace="tok", identifier="neverissued", secret="secret" * 6
+        ).token
+
+        with pytest.raises(InvalidToken):
+            async_to_sync(aauthenticate_token)(raw_token)
+
+    def test_rebuild_command_publishes_filter(self, settings):
+        """The management command rebuilds and publishes the filter."""
+        from io import StringIO
+
+        from django.core.cache import caches
+        from django.core.management import call_command
+
+        settings.CACHES = CACHES
+        settings.KEYSMITH = {**settings.KEYSMITH, "PREFIX_FILTER_ALIAS": "keysmith"}
+        caches["keysmith"].clear()
+        create_token(name="indexed-token")
+        out = StringIO()
+
+        call_command("keysmith_rebuild_prefix_filter", stdout=out)
+
+        assert "Indexed 1 prefixes" in out.getvalue()
+        assert caches["keysmith"].get("keysmith:prefix-filter") is not None
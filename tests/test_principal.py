@@ -0,0 +1,118 @@
+import pickle
+
+import pytest
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from keysmith.auth.base import authenticate_token
+from keysmith.auth.principal import TokenPrincipal, as_request_token
+from keysmith.auth.scopes import compile_scopes, has_scopes
+from keysmith.django.middleware import KeysmithAuthenticationMiddleware
+from keysmith.services.tokens import create_token
+
+
+@pytest.fixture
+def scoped_token(django_user_model):
+    from django.contrib.auth.models import Permission
+
+    user = django_user_model.objects.create_user(username="principal-user")
+    permission = Permission.objects.first()
+    token, raw_token = create_token(name="principal", user=user, scopes=[permission])
+    return token, raw_token, permission
+
+
+@pytest.mark.django_db
+class TestTokenPrincipal:
+    """Test the lightweight request principal."""
+
+    def test_from_authenticated_token_needs_no_queries(
+        self, scoped_token, django_assert_num_queries
+    ):
+        token, raw_token, permission = scoped_token
+        authenticated = authenticate_token(raw_token)
+
+        with django_assert_num_queries(0):
+            principal = TokenPrincipal.from_token(authenticated)
+            user = principal.user
+
+        assert principal.pk == token.pk
+        assert principal.prefix == token.prefix
+        assert principal.token_type == token.token_type
+        assert principal.scopes == frozenset({permission.codename})
+        assert user.pk == token.user_id
+
+    def test_is_immutable(self, scoped_token):
+        principal = TokenPrincipal.from_token(authenticate_token(scoped_token[1]))
+
+        with pytest.raises(AttributeError):
+            principal.prefix = "other"
+        with pytest.raises(AttributeError):
+            principal.extra = 1
+
+    def test_pickle_round_trip_drops_loaded_objects(self, scoped_token):
+        token, raw_token, _ = scoped_token
+        principal = TokenPrincipal.from_token(authenticate_token(raw_token))
+        mask = principal.scope_mask
+        assert principal._scope_mask == mask
+
+        restored = pickle.loads(pickle.dumps(principal))
+
+        assert restored == principal
+        assert restored.scopes == principal.scopes
+        assert restored._scope_mask is None
+        assert restored._token is None
+
+    def test_user_and_token_load_lazily(self, scoped_token, django_assert_num_queries):
+        token, raw_token, _ = scoped_token
+        principal = pickle.loads(
+            pickle.dumps(TokenPrincipal.from_token(authenticate_token(raw_token)))
+        )
+
+        with django_assert_num_queries(1):
+            assert principal.user.pk == token.user_id
+            assert principal.user.pk == token.user_id
+        with django_assert_num_queries(1):
+            assert principal.token.name == "principal"
+            assert principal.token.name == "principal"
+
+    def test_userless_token_has_no_user(self, django_assert_num_queries):
+        _, raw_token = create_token(name="system", token_type="system")
+        principal = TokenPrincipal.from_token(authenticate_token(raw_token))
+
+        with django_assert_num_queries(0):
+            assert principal.user is None
+
+    def test_scope_masks_work(self, scoped_token):
+        _, raw_token, permission = scoped_token
+        principal = TokenPrincipal.from_token(authenticate_token(raw_token))
+
+        assert has_scopes(principal, compile_scopes(permission.codename))
+        assert not has_scopes(principal, compile_scopes("principal:missing"))
+
+    def test_as_request_token_respects_setting(self, settings, scoped_token):
+        token = authenticate_token(scoped_token[1])
+
+        assert as_request_token(token) is token
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "TOKEN_PRINCIPAL": True}
+        assert isinstance(as_request_token(token), TokenPrincipal)
+
+
+@pytest.mark.django_db
+def test_middleware_attaches_principal_and_audits_it(settings, scoped_token):
+    from keysmith.models.utils import get_audit_log_model
+
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "TOKEN_PRINCIPAL": True,
+        "ENABLE_AUDIT_LOGGING": True,
+    }
+    token, raw_token, _ = scoped_token
+    request = RequestFactory().get("/test/", HTTP_X_KEYSMITH_TOKEN=raw_token)
+
+    KeysmithAuthenticationMiddleware(lambda request: JsonResponse({"ok": True}))(request)
+
+    assert isinstance(request.keysmith_token, TokenPrincipal)
+    assert request.keysmith_user.pk == token.user_id
+    audit = get_audit_log_model().objects.get(action="auth_success")
+    assert audit.token_id == token.pk
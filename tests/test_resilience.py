@@ -0,0 +1,294 @@
+import pytest
+from django.db import OperationalError
+
+from keysmith.auth import base, resilience
+from keysmith.auth.base import aauthenticate_token, authenticate_token
+from keysmith.auth.cache import get_shared_cache, token_digest
+from keysmith.auth.exceptions import InvalidToken, VerificationUnavailable
+from keysmith.auth.resilience import CircuitBreaker, KnownTokens, get_resilience_stats
+from keysmith.services.tokens import create_token, revoke_token
+from keysmith.utils.tokens import build_public_token
+from tests.test_auth_cache import SHARED_CACHES, FakeClock
+
+
+@pytest.fixture(autouse=True)
+def _reset_resilience(monkeypatch):
+    monkeypatch.setattr(resilience, "_breaker", None)
+    monkeypatch.setattr(resilience, "_known_tokens", None)
+    resilience.stats.reset()
+
+
+def _database_down(monkeypatch):
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(1)
+        raise OperationalError("could not connect to server")
+
+    monkeypatch.setattr(base, "_authenticate", fail)
+    return calls
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=FakeClock())
+
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial_closes_or_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now = 20
+        assert breaker.allow() is True
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_overdue_half_open_trial_is_replaced(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        assert breaker.allow() is True
+        clock.now = 15
+        assert breaker.allow() is False
+        clock.now = 20
+        assert breaker.allow() is True
+
+
+class TestKnownTokens:
+    """Test the outage fallback store."""
+
+    def test_entries_expire_after_grace_period(self):
+        clock = FakeClock()
+        known = KnownTokens(grace_period=60, max_entries=10, clock=clock)
+        known.add("digest", object())
+
+        clock.now = 60
+        assert known.get("digest") is not None
+        clock.now = 61
+        assert known.get("digest") is None
+        assert len(known) == 0
+
+    def test_evicts_least_recently_added(self):
+        known = KnownTokens(grace_period=60, max_entries=2, clock=FakeClock())
+        for digest in ("a", "b", "c"):
+            known.add(digest, object())
+
+        assert known.get("a") is None
+        assert len(known) == 2
+
+
+@pytest.mark.django_db
+class TestDatabaseOutage:
+    """Test authentication while the token store fails."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_breaker(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "BREAKER_FAILURE_THRESHOLD": 2,
+            "OUTAGE_POLICY": "fail_open_known",
+        }
+
+    def test_known_token_is_honoured(self, monkeypatch):
+        token, raw_token = create_token(name="known")
+        authenticate_token(raw_token)
+        _database_down(monkeypatch)
+
+        authenticated = authenticate_token(raw_token)
+
+        assert authenticated.pk == token.pk
+        assert get_resilience_stats()["outage_serves"] == 1
+
+    def test_unknown_token_is_refused(self, monkeypatch):
+        _, raw_token = create_token(name="never-seen")
+        _database_down(monkeypatch)
+
+        with pytest.raises(VerificationUnavailable):
+            authenticate_token(raw_token)
+
+        assert get_resilience_stats()["outage_rejections"] == 1
+
+    def test_fail_closed_refuses_known_tokens(self, monkeypatch, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "OUTAGE_POLICY": "fail_closed"}
+        _, raw_token = create_token(name="known")
+        authenticate_token(raw_token)
+        _database_down(monkeypatch)
+
+        with pytest.raises(VerificationUnavailable):
+            authenticate_token(raw_token)
+
+    def test_open_breaker_skips_database(self, monkeypatch):
+        _, raw_token = create_token(name="known")
+        authenticate_token(raw_token)
+        calls = _database_down(monkeypatch)
+
+        for _ in range(4):
+            authenticate_token(raw_token)
+
+        stats = get_resilience_stats()
+        assert len(calls) == 2
+        assert stats["breaker_state"] == CircuitBreaker.OPEN
+        assert stats["breaker_opened"] == 1
+
+    def test_unexpected_trial_error_does_not_wedge_breaker(self, monkeypatch, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "BREAKER_FAILURE_THRESHOLD": 1,
+            "BREAKER_RESET_TIMEOUT": 0,
+        }
+        token, raw_token = create_token(name="known")
+        healthy = base._authenticate
+        _database_down(monkeypatch)
+        with pytest.raises(VerificationUnavailable):
+            authenticate_token(raw_token)
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("cache backend exploded")
+
+        monkeypatch.setattr(base, "_authenticate", broken)
+        with pytest.raises(RuntimeError):
+            authenticate_token(raw_token)
+        monkeypatch.setattr(base, "_authenticate", healthy)
+
+        assert authenticate_token(raw_token).pk == token.pk
+        assert get_resilience_stats()["breaker_state"] == CircuitBreaker.CLOSED
+
+    def test_rejections_do_not_trip_breaker(self):
+        token, _ = create_token(name="guessed")
+        wrong = build_public_token(
+            namespace=token.prefix.split("_")[0],
+            identifier=token.prefix.split("_", 1)[1],
+            secret="x" * 32,
+        ).token
+
+        for _ in range(3):
+            with pytest.raises(InvalidToken):
+                authenticate_token(wrong)
+
+        assert get_resilience_stats()["breaker_state"] == CircuitBreaker.CLOSED
+
+    def test_revoked_token_is_forgotten(self, monkeypatch):
+        token, raw_token = create_token(name="known")
+        authenticate_token(raw_token)
+        revoke_token(token)
+        _database_down(monkeypatch)
+
+        with pytest.raises(VerificationUnavailable):
+            authenticate_token(raw_token)
+
+    def test_async_known_token_is_honoured(self, monkeypatch):
+        from asgiref.sync import async_to_sync
+
+        token, raw_token = create_token(name="known")
+        async_to_sync(aauthenticate_token)(raw_token)
+
+        async def fail(*args, **kwargs):
+            raise OperationalError("could not connect to server")
+
+        monkeypatch.setattr(base, "_aauthenticate", fail)
+
+        authenticated = async_to_sync(aauthenticate_token)(raw_token)
+
+        assert authenticated.pk == token.pk
+
+
+@pytest.mark.django_db
+class TestStaleWhileRevalidate:
+    """Test serving stale shared records while one refresh runs."""
+
+    @pytest.fixture(autouse=True)
+    def _enable_shared_cache(self, settings, monkeypatch):
+        from django.core.cache import caches
+
+        settings.CACHES = SHARED_CACHES
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "SHARED_CACHE_ALIAS": "keysmith",
+            "SHARED_CACHE_STALE_TTL": 30,
+        }
+        caches["keysmith"].clear()
+        self.refreshes = []
+
+        def revalidate_now(*args):
+            self.refreshes.append(args)
+            base._revalidate(*args)
+
+        monkeypatch.setattr(base, "_revalidate_in_background", revalidate_now)
+
+    def _age_record(self, token, raw_token):
+        shared = get_shared_cache()
+        key = shared._record_key(token.prefix, token_digest(raw_token))
+        record = shared.cache.get(key)
+        record["fresh_until"] = 0
+        shared.cache.set(key, record)
+        return shared, key
+
+    def test_stale_record_is_served_and_refreshed(self):
+        token, raw_token = create_token(name="stale")
+        authenticate_token(raw_token)
+        shared, key = self._age_record(token, raw_token)
+
+        authenticated = authenticate_token(raw_token)
+
+        assert authenticated.pk == token.pk
+        assert len(self.refreshes) == 1
+        assert shared.cache.get(key)["fresh_until"] > 0
+        assert shared.acquire(token.prefix, token_digest(raw_token)) is True
+        assert get_resilience_stats()["stale_serves"] == 1
+
+    def test_fresh_record_is_not_refreshed(self):
+        _, raw_token = create_token(name="fresh")
+        authenticate_token(raw_token)
+
+        authenticate_token(raw_token)
+
+        assert self.refreshes == []
+
+    def test_refresh_drops_record_of_rejected_token(self):
+        from keysmith.models.utils import get_token_model
+
+        token, raw_token = create_token(name="stale")
+        authenticate_token(raw_token)
+        shared, key = self._age_record(token, raw_token)
+        # a revoke that bypassed the services, so the version was never bumped.
+        get_token_model().objects.filter(pk=token.pk).update(revoked=True)
+
+        authenticate_token(raw_token)
+
+        assert shared.cache.get(key) is None
+
+    def test_stale_ttl_disabled_treats_expired_record_as_miss(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "SHARED_CACHE_STALE_TTL": 0}
+        token, raw_token = create_token(name="stale")
+        authenticate_token(raw_token)
+        shared, _ = self._age_record(token, raw_token)
+
+        assert shared.get(token.prefix, token_digest(raw_token))[0] is None
@@ -0,0 +1,68 @@
+import dataclasses
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from keysmith import runtime as runtime_module
+from keysmith.hashers.pbkdf2 import PBKDF2SHA512TokenHasher
+from keysmith.models import Token
+from keysmith.runtime import get_runtime
+
+
+def rate_limit_hook(*, request, raw_token):
+    return None
+
+
+class TestRuntime:
+    """Test the precompiled runtime snapshot."""
+
+    def test_snapshot_is_reused(self):
+        runtime = get_runtime()
+
+        assert get_runtime() is runtime
+        assert runtime.token_model is Token
+        assert isinstance(runtime.hashers.default, PBKDF2SHA512TokenHasher)
+        assert runtime.drf_header_name == "X-KEYSMITH-TOKEN"
+
+    def test_snapshot_is_immutable(self):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            get_runtime().header_name = "HTTP_OTHER"
+
+    def test_setting_change_swaps_snapshot(self, settings):
+        before = get_runtime()
+
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "HEADER_NAME": "HTTP_X_API_KEY",
+            "RATE_LIMIT_HOOK": "tests.test_runtime.rate_limit_hook",
+        }
+
+        after = get_runtime()
+        assert after is not before
+        assert after.header_name == "HTTP_X_API_KEY"
+        assert after.drf_header_name == "X-API-KEY"
+        assert after.rate_limit_hook is rate_limit_hook
+
+    def test_unresolvable_settings_fail_on_first_use(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "TOKEN_MODEL": "keysmith.Missing"}
+
+        assert runtime_module._runtime is None
+        with pytest.raises(ImproperlyConfigured):
+            get_runtime()
+
+
+@pytest.mark.django_db
+def test_middleware_reads_header_from_snapshot(settings):
+    from django.http import JsonResponse
+    from django.test import RequestFactory
+
+    from keysmith.django.middleware import KeysmithAuthenticationMiddleware
+    from keysmith.services.tokens import create_token
+
+    settings.KEYSMITH = {**settings.KEYSMITH, "HEADER_NAME": "HTTP_X_API_KEY"}
+    token, raw_token = create_token(name="runtime")
+    request = RequestFactory().get("/test/", HTTP_X_API_KEY=raw_token)
+
+    KeysmithAuthenticationMiddleware(lambda request: JsonResponse({"ok": True}))(request)
+
+    assert request.keysmith_token.pk == token.pk
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from keysmith.auth.scopes import (
+    ScopeRegistry,
+    compile_scopes,
+    get_token_scope_mask,
+    has_scopes,
+)
+
+
+class TestScopeRegistry:
+    """Test codename to bit assignment."""
+
+    def test_bits_are_stable_and_distinct(self):
+        """Each codename gets one bit, assigned once."""
+        registry = ScopeRegistry()
+
+        read = registry.bit("read")
+        write = registry.bit("write")
+
+        assert read == 1
+        assert write == 2
+        assert registry.bit("read") == read
+        assert len(registry) == 2
+
+    def test_mask_combines_bits(self):
+        """A mask is the OR of its codenames' bits."""
+        registry = ScopeRegistry()
+        registry.seed(["read", "write", "admin"])
+
+        assert registry.mask(["admin", "read"]) == 0b101
+        assert registry.mask([]) == 0
+
+    def test_compile_scopes_accepts_single_string(self):
+        """A bare string is one scope, not a sequence of characters."""
+        assert compile_scopes("tokens:read") == compile_scopes(["tokens:read"])
+        assert compile_scopes(None) == 0
+
+
+class TestHasScopes:
+    """Test mask-based scope checks on tokens."""
+
+    def test_token_mask_is_cached(self):
+        """The mask is computed from the cached codenames once per instance."""
+        token = SimpleNamespace(_keysmith_scope_codenames=frozenset({"read", "write"}))
+
+        mask = get_token_scope_mask(token)
+        token._keysmith_scope_codenames = frozenset()
+
+        assert get_token_scope_mask(token) == mask
+
+    def test_has_scopes_requires_every_bit(self):
+        """All required scopes must be granted."""
+        token = SimpleNamespace(_keysmith_scope_codenames=frozenset({"read"}))
+
+        assert has_scopes(token, compile_scopes(["read"]))
+        assert not has_scopes(token, compile_scopes(["read", "write"]))
+        assert has_scopes(token, 0)
+
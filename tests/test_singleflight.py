@@ -0,0 +1,147 @@
+import threading
+import time
+
+from keysmith.auth.singleflight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target()
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight:
+    """Test call coalescing."""
+
+    def test_concurrent_callers_share_one_execution(self):
+        """Callers that arrive while a call is in flight reuse its result."""
+        flight = SingleFlight(timeout=5)
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "verified"
+
+        results = _run_concurrently(8, lambda: flight.do("digest", slow))
+
+        assert results == ["verified"] * 8
+        assert len(calls) == 1
+        assert len(flight) == 0
+
+    def test_waiters_receive_shared_copy(self):
+        """The share callable is applied to the result handed to waiters."""
+        flight = SingleFlight(timeout=5)
+        leader_result = object()
+
+        def slow():
+            time.sleep(0.2)
+            return leader_result
+
+        results = _run_concurrently(4, lambda: flight.do("digest", slow, share=lambda r: [r]))
+
+        assert results.count(leader_result) == 1
+        assert [leader_result] in results
+
+    def test_exception_is_shared(self):
+        """Waiters re-raise the leader's exception."""
+        flight = SingleFlight(timeout=5)
+        calls = []
+
+        def failing():
+            calls.append(1)
+            time.sleep(0.2)
+            raise ValueError("bad token")
+
+        results = _run_concurrently(4, lambda: flight.do("digest", failing))
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 1
+
+    def test_waiters_raise_their_own_exception(self):
+        """Each waiter raises a fresh copy chained to the leader's, never the same instance."""
+        from keysmith.auth.exceptions import InvalidToken
+
+        flight = SingleFlight(timeout=5)
+
+        def failing():
+            time.sleep(0.2)
+            raise InvalidToken("bad token")
+
+        results = _run_concurrently(4, lambda: flight.do("digest", failing))
+
+        assert len({id(result) for result in results}) == 4
+        assert all(isinstance(result, InvalidToken) for result in results)
+        assert all(str(result) == "bad token" for result in results)
+        leaders = [result for result in results if result.__cause__ is None]
+        assert len(leaders) == 1
+        assert all(result.__cause__ is leaders[0] for result in results if result not in leaders)
+
+    def test_waiter_runs_itself_after_timeout(self):
+        """A stuck leader does not block waiters beyond the timeout."""
+        flight = SingleFlight(timeout=0.05)
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do("digest", release.wait))
+        leader.start()
+        while not len(flight):
+            time.sleep(0.001)
+
+        assert flight.do("digest", lambda: "own") == "own"
+        release.set()
+        leader.join()
+
+    def test_different_keys_do_not_coalesce(self):
+        """Each key runs independently."""
+        flight = SingleFlight(timeout=5)
+
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+
+def test_authenticate_token_coalesces_same_token(settings, monkeypatch):
+    """Concurrent authenticate_token calls for one raw token verify once."""
+    from keysmith.auth import base
+    from keysmith.utils.tokens import build_public_token
+
+    settings.KEYSMITH = {
+        **settings.KEYSMITH,
+        "SINGLE_FLIGHT_TIMEOUT": 5,
+        "LOCK_FREE_AUTH": True,
+    }
+    calls = []
+
+    class FakeToken:
+        pass
+
+    def fake_authenticate(raw_token, prefix, secret, digest, negative, *, lock):
+        calls.append(raw_token)
+        time.sleep(0.2)
+        return FakeToken()
+
+    monkeypatch.setattr(base, "_authenticate", fake_authenticate)
+    raw_token = build_public_token(namespace="tok", identifier="flight", secret="s" * 40).token
+
+    results = _run_concurrently(6, lambda: base.authenticate_token(raw_token))
+
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 6
+
+
+def test_single_flight_disabled_by_default():
+    """No coalescing layer is created unless configured."""
+    from keysmith.auth.singleflight import get_single_flight
+
+    assert get_single_flight() is None
@@ -7,6 +7,7 @@ from keysmith.auth.base import authenticate_token
 from keysmith.auth.exceptions import ExpiredToken, InvalidToken, RevokedToken
 from keysmith.models import Token, TokenAuditLog
 from keysmith.services.tokens import create_token, purge_token, revoke_token, rotate_token
+from tests.models import ScopedToken
 
 
 @pytest.mark.django_db
@@ -381,3 +382,196 @@ class TestTokenLifecycleIntegration:
         purge_token(token)
         token.refresh_from_db()
         assert not token.is_active
+
+
+@pytest.mark.django_db
+class TestMarkTokenUsedResolution:
+    """Test LAST_USED_RESOLUTION handling in mark_token_used."""
+
+    @pytest.fixture(autouse=True)
+    def _resolution(self, settings):
+        settings.KEYSMITH = {**settings.KEYSMITH, "LAST_USED_RESOLUTION": 60}
+
+    def test_recent_instance_skips_query(self, django_assert_num_queries):
+        """No statement is issued when the loaded value is within the resolution."""
+        from keysmith.services.tokens import mark_token_used
+
+        token, _ = create_token(name="test-token")
+        token.last_used_at = timezone.now() - timedelta(seconds=10)
+
+        with django_assert_num_queries(0):
+            mark_token_used(token)
+
+    def test_recent_row_is_not_rewritten(self):
+        """The conditional UPDATE leaves a recent stored value untouched."""
+        from keysmith.services.tokens import mark_token_used
+
+        token, _ = create_token(name="test-token")
+        recent = timezone.now() - timedelta(seconds=10)
+        Token.objects.filter(pk=token.pk).update(last_used_at=recent)
+
+        mark_token_used(token)
+        token.refresh_from_db()
+
+        assert token.last_used_at == recent
+
+    def test_stale_row_is_rewritten(self):
+        """Rows older than the resolution are updated."""
+        from keysmith.services.tokens import mark_token_used
+
+        token, _ = create_token(name="test-token")
+        stale = timezone.now() - timedelta(minutes=5)
+        Token.objects.filter(pk=token.pk).update(last_used_at=stale)
+
+        mark_token_used(token)
+        token.refresh_from_db()
+
+        assert token.last_used_at > stale
+
+
+@pytest.mark.django_db
+class TestTokenScopes:
+    """Test scope resolution for the default token model."""
+
+    def test_default_model_has_no_scope_column(self):
+        """The column is opt-in, so the default model reads scopes from the relation."""
+        from keysmith.models.base import AbstractToken
+        from keysmith.models.utils import has_scope_column
+
+        assert not has_scope_column(Token)
+        assert not has_scope_column(AbstractToken)
+
+    def test_through_model_delete_revokes_scopes(self):
+        """Rows deleted on the through model send no m2m_changed but stop granting the scope."""
+        from django.contrib.auth.models import Permission
+
+        from keysmith.auth.utils import get_token_scopes
+
+        write = Permission.objects.create(codename="write", name="write", content_type_id=1)
+        token, raw_token = create_token(name="scoped-token", scopes=[write])
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset({"write"})
+
+        Token.scopes.through.objects.filter(token=token).delete()
+
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset()
+
+
+@pytest.mark.django_db
+class TestScopeCodenamesColumn:
+    """Test the denormalized scope_codenames column on a token model that declares it."""
+
+    @pytest.fixture(autouse=True)
+    def scoped_token_model(self, settings):
+        # the bundled audit log model references keysmith.Token.
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "TOKEN_MODEL": "tests.ScopedToken",
+            "ENABLE_AUDIT_LOGGING": False,
+        }
+
+    @pytest.fixture
+    def permissions(self):
+        from django.contrib.auth.models import Permission
+
+        return [
+            Permission.objects.create(codename=codename, name=codename, content_type_id=1)
+            for codename in ("write", "read")
+        ]
+
+    def test_create_token_populates_column(self, permissions):
+        """create_token stores sorted codenames alongside the M2M rows."""
+        token, _ = create_token(name="scoped-token", scopes=permissions)
+        token.refresh_from_db()
+
+        assert token.scope_codenames == ["read", "write"]
+
+    def test_scope_mutations_resync_column(self, permissions):
+        """add/remove/clear on either side of the relation keep the column current."""
+        write, read = permissions
+        token, _ = create_token(name="scoped-token", scopes=[write])
+
+        token.scopes.add(read)
+        token.refresh_from_db()
+        assert token.scope_codenames == ["read", "write"]
+
+        write.scopedtoken_set.remove(token)
+        token.refresh_from_db()
+        assert token.scope_codenames == ["read"]
+
+        read.scopedtoken_set.clear()
+        token.refresh_from_db()
+        assert token.scope_codenames == []
+
+    def test_deleting_permission_resyncs_column(self, permissions):
+        """Tokens lose a codename when its permission is deleted."""
+        write, read = permissions
+        token, _ = create_token(name="scoped-token", scopes=permissions)
+
+        write.delete()
+        token.refresh_from_db()
+
+        assert token.scope_codenames == ["read"]
+
+    def test_scope_change_applies_to_next_authentication(self, permissions):
+        """The next authentication sees the updated scopes."""
+        from keysmith.auth.utils import get_token_scopes
+
+        write, _ = permissions
+        token, raw_token = create_token(name="scoped-token", scopes=[write])
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset({"write"})
+
+        token.scopes.clear()
+
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset()
+
+    def test_authentication_reads_scopes_from_row(self, permissions):
+        """Token and scopes come from one row read."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from keysmith.auth.utils import get_token_scopes
+
+        _, raw_token = create_token(name="scoped-token", scopes=permissions)
+
+        with CaptureQueriesContext(connection) as context:
+            token = authenticate_token(raw_token)
+            assert get_token_scopes(token) == frozenset({"read", "write"})
+
+        selects = [q["sql"] for q in context.captured_queries if q["sql"].startswith("SELECT")]
+        assert len(selects) == 1
+
+    def test_backfill_restores_column_from_relation(self, permissions):
+        """backfill_scope_codenames rewrites rows whose column is out of date."""
+        from keysmith.models.utils import backfill_scope_codenames
+
+        token, _ = create_token(name="scoped-token", scopes=permissions)
+        unscoped, _ = create_token(name="unscoped-token")
+        ScopedToken.objects.filter(pk=token.pk).update(scope_codenames=[])
+
+        assert backfill_scope_codenames(ScopedToken) == [token.pk]
+        token.refresh_from_db()
+        assert token.scope_codenames == ["read", "write"]
+        assert backfill_scope_codenames(ScopedToken) == []
+
+    def test_sync_command_backfills_and_invalidates(self, permissions, settings):
+        """keysmith_sync_scope_codenames fixes the column and drops cached records."""
+        from io import StringIO
+
+        from django.core.cache import caches
+        from django.core.management import call_command
+
+        from keysmith.auth.utils import get_token_scopes
+        from tests.test_auth_cache import SHARED_CACHES
+
+        settings.CACHES = SHARED_CACHES
+        settings.KEYSMITH = {**settings.KEYSMITH, "SHARED_CACHE_ALIAS": "keysmith"}
+        caches["keysmith"].clear()
+        token, raw_token = create_token(name="scoped-token", scopes=permissions)
+        ScopedToken.objects.filter(pk=token.pk).update(scope_codenames=[])
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset()
+
+        out = StringIO()
+        call_command("keysmith_sync_scope_codenames", stdout=out)
+
+        assert "1 token(s)" in out.getvalue()
+        assert get_token_scopes(authenticate_token(raw_token)) == frozenset({"read", "write"})
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from keysmith.auth.base import authenticate_token
+from keysmith.models import Token
+from keysmith.services.tokens import create_token, mark_token_used
+from keysmith.services.usage import UsageBuffer, flush_usage, get_usage_buffer
+
+
+@pytest.mark.django_db
+class TestUsageBuffer:
+    """Test the write-behind usage buffer."""
+
+    def test_record_coalesces_per_token(self):
+        """Repeated records for one token keep a single pending entry."""
+        token, _ = create_token(name="buffered-token")
+        buffer = UsageBuffer(interval=0, max_tokens=100)
+
+        buffer.record(token, timezone.now())
+        buffer.record(token, timezone.now())
+
+        assert len(buffer) == 1
+
+    def test_flush_writes_all_pending_tokens(self):
+        """A flush writes every pending token in one statement."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        token1, _ = create_token(name="buffered-1")
+        token2, _ = create_token(name="buffered-2")
+        buffer = UsageBuffer(interval=0, max_tokens=100)
+        used_at = timezone.now()
+        buffer.record(token1, used_at)
+        buffer.record(token2, used_at)
+
+        with CaptureQueriesContext(connection) as ctx:
+            flushed = buffer.flush()
+
+        assert flushed == 2
+        assert len(ctx.captured_queries) == 1
+        assert Token.objects.filter(last_used_at=used_at).count() == 2
+
+    def test_flush_never_moves_last_used_backwards(self):
+        """A newer stored value is kept when the buffered value is older."""
+        token, _ = create_token(name="buffered-token")
+        newer = timezone.now() + timedelta(hours=1)
+        Token.objects.filter(pk=token.pk).update(last_used_at=newer)
+        buffer = UsageBuffer(interval=0, max_tokens=100)
+
+        buffer.record(token, timezone.now())
+        buffer.flush()
+        token.refresh_from_db()
+
+        assert token.last_used_at == newer
+
+    def test_flushes_when_max_tokens_reached(self):
+        """Reaching max_tokens triggers an immediate flush."""
+        token1, _ = create_token(name="buffered-1")
+        token2, _ = create_token(name="buffered-2")
+        buffer = UsageBuffer(interval=0, max_tokens=2)
+
+        buffer.record(token1, timezone.now())
+        assert len(buffer) == 1
+        buffer.record(token2, timezone.now())
+
+        assert len(buffer) == 0
+        assert Token.objects.filter(last_used_at__isnull=False).count() == 2
+
+
+@pytest.mark.django_db
+class TestBufferedUsageRecording:
+    """Test mark_token_used in buffered mode."""
+
+    @pytest.fixture(autouse=True)
+    def _buffered(self, settings):
+        settings.KEYSMITH = {
+            **settings.KEYSMITH,
+            "USAGE_RECORDING": "buffered",
+            "USAGE_FLUSH_INTERVAL": 0,
+        }
+        yield
+        flush_usage()
+
+    def test_authentication_defers_usage_write(self):
+        """last_used_at is written on flush rather than per request."""
+        token, raw_token = create_token(name="buffered-token")
+
+        authenticate_token(raw_token)
+        token.refresh_from_db()
+        assert token.last_used_at is None
+
+        assert flush_usage() == 1
+        token.refresh_from_db()
+        assert token.last_used_at is not None
+
+    def test_async_authentication_flushes_off_the_event_loop(self, settings):
+        """A size-triggered flush from aauthenticate_token writes without blocking the loop."""
+        from asgiref.sync import async_to_sync
+
+        from keysmith.auth.base import aauthenticate_token
+
+        settings.KEYSMITH = {**settings.KEYSMITH, "USAGE_FLUSH_MAX_TOKENS": 1}
+        token, raw_token = create_token(name="buffered-token")
+
+        async_to_sync(aauthenticate_token)(raw_token)
+
+        token.refresh_from_db()
+        assert token.last_used_at is not None
+        assert len(get_usage_buffer()) == 0
+
+    def test_mark_token_used_updates_instance(self):
+        """The in-memory instance reflects the buffered timestamp."""
+        token, _ = create_token(name="buffered-token")
+
+        mark_token_used(token)
+
+        assert token.last_used_at is not None
+        assert len(get_usage_buffer()) == 1